@@ -0,0 +1,191 @@
+import bisect
+import threading
+import time
+
+CONDITIONS = ('above', 'below', 'cross', 'near', 'percent_move')
+DEFAULT_BAND_PCT = 2.0
+DEFAULT_COOLDOWN = 3600
+
+
+class Alert:
+    __slots__ = ('id', 'symbol', 'condition', 'threshold', 'band_pct', 'cooldown',
+                 'enabled', 'last_triggered')
+
+    def __init__(self, id, symbol, condition, threshold, band_pct=DEFAULT_BAND_PCT,
+                 cooldown=DEFAULT_COOLDOWN, enabled=True, last_triggered=None):
+        if condition not in CONDITIONS:
+            raise ValueError(f"Unknown alert condition: {condition}")
+        self.id = id
+        self.symbol = symbol
+        self.condition = condition
+        self.threshold = float(threshold)
+        self.band_pct = float(band_pct if band_pct is not None else DEFAULT_BAND_PCT)
+        self.cooldown = int(cooldown if cooldown is not None else DEFAULT_COOLDOWN)
+        self.enabled = bool(enabled)
+        self.last_triggered = last_triggered
+
+    @classmethod
+    def from_row(cls, row):
+        # Row order matches Database.get_alerts()
+        return cls(*row)
+
+    def index_key(self):
+        # 'near' alerts are bucketed by band width so each bucket stays bisectable
+        if self.condition == 'near':
+            return ('near', self.band_pct)
+        return (self.condition,)
+
+
+class _SortedBucket:
+    """Alert ids kept sorted by threshold; ties are ordered by id."""
+
+    def __init__(self):
+        self.keys = []
+
+    def add(self, threshold, alert_id):
+        bisect.insort(self.keys, (threshold, alert_id))
+
+    def remove(self, threshold, alert_id):
+        i = bisect.bisect_left(self.keys, (threshold, alert_id))
+        if i < len(self.keys) and self.keys[i] == (threshold, alert_id):
+            del self.keys[i]
+
+    def at_most(self, value):
+        return [alert_id for _, alert_id in self.keys[:bisect.bisect_right(self.keys, (value, float('inf')))]]
+
+    def at_least(self, value):
+        return [alert_id for _, alert_id in self.keys[bisect.bisect_left(self.keys, (value, float('-inf'))):]]
+
+    def between(self, low, high):
+        # low < threshold <= high
+        start = bisect.bisect_right(self.keys, (low, float('inf')))
+        end = bisect.bisect_right(self.keys, (high, float('inf')))
+        return [alert_id for _, alert_id in self.keys[start:end]]
+
+    def __len__(self):
+        return len(self.keys)
+
+
+class AlertEngine:
+    """In-memory index of enabled alerts, evaluated per price tick.
+
+    Alerts are grouped by symbol and condition, each group sorted by
+    threshold, so `on_price` finds the matching alerts with a couple of
+    bisections instead of scanning every alert. `upsert`/`remove` keep the
+    index in step with the database without reloading it.
+
+    Conditions: 'above' (price >= threshold), 'below' (price <= threshold),
+    'cross' (threshold lies between the previous and current tick), 'near'
+    (price within band_pct percent of threshold) and 'percent_move' (price
+    moved at least `threshold` percent from the reference price, normally
+    the previous close). A triggered alert stays quiet for `cooldown` seconds.
+    """
+
+    def __init__(self):
+        self.alerts = {}
+        self.index = {}
+        self.last_prices = {}
+        self.lock = threading.Lock()
+
+    def load(self, alerts):
+        with self.lock:
+            self.alerts.clear()
+            self.index.clear()
+            for alert in alerts:
+                self._add(alert)
+
+    def _add(self, alert):
+        self.alerts[alert.id] = alert
+        if alert.enabled:
+            buckets = self.index.setdefault(alert.symbol, {})
+            buckets.setdefault(alert.index_key(), _SortedBucket()).add(alert.threshold, alert.id)
+
+    def _remove(self, alert_id):
+        alert = self.alerts.pop(alert_id, None)
+        if alert is None or not alert.enabled:
+            return
+        buckets = self.index.get(alert.symbol, {})
+        bucket = buckets.get(alert.index_key())
+        if bucket is not None:
+            bucket.remove(alert.threshold, alert.id)
+            if not len(bucket):
+                del buckets[alert.index_key()]
+        if not buckets:
+            self.index.pop(alert.symbol, None)
+
+    def upsert(self, alert):
+        with self.lock:
+            self._remove(alert.id)
+            self._add(alert)
+
+    def remove(self, alert_id):
+        with self.lock:
+            self._remove(alert_id)
+
+    def symbols(self):
+        with self.lock:
+            return list(self.index)
+
+    def __len__(self):
+        with self.lock:
+            return len(self.alerts)
+
+    def _matches(self, buckets, price, previous, reference):
+        matched = []
+        for key, bucket in buckets.items():
+            condition = key[0]
+            if condition == 'above':
+                matched += bucket.at_most(price)
+            elif condition == 'below':
+                matched += bucket.at_least(price)
+            elif condition == 'cross':
+                if previous is not None and previous != price:
+                    matched += bucket.between(min(previous, price), max(previous, price))
+            elif condition == 'near':
+                band = key[1] / 100.0
+                # |price - t| / t < band  <=>  price / (1 + band) < t < price / (1 - band)
+                low = price / (1 + band)
+                high = price / (1 - band) if band < 1 else float('inf')
+                matched += [alert_id for alert_id in bucket.between(low, high)
+                            if self.alerts[alert_id].threshold < high]
+            elif condition == 'percent_move':
+                if reference:
+                    move_pct = abs(price / reference - 1.0) * 100
+                    matched += bucket.at_most(move_pct)
+        return matched
+
+    def distance(self, symbol, price):
+        """Smallest relative distance from `price` to any threshold of the symbol.
+
+        Used by the monitor to poll symbols close to a trigger more often;
+        returns None when the symbol has no price-based alerts.
+        """
+        with self.lock:
+            best = None
+            for key, bucket in self.index.get(symbol, {}).items():
+                if key[0] == 'percent_move' or not bucket.keys or not price:
+                    continue
+                i = bisect.bisect_left(bucket.keys, (price, float('-inf')))
+                for j in (i - 1, i):
+                    if 0 <= j < len(bucket.keys):
+                        gap = abs(bucket.keys[j][0] - price) / price
+                        best = gap if best is None else min(best, gap)
+            return best
+
+    def on_price(self, symbol, price, reference=None, now=None):
+        """Evaluate one tick; returns the alerts that fire (already marked triggered)."""
+        now = now if now is not None else time.time()
+        with self.lock:
+            previous = self.last_prices.get(symbol)
+            self.last_prices[symbol] = price
+            buckets = self.index.get(symbol)
+            if not buckets:
+                return []
+            fired = []
+            for alert_id in self._matches(buckets, price, previous, reference):
+                alert = self.alerts[alert_id]
+                if alert.last_triggered is not None and now - alert.last_triggered < alert.cooldown:
+                    continue
+                alert.last_triggered = now
+                fired.append(alert)
+            return fired
@@ -1,61 +1,113 @@
+import logging
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+import time
 from datetime import datetime
+from app import metrics
+from app.alert_engine import Alert, AlertEngine
 from config import Config
 
+logger = logging.getLogger(__name__)
+
+CHECK_SECONDS = metrics.histogram('stockwatcher_alert_check_seconds', 'Alert check latency',
+                                  labels=('method',))
+
+
+def _parse_alert(row):
+    # A row that cannot become an Alert (e.g. a non-numeric threshold) is skipped, not fatal
+    try:
+        return Alert.from_row(row)
+    except (TypeError, ValueError) as e:
+        logger.warning("Skipping alert %s: %s", row[0], e)
+        return None
+
 class AlertSystem:
-    def __init__(self):
-        self.config = Config()
+    def __init__(self, config=None):
+        self.config = config or Config()
+        self.engine = AlertEngine()
+        self.db = None
+        self.version = 0  # alert_changes version the index is current with
+    
+    def attach(self, db):
+        # Load the alert index, then follow changes made through `db` as they happen
+        # and, via sync, changes other processes logged in alert_changes
+        version = db.alerts_version()
+        alerts = (_parse_alert(row) for row in db.get_alerts())
+        self.engine.load(alert for alert in alerts if alert is not None)
+        self.version = version
+        if self.db is not db:
+            db.subscribe(self._on_db_change)
+        self.db = db
+    
+    def sync(self, db):
+        """Bring the index up to date with alerts written since it was loaded, by any process."""
+        if self.db is not db:
+            self.attach(db)
+            return
+        version, rows, removed = db.get_alert_changes(self.version)
+        if rows is None:
+            self.attach(db)
+            return
+        for row in rows:
+            self._on_db_change('alert_upserted', row)
+        for alert_id in removed:
+            self.engine.remove(alert_id)
+        self.version = version
+    
+    def _on_db_change(self, event, payload):
+        if event == 'alert_upserted':
+            alert = _parse_alert(payload)
+            if alert is not None:
+                self.engine.upsert(alert)
+            else:
+                self.engine.remove(payload[0])
+        elif event == 'alert_removed':
+            self.engine.remove(payload)
     
+    @metrics.timed(CHECK_SECONDS.labels('check_price_alerts'))
     def check_price_alerts(self, db, stock_api):
+        self.sync(db)
+        
+        symbols = self.engine.symbols()
+        if not symbols:
+            return []
+        quotes, _ = stock_api.fetch_quotes(symbols)
+        return self.process_quotes(db, quotes.values())
+    
+    @metrics.timed(CHECK_SECONDS.labels('process_quotes'))
+    def process_quotes(self, db, quotes):
+        """Run quotes through the alert index and persist trigger times."""
         alerts_triggered = []
-        watchlist = db.get_watchlist()
+        now = time.time()
+        for quote in quotes:
+            fired = self.engine.on_price(quote['symbol'], quote['price'],
+                                         quote.get('previous_close'), now)
+            for alert in fired:
+                alerts_triggered.append({
+                    'alert_id': alert.id,
+                    'symbol': alert.symbol,
+                    'condition': alert.condition,
+                    'current_price': quote['price'],
+                    'target_price': alert.threshold,
+                    'timestamp': datetime.now()
+                })
         
-        for item in watchlist:
-            symbol, target_price, alert_enabled = item
-            if not alert_enabled:
-                continue
-                
-            current_data = stock_api.get_stock_price(symbol)
-            if current_data:
-                current_price = current_data['price']
-                
-                # Simple alert logic - trigger if price crosses target
-                if self._should_trigger_alert(current_price, target_price):
-                    alert_info = {
-                        'symbol': symbol,
-                        'current_price': current_price,
-                        'target_price': target_price,
-                        'timestamp': datetime.now()
-                    }
-                    alerts_triggered.append(alert_info)
-                    
+        if alerts_triggered:
+            db.mark_alerts_triggered((info['alert_id'], now) for info in alerts_triggered)
         return alerts_triggered
     
-    def _should_trigger_alert(self, current_price, target_price):
-        # Simple threshold check
-        return abs(current_price - target_price) / target_price < 0.02  # 2% threshold
-    
     def send_email_alert(self, alert_info):
         if not self.config.EMAIL_USER or not self.config.EMAIL_PASS:
             print(f"Email not configured, alert: {alert_info['symbol']} hit target")
             return False
             
         try:
+            subject, body = format_alert_email(alert_info)
             msg = MIMEMultipart()
             msg['From'] = self.config.EMAIL_USER
             msg['To'] = self.config.EMAIL_USER  # Send to self for now
-            msg['Subject'] = f"StockWatcher Alert: {alert_info['symbol']}"
-            
-            body = f"""
-            Stock Alert Triggered!
-            
-            Symbol: {alert_info['symbol']}
-            Current Price: ${alert_info['current_price']:.2f}
-            Target Price: ${alert_info['target_price']:.2f}
-            Time: {alert_info['timestamp'].strftime('%Y-%m-%d %H:%M:%S')}
-            """
+            msg['Subject'] = subject
             
             msg.attach(MIMEText(body, 'plain'))
             
@@ -68,4 +120,17 @@ class AlertSystem:
             
         except Exception as e:
             print(f"Failed to send email alert: {e}")
-            return False
\ No newline at end of file
+            return False
+
+def format_alert_email(alert_info):
+    """Subject and plain-text body of the email for one triggered alert."""
+    subject = f"StockWatcher Alert: {alert_info['symbol']}"
+    body = (
+        "Stock Alert Triggered!\n\n"
+        f"Symbol: {alert_info['symbol']}\n"
+        f"Condition: {alert_info.get('condition', 'near')}\n"
+        f"Current Price: ${alert_info['current_price']:.2f}\n"
+        f"Target Price: ${alert_info['target_price']:.2f}\n"
+        f"Time: {alert_info['timestamp'].strftime('%Y-%m-%d %H:%M:%S')}\n"
+    )
+    return subject, body
@@ -0,0 +1,221 @@
+import asyncio
+import json
+import logging
+import re
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl
+from a2wsgi import WSGIMiddleware
+from app import metrics
+from app.async_stock_api import AsyncStockAPI
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncApp:
+    """ASGI application serving the quote-bound routes without a thread per request.
+
+    GET /api/stock/<symbol>, /api/compare, /api/portfolio and
+    /api/alerts/check are handled here: they await AsyncStockAPI fetches
+    and run their SQLite work (including building database-backed
+    services on first use) on a small thread pool, returning the same
+    JSON (through the Flask app's JSON provider) as the Flask views.
+    /api/stream is served here too, as an async loop over a QuoteBroadcaster
+    subscription, so open streams hold no thread. Every other request goes
+    to the Flask app on a WSGI thread pool.
+    """
+
+    def __init__(self, flask_app, services):
+        self.config = services.config
+        self.flask_app = flask_app
+        self.services = services
+        self.wsgi = WSGIMiddleware(flask_app, workers=self.config.ASGI_WSGI_THREADS)
+        self.executor = ThreadPoolExecutor(max_workers=self.config.ASGI_DB_THREADS,
+                                           thread_name_prefix='asgi-db')
+        self.quotes = None  # AsyncStockAPI, created on the server's event loop
+        # (path pattern, Flask rule for the latency metric, handler)
+        self.routes = [
+            (re.compile(r'/api/stock/(?P<symbol>[^/]+)'), '/api/stock/<symbol>', self.get_stock),
+            (re.compile(r'/api/compare'), '/api/compare', self.compare_stocks),
+            (re.compile(r'/api/portfolio'), '/api/portfolio', self.get_portfolio),
+            (re.compile(r'/api/alerts/check'), '/api/alerts/check', self.check_alerts),
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] == 'http' and scope['method'] == 'GET':
+            if scope['path'] == '/api/stream':
+                await self.stream_quotes(scope, receive, send)
+                return
+            for pattern, rule, handler in self.routes:
+                match = pattern.fullmatch(scope['path'])
+                if match:
+                    start = time.perf_counter()
+                    args = dict(parse_qsl(scope['query_string'].decode('latin-1'), keep_blank_values=True))
+                    payload, status = await handler(args, **match.groupdict())
+                    await self._send_json(send, payload, status)
+                    metrics.HTTP_REQUEST_SECONDS.labels('GET', rule, str(status)).observe(time.perf_counter() - start)
+                    return
+        await self.wsgi(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self._quotes()
+                await self._run_sync(self.services.start_refresher)
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def _quotes(self):
+        if self.quotes is None:
+            self.quotes = AsyncStockAPI(self.services.stock_api)
+        return self.quotes
+
+    def _run_sync(self, func, *args):
+        return asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def _send_json(self, send, payload, status):
+        response = self.flask_app.json.response(payload)
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                        for name, value in response.headers.items()]
+        })
+        await send({'type': 'http.response.body', 'body': response.get_data()})
+
+    async def get_stock(self, args, symbol):
+        try:
+            known = self.services.stock_api.symbols.lookup(symbol.upper())
+            if known is False:
+                return {'error': 'Invalid stock symbol'}, 400
+            data = await self._quotes().get_stock_price(symbol)
+            if not data:
+                # As in the Flask view: a symbol the registry had not seen is validated by this fetch
+                if known is None:
+                    return {'error': 'Invalid stock symbol'}, 400
+                return {'error': 'Stock data unavailable'}, 404
+            await self._run_sync(lambda: self.services.db.save_stock_price(
+                data['symbol'], data['price'], data['currency']))
+            return data, 200
+        except Exception:
+            logger.error(f"Error in get_stock: {traceback.format_exc()}")
+            return {'error': 'Internal server error'}, 500
+
+    async def compare_stocks(self, args):
+        try:
+            symbols = args.get('symbols', '').split(',')
+            symbols = [s.strip().upper() for s in symbols if s.strip()]
+
+            if len(symbols) < 2:
+                return {'error': 'At least 2 symbols required'}, 400
+
+            quotes, errors = await self._quotes().fetch_quotes(symbols)
+            if args.get('include_errors') == '1':
+                return {'quotes': quotes, 'errors': errors}, 200
+            for error in errors.values():
+                logger.warning(error)
+            return quotes, 200
+        except Exception:
+            logger.error(f"Error comparing stocks: {traceback.format_exc()}")
+            return {'error': 'Failed to compare stocks'}, 500
+
+    async def get_portfolio(self, args):
+        try:
+            portfolio = await self._run_sync(lambda: self.services.portfolio)
+            positions, realized_total = await self._run_sync(portfolio.load_positions)
+            quotes = {}
+            if positions:
+                quotes, _ = await self._quotes().fetch_quotes([row[0] for row in positions], allow_stale=True)
+            return portfolio.summarize(positions, realized_total, quotes), 200
+        except Exception:
+            logger.error(f"Error getting portfolio: {traceback.format_exc()}")
+            return {'error': 'Failed to get portfolio data'}, 500
+
+    async def check_alerts(self, args):
+        try:
+            # First use builds (and loads) the alert index, which reads the database
+            alert_system = await self._run_sync(lambda: self.services.alert_system)
+            db = self.services.db
+            await self._run_sync(alert_system.sync, db)
+            alerts = []
+            symbols = alert_system.engine.symbols()
+            if symbols:
+                quotes, _ = await self._quotes().fetch_quotes(symbols)
+                alerts = await self._run_sync(alert_system.process_quotes, db, list(quotes.values()))
+            return {
+                'alerts_count': len(alerts),
+                'alerts': alerts
+            }, 200
+        except Exception:
+            logger.error(f"Error checking alerts: {traceback.format_exc()}")
+            return {'error': 'Failed to check alerts'}, 500
+
+    async def stream_quotes(self, scope, receive, send):
+        # Same Server-Sent Events as the Flask view, waiting on the event loop instead of a thread
+        start = time.perf_counter()
+        args = dict(parse_qsl(scope['query_string'].decode('latin-1'), keep_blank_values=True))
+        symbols = args.get('symbols', '').split(',')
+        symbols = list(dict.fromkeys(s.strip().upper() for s in symbols if s.strip()))
+        error = None
+        if not symbols:
+            error = 'At least 1 symbol required'
+        elif len(symbols) > self.config.STREAM_MAX_SYMBOLS:
+            error = f'At most {self.config.STREAM_MAX_SYMBOLS} symbols per stream'
+        if error:
+            await self._send_json(send, {'error': error}, 400)
+            metrics.HTTP_REQUEST_SECONDS.labels('GET', '/api/stream', '400').observe(time.perf_counter() - start)
+            return
+
+        loop = asyncio.get_running_loop()
+        ready = asyncio.Event()
+        broadcaster = self.services.broadcaster
+        subscription = broadcaster.subscribe(symbols, lambda: loop.call_soon_threadsafe(ready.set))
+
+        async def watch_disconnect():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+            subscription.close()
+
+        watcher = asyncio.ensure_future(watch_disconnect())
+        try:
+            await send({
+                'type': 'http.response.start',
+                'status': 200,
+                'headers': [(b'content-type', b'text/event-stream; charset=utf-8'),
+                            (b'cache-control', b'no-cache'),
+                            (b'x-accel-buffering', b'no')]
+            })
+            metrics.HTTP_REQUEST_SECONDS.labels('GET', '/api/stream', '200').observe(time.perf_counter() - start)
+            chunk = f"retry: {self.config.STREAM_RETRY_MS}\n\n"
+            while not subscription.closed:
+                await send({'type': 'http.response.body', 'body': chunk.encode(), 'more_body': True})
+                ready.clear()
+                quotes = subscription.get(timeout=0)
+                if not quotes:
+                    try:
+                        await asyncio.wait_for(ready.wait(), self.config.STREAM_HEARTBEAT)
+                        quotes = subscription.get(timeout=0)
+                    except asyncio.TimeoutError:
+                        pass
+                if not quotes:
+                    chunk = ": keep-alive\n\n"
+                    continue
+                chunk = ''.join(f"event: quote\ndata: {json.dumps(quote)}\n\n" for quote in quotes)
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            watcher.cancel()
+            broadcaster.unsubscribe(subscription)
+
+    async def close(self):
+        if self.quotes is not None:
+            await self.quotes.aclose()
+            self.quotes = None
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,171 @@
+import asyncio
+import logging
+import time
+import aiohttp
+from app.http_client import RETRY_STATUSES, UPSTREAM_SECONDS, CircuitOpenError
+from app.stock_api import parse_chart, parse_batch
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncStockAPI:
+    """Non-blocking quote fetching for the ASGI app.
+
+    Wraps a StockAPI and shares its quote cache, circuit breaker, token
+    bucket, retry settings and request counters, so sync and async callers
+    see the same quotes, pace and trip the upstream together and show up in
+    the same metrics; only the HTTP client differs. Must be created and used
+    on one event loop.
+    """
+
+    def __init__(self, stock_api):
+        self.stock_api = stock_api
+        self.cache = stock_api.cache
+        self.http = stock_api.http
+        self.rate_limiter = stock_api.rate_limiter
+        self.batch_size = stock_api.batch_size
+        self.inflight = {}
+        config = stock_api.config
+        trace = aiohttp.TraceConfig()
+        trace.on_connection_create_end.append(self._on_new_connection)
+        self.session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=stock_api.timeout),
+            headers={'User-Agent': 'StockWatcher/1.0'},
+            connector=aiohttp.TCPConnector(limit=config.ASGI_UPSTREAM_CONNECTIONS),
+            trace_configs=[trace]
+        )
+
+    async def _on_new_connection(self, session, context, params):
+        self.http._count('connections_opened')
+
+    async def _acquire(self):
+        while not self.rate_limiter.try_acquire():
+            await asyncio.sleep(1 / self.rate_limiter.rate)
+
+    async def _get(self, url, params=None):
+        """``(status, payload)`` for a GET, with HTTPClient.get's retry, backoff and breaker policy.
+
+        `payload` is the decoded JSON body of a 200 response, else None.
+        """
+        http = self.http
+        if not http.breaker.allow_request():
+            http._count('circuit_rejections')
+            raise CircuitOpenError(f"Circuit open for upstream, skipping {url}")
+
+        max_retries = http.max_retries
+        for attempt in range(max_retries + 1):
+            if attempt:
+                http._count('retries')
+            await self._acquire()
+            http._count('requests')
+            start = time.perf_counter()
+            try:
+                async with self.session.get(url, params=params) as response:
+                    status, headers = response.status, response.headers
+                    payload = await response.json(content_type=None) if status == 200 else None
+            except (asyncio.TimeoutError, aiohttp.ClientConnectionError):
+                UPSTREAM_SECONDS.labels('error').observe(time.perf_counter() - start)
+                if attempt < max_retries:
+                    await asyncio.sleep(http.backoff_delay(attempt))
+                    continue
+                http._count('failures')
+                http.breaker.record_failure()
+                raise
+            except Exception:
+                # aiohttp.ClientError (payload, response errors), a 200 whose body is not
+                # JSON (ValueError), ...: not retried, but the breaker has to hear of it
+                UPSTREAM_SECONDS.labels('error').observe(time.perf_counter() - start)
+                http._count('failures')
+                http.breaker.record_failure()
+                raise
+            UPSTREAM_SECONDS.labels(str(status)).observe(time.perf_counter() - start)
+
+            if status not in RETRY_STATUSES:
+                http.breaker.record_success()
+                return status, payload
+            if attempt < max_retries:
+                await asyncio.sleep(http.backoff_delay(attempt, headers))
+                continue
+            http._count('failures')
+            http.breaker.record_failure()
+            return status, payload
+
+    async def _fetch_chart(self, symbol):
+        try:
+            status, payload = await self._get(f"{self.stock_api.base_url}{symbol}")
+            if status == 200:
+                return parse_chart(symbol, payload), None
+            if status == 404:
+                self.stock_api.symbols.reject(symbol.upper())
+            return None, f"API returned status {status} for {symbol}"
+        except CircuitOpenError:
+            return None, f"Upstream circuit open, not fetching {symbol}"
+        except asyncio.TimeoutError:
+            return None, f"Timeout fetching stock data for {symbol}"
+        except aiohttp.ClientConnectionError:
+            return None, f"Connection error fetching stock data for {symbol}"
+        except Exception as e:
+            return None, f"Error fetching stock data for {symbol}: {e}"
+
+    async def _fetch_batch(self, symbols):
+        try:
+            status, payload = await self._get(self.stock_api.quote_url, params={'symbols': ','.join(symbols)})
+            if status != 200:
+                self.stock_api.batch_working = False
+                return {}
+            quotes = parse_batch(payload['quoteResponse']['result'] or [])
+        except Exception:
+            self.stock_api.batch_working = False
+            return {}
+        self.stock_api.batch_working = True
+        return quotes
+
+    async def _load(self, symbol):
+        stock_data, error = await self._fetch_chart(symbol)
+        if error:
+            logger.warning(error)
+        else:
+            self.stock_api._store(stock_data)
+        return stock_data
+
+    async def get_stock_price(self, symbol):
+        """Async StockAPI.get_stock_price: a cached quote, else one fetch shared by concurrent callers."""
+        key = symbol.upper()
+        data = self.cache.get(key)
+        if data is not None:
+            return data
+        task = self.inflight.get(key)
+        if task is None:
+            task = self.inflight[key] = asyncio.ensure_future(self._load(symbol))
+            task.add_done_callback(lambda _: self.inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def fetch_quotes(self, symbols, allow_stale=False, refresh=False):
+        """Async StockAPI.fetch_quotes with the same batching and ``(results, errors)`` result."""
+        ordered = list(dict.fromkeys(s.upper() for s in symbols))
+        found = {} if refresh else self.cache.get_many(ordered)
+        errors = self.stock_api.unknown_symbols([symbol for symbol in ordered if symbol not in found])
+        missing = [symbol for symbol in ordered if symbol not in found and symbol not in errors]
+
+        if missing and self.batch_size > 1 and len(missing) > 1:
+            batches = [missing[i:i + self.batch_size]
+                       for i in range(0, len(missing), self.batch_size)]
+            for batch_results in await asyncio.gather(*map(self._fetch_batch, batches)):
+                for symbol, stock_data in batch_results.items():
+                    self.stock_api._store(stock_data)
+                    found[symbol] = stock_data
+            missing = [s for s in missing if s not in found]
+
+        if missing:
+            fetched = await asyncio.gather(*map(self._fetch_chart, missing))
+            for symbol, (stock_data, error) in zip(missing, fetched):
+                if error:
+                    errors[symbol] = error
+                else:
+                    self.stock_api._store(stock_data)
+                    found[symbol] = stock_data
+
+        return self.stock_api.collect(ordered, found, errors, allow_stale)
+
+    async def aclose(self):
+        await self.session.close()
@@ -0,0 +1,109 @@
+import functools
+import gzip
+import json
+import os
+import sqlite3
+import time
+
+# Append-only tables are exported incrementally, keyed on their id; the rest
+# are small and exported in full every time. price_bars (rebuilt from ticks)
+# and notifications are only kept in database backups.
+INCREMENTAL_TABLES = ('stock_prices', 'transactions')
+SNAPSHOT_TABLES = ('watchlist', 'portfolio', 'alerts', 'lots', 'holdings')
+
+
+def _open_readonly(db_path):
+    return sqlite3.connect(f'file:{db_path}?mode=ro', uri=True, isolation_level=None)
+
+
+def backup_database(db_path, dest_path, pages=1024, pause=0.0, progress=None):
+    """Copy a live database to `dest_path` with the SQLite online backup API.
+
+    The copy runs `pages` pages per step (sleeping `pause` seconds between
+    steps) inside one read transaction on the source. In WAL mode writers
+    carry on meanwhile, and the copy is the snapshot taken at the start
+    instead of restarting every time they commit. `progress(remaining, total)`
+    is called after each step. The backup is written next to `dest_path` and
+    renamed into place when complete. Returns the number of pages copied.
+    """
+    partial = dest_path + '.part'
+    if os.path.exists(partial):
+        os.remove(partial)
+    source = _open_readonly(db_path)
+    target = sqlite3.connect(partial)
+    copied = 0
+
+    def step(status, remaining, total):
+        nonlocal copied
+        copied = total
+        if progress:
+            progress(remaining, total)
+        if pause and remaining:
+            time.sleep(pause)
+
+    try:
+        source.execute('BEGIN')
+        source.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()  # pin the read snapshot
+        source.backup(target, pages=pages, progress=step)
+        source.execute('COMMIT')
+        target.execute('PRAGMA journal_mode=DELETE')  # a self-contained file, no -wal sidecar
+    except BaseException:
+        target.close()
+        os.remove(partial)
+        raise
+    finally:
+        source.close()
+    target.close()
+    os.replace(partial, dest_path)
+    return copied
+
+
+def export_ndjson(db_path, dest_path, state=None, batch_size=5000):
+    """Stream the tables to newline-delimited JSON, gzipped if `dest_path` ends in .gz.
+
+    Each line is ``{"table": ..., "row": {...}}``. For INCREMENTAL_TABLES only
+    rows with an id above ``state[table]`` (the last id already exported) are
+    written. Every table is read from one snapshot, `batch_size` rows at a
+    time, so memory stays flat however large the database is. Returns
+    ``(state, counts)``: the updated last-exported ids and rows written per
+    table.
+    """
+    state = dict(state or {})
+    counts = {}
+    encode = json.JSONEncoder().encode
+    partial = dest_path + '.part'
+    if dest_path.endswith('.gz'):
+        opener = functools.partial(gzip.open, compresslevel=6)
+    else:
+        opener = open
+    conn = _open_readonly(db_path)
+    try:
+        conn.execute('BEGIN')
+        with opener(partial, 'wt', encoding='utf-8') as out:
+            for table in SNAPSHOT_TABLES + INCREMENTAL_TABLES:
+                incremental = table in INCREMENTAL_TABLES
+                if incremental:
+                    cursor = conn.execute(f'SELECT * FROM {table} WHERE id > ? ORDER BY id',
+                                          (state.get(table, 0),))
+                else:
+                    cursor = conn.execute(f'SELECT * FROM {table}')
+                columns = [column[0] for column in cursor.description]
+                prefix = f'{{"table": "{table}", "row": '
+                counts[table] = 0
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    out.writelines(f'{prefix}{encode(dict(zip(columns, row)))}}}\n' for row in rows)
+                    counts[table] += len(rows)
+                    if incremental:
+                        state[table] = rows[-1][columns.index('id')]
+        conn.execute('COMMIT')
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    finally:
+        conn.close()
+    os.replace(partial, dest_path)
+    return state, counts
@@ -0,0 +1,321 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class QuoteCache:
+    """Bounded, thread-safe LRU cache with per-entry TTL.
+
+    Entries younger than `ttl` are fresh. Entries older than that but within
+    `ttl + stale_ttl` are served as-is by `get_or_load` while a single
+    background refresh runs. Concurrent misses for the same key share one
+    loader call (single-flight). Loaders returning None are not cached.
+
+    An optional `backend` (see SharedQuoteCache) acts as a second tier shared
+    with other processes: local misses consult it before loading, keeping the
+    original fetch time so TTLs still count from the upstream fetch, and new
+    values are written through to it.
+
+    After `track_demand`, lookups are also counted per key until collected
+    with `take_demand` (the price refresher uses them to prioritise).
+    """
+
+    def __init__(self, max_size=1024, ttl=60, stale_ttl=0, backend=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.backend = backend
+        self.entries = OrderedDict()
+        self.inflight = {}
+        self.refreshing = set()
+        self.demand = None  # key -> lookups since the last take_demand, while tracking
+        self.lock = threading.Lock()
+        self.counters = {
+            'hits': 0,
+            'stale_hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'evictions': 0,
+            'refreshes': 0,
+            'shared_hits': 0
+        }
+
+    def _lookup(self, key, now):
+        # Returns (value, is_fresh); caller holds the lock.
+        entry = self.entries.get(key)
+        if entry is None:
+            return None, False
+        value, stored_at = entry
+        age = now - stored_at
+        if age < self.ttl:
+            self.entries.move_to_end(key)
+            return value, True
+        if age < self.ttl + self.stale_ttl:
+            self.entries.move_to_end(key)
+            return value, False
+        del self.entries[key]
+        return None, False
+
+    def _set_locked(self, key, value, stored_at):
+        self.entries[key] = (value, stored_at)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.counters['evictions'] += 1
+
+    def _from_backend(self, key):
+        if self.backend is None:
+            return None
+        entry = self.backend.get(key)
+        if entry is None:
+            return None
+        value, stored_at = entry
+        if time.time() - stored_at >= self.ttl:
+            return None
+        with self.lock:
+            self._set_locked(key, value, stored_at)
+            self.counters['shared_hits'] += 1
+        return value
+
+    def get(self, key):
+        with self.lock:
+            if self.demand is not None:
+                self.demand[key] = self.demand.get(key, 0) + 1
+            value, fresh = self._lookup(key, time.time())
+            if fresh:
+                self.counters['hits'] += 1
+                return value
+        value = self._from_backend(key)
+        if value is None:
+            with self.lock:
+                self.counters['misses'] += 1
+        return value
+
+    def get_many(self, keys):
+        """Fresh values for `keys` as a dict, taking the lock once for all local hits."""
+        found = {}
+        missing = []
+        now = time.time()
+        with self.lock:
+            demand = self.demand
+            for key in keys:
+                if demand is not None:
+                    demand[key] = demand.get(key, 0) + 1
+                value, fresh = self._lookup(key, now)
+                if fresh:
+                    found[key] = value
+                else:
+                    missing.append(key)
+            self.counters['hits'] += len(found)
+        for key in missing:
+            value = self._from_backend(key)
+            if value is None:
+                with self.lock:
+                    self.counters['misses'] += 1
+            else:
+                found[key] = value
+        return found
+
+    def set(self, key, value, stored_at=None):
+        stored_at = stored_at or time.time()
+        with self.lock:
+            self._set_locked(key, value, stored_at)
+        if self.backend is not None:
+            self.backend.set(key, value, stored_at)
+
+    def peek(self, key):
+        # Last stored value regardless of age, without touching LRU order or stats
+        with self.lock:
+            entry = self.entries.get(key)
+        return entry[0] if entry else None
+
+    def stored_at(self, key):
+        # Fetch time of the stored value regardless of age, None if not cached
+        with self.lock:
+            entry = self.entries.get(key)
+        return entry[1] if entry else None
+
+    def oldest(self, keys):
+        # Fetch time of the oldest stored value among `keys`, None if any is not cached
+        with self.lock:
+            oldest = time.time()
+            for key in keys:
+                entry = self.entries.get(key)
+                if entry is None:
+                    return None
+                oldest = min(oldest, entry[1])
+        return oldest
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def track_demand(self):
+        with self.lock:
+            if self.demand is None:
+                self.demand = {}
+
+    def take_demand(self):
+        """Lookup counts per key since the previous call, resetting them."""
+        with self.lock:
+            demand = self.demand or {}
+            if self.demand is not None:
+                self.demand = {}
+        return demand
+
+    def get_or_load(self, key, loader):
+        with self.lock:
+            if self.demand is not None:
+                self.demand[key] = self.demand.get(key, 0) + 1
+            value, fresh = self._lookup(key, time.time())
+            if fresh:
+                self.counters['hits'] += 1
+                return value
+            if value is not None:
+                self.counters['stale_hits'] += 1
+                if key not in self.refreshing and key not in self.inflight:
+                    self.refreshing.add(key)
+                    self.counters['refreshes'] += 1
+                    threading.Thread(target=self._refresh, args=(key, loader), daemon=True).start()
+                return value
+
+            flight = self.inflight.get(key)
+            if flight is not None:
+                self.counters['coalesced'] += 1
+                leader = False
+            else:
+                self.counters['misses'] += 1
+                flight = self.inflight[key] = _Flight()
+                leader = True
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        loaded = False
+        try:
+            flight.value = self._from_backend(key)
+            if flight.value is None:
+                flight.value = loader()
+                loaded = flight.value is not None
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            stored_at = time.time()
+            with self.lock:
+                if loaded:
+                    self._set_locked(key, flight.value, stored_at)
+                del self.inflight[key]
+            flight.event.set()
+        if loaded and self.backend is not None:
+            self.backend.set(key, flight.value, stored_at)
+        return flight.value
+
+    def _refresh(self, key, loader):
+        try:
+            # Another process may already have refreshed the shared tier
+            if self._from_backend(key) is None:
+                value = loader()
+                if value is not None:
+                    self.set(key, value)
+        except Exception:
+            pass
+        finally:
+            with self.lock:
+                self.refreshing.discard(key)
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+            stats['size'] = len(self.entries)
+            stats['max_size'] = self.max_size
+            stats['inflight'] = len(self.inflight)
+        lookups = stats['hits'] + stats['stale_hits'] + stats['misses'] + stats['coalesced']
+        stats['hit_ratio'] = (stats['hits'] + stats['stale_hits']) / lookups if lookups else 0.0
+        return stats
+
+    def __len__(self):
+        with self.lock:
+            return len(self.entries)
+
+
+class SharedQuoteCache:
+    """Quote cache shared by every process on the host through SQLite.
+
+    Backed by a WAL-mode table so gunicorn workers and the alert monitor can
+    read concurrently while one of them writes. Each thread gets its own
+    connection. Errors are logged and treated as misses so a locked or
+    missing file never breaks quote fetching.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        conn = self._connect()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS quote_cache (
+                symbol TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                stored_at REAL NOT NULL
+            ) WITHOUT ROWID
+        ''')
+        conn.commit()
+
+    def _connect(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = conn
+        return conn
+
+    def get(self, key):
+        try:
+            row = self._connect().execute(
+                'SELECT data, stored_at FROM quote_cache WHERE symbol = ?', (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache read failed for {key}: {e}")
+            return None
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, key, value, stored_at):
+        try:
+            conn = self._connect()
+            conn.execute(
+                '''INSERT INTO quote_cache (symbol, data, stored_at) VALUES (?, ?, ?)
+                   ON CONFLICT(symbol) DO UPDATE SET data = excluded.data, stored_at = excluded.stored_at
+                   WHERE excluded.stored_at > quote_cache.stored_at''',
+                (key, json.dumps(value), stored_at)
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache write failed for {key}: {e}")
+
+    def purge(self, max_age):
+        conn = self._connect()
+        cursor = conn.execute('DELETE FROM quote_cache WHERE stored_at < ?', (time.time() - max_age,))
+        conn.commit()
+        return cursor.rowcount
@@ -0,0 +1,144 @@
+import importlib.util
+import itertools
+import os
+from datetime import datetime, timezone
+
+# pyarrow is optional (only needed once ticks are archived) and slow to import,
+# so it is imported where it is used rather than here.
+
+
+def available():
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def month_start(ts):
+    moment = datetime.fromtimestamp(ts, timezone.utc)
+    return int(datetime(moment.year, moment.month, 1, tzinfo=timezone.utc).timestamp())
+
+
+def next_month(start):
+    moment = datetime.fromtimestamp(start, timezone.utc)
+    year, month = (moment.year + 1, 1) if moment.month == 12 else (moment.year, moment.month + 1)
+    return int(datetime(year, month, 1, tzinfo=timezone.utc).timestamp())
+
+
+def month_label(start):
+    return datetime.fromtimestamp(start, timezone.utc).strftime('%Y-%m')
+
+
+def parse_month(label):
+    return int(datetime.strptime(label, '%Y-%m').replace(tzinfo=timezone.utc).timestamp())
+
+
+class ColdStore:
+    """Aged stock_prices ticks in zstd-compressed Parquet, one file per symbol and month.
+
+    Files are ``<root>/symbol=<SYMBOL>/month=<YYYY-MM>/ticks.parquet`` with
+    id, price, currency and timestamp columns sorted by timestamp. The layout
+    is hive-partitioned, so ``pyarrow.dataset.dataset(root, partitioning='hive')``
+    reads the whole archive for backtests. Months are UTC calendar months.
+    """
+
+    FILENAME = 'ticks.parquet'
+
+    def __init__(self, root, compression='zstd'):
+        self.root = root
+        self.compression = compression
+
+    def path(self, symbol, month):
+        return os.path.join(self.root, f'symbol={symbol}', f'month={month}', self.FILENAME)
+
+    def months(self, symbol):
+        # Archived months for a symbol, newest first
+        try:
+            names = os.listdir(os.path.join(self.root, f'symbol={symbol}'))
+        except FileNotFoundError:
+            return []
+        return sorted((name[6:] for name in names if name.startswith('month=')), reverse=True)
+
+    def write(self, symbol, month, ids, prices, currencies, timestamps):
+        """Merge ticks into a symbol's month file, skipping ids it already holds."""
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+
+        table = pa.table({
+            'id': pa.array(ids, pa.int64()),
+            'price': pa.array(prices, pa.float64()),
+            'currency': pa.array(currencies, pa.string()),
+            'timestamp': pa.array(timestamps, pa.int64())
+        })
+        path = self.path(symbol, month)
+        if os.path.exists(path):
+            existing = pq.read_table(path)
+            table = table.filter(pc.invert(pc.is_in(table['id'], value_set=existing['id'].combine_chunks())))
+            table = pa.concat_tables([existing, table])
+        table = table.sort_by([('timestamp', 'ascending'), ('id', 'ascending')])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        pq.write_table(table, path + '.part', compression=self.compression)
+        os.replace(path + '.part', path)
+
+    def archive(self, conn, cutoff):
+        """Move ticks older than `cutoff` from stock_prices on `conn` into Parquet files.
+
+        Works a month at a time: every symbol's ticks for the month are read
+        and written (so memory is bounded by one symbol-month), then the month
+        is deleted from SQLite in one transaction. A crash at worst leaves a
+        month in both tiers, which the next run merges without duplicating.
+        Ticks inserted while this runs are left for the next run. Returns the
+        number of ticks moved.
+        """
+        first, last_id = conn.execute('SELECT MIN(timestamp), MAX(id) FROM stock_prices').fetchone()
+        if first is None or first >= cutoff:
+            return 0
+        moved = 0
+        start = month_start(first)
+        while start < cutoff:
+            end = min(next_month(start), cutoff)
+            bounds = (start, end, last_id)
+            symbols = [row[0] for row in conn.execute(
+                'SELECT DISTINCT symbol FROM stock_prices WHERE timestamp >= ? AND timestamp < ? AND id <= ?',
+                bounds
+            )]
+            for symbol in symbols:
+                rows = conn.execute(
+                    '''SELECT id, price, currency, timestamp FROM stock_prices
+                       WHERE symbol = ? AND timestamp >= ? AND timestamp < ? AND id <= ?''',
+                    (symbol,) + bounds
+                ).fetchall()
+                self.write(symbol, month_label(start), *zip(*rows))
+            cursor = conn.execute(
+                'DELETE FROM stock_prices WHERE timestamp >= ? AND timestamp < ? AND id <= ?',
+                bounds
+            )
+            conn.commit()
+            moved += cursor.rowcount
+            start = end
+        return moved
+
+    def read(self, symbol, start=None, end=None, limit=None):
+        """(price, timestamp) ticks for a symbol in [start, end], newest first."""
+        rows = []
+        months = self.months(symbol)
+        if not months:
+            return rows
+        import pyarrow.parquet as pq
+
+        for month in months:
+            first = parse_month(month)
+            if end is not None and first > end:
+                continue
+            if start is not None and next_month(first) <= start:
+                break
+            filters = []
+            if start is not None:
+                filters.append(('timestamp', '>=', start))
+            if end is not None:
+                filters.append(('timestamp', '<=', end))
+            table = pq.read_table(self.path(symbol, month), columns=['price', 'timestamp'],
+                                  filters=filters or None)
+            ticks = zip(table.column('price').to_pylist(), table.column('timestamp').to_pylist())
+            rows.extend(itertools.islice(reversed(list(ticks)), None if limit is None else limit - len(rows)))
+            if limit is not None and len(rows) >= limit:
+                break
+        return rows
@@ -0,0 +1,101 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from app.migrations import migrate
+
+
+class ConnectionManager:
+    """Pool of reusable SQLite connections for one database file.
+
+    Connections are opened lazily, tuned once (WAL journal, NORMAL sync,
+    larger page cache) and returned to the pool after each use, so the
+    per-connection prepared-statement cache survives across requests. Use
+    `for_path` to share one manager between Database, Portfolio and friends;
+    `ensure_schema` then migrates the file once per process for all of them.
+    """
+
+    _managers = {}
+    _managers_lock = threading.Lock()
+
+    def __init__(self, db_path, pool_size=8, timeout=5.0, cache_size_kb=16384,
+                 cached_statements=256):
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.cache_size_kb = cache_size_kb
+        self.cached_statements = cached_statements
+        self.pool = queue.LifoQueue(maxsize=pool_size)
+        self.lock = threading.Lock()
+        self.opened = 0
+        self.schema_lock = threading.Lock()
+        self.schema_ready = False
+
+    @classmethod
+    def for_path(cls, db_path, **kwargs):
+        key = os.path.abspath(db_path)
+        with cls._managers_lock:
+            manager = cls._managers.get(key)
+            if manager is None:
+                manager = cls._managers[key] = cls(db_path, **kwargs)
+            return manager
+
+    def _open(self):
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False,
+                               cached_statements=self.cached_statements)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA cache_size=-{int(self.cache_size_kb)}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        with self.lock:
+            self.opened += 1
+        return conn
+
+    def ensure_schema(self):
+        if self.schema_ready:
+            return
+        with self.schema_lock:
+            if not self.schema_ready:
+                with self.connection() as conn:
+                    migrate(conn)
+                self.schema_ready = True
+
+    def acquire(self):
+        try:
+            return self.pool.get_nowait()
+        except queue.Empty:
+            return self._open()
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            self.pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    @contextmanager
+    def transaction(self):
+        with self.connection() as conn:
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    def close_all(self):
+        while True:
+            try:
+                self.pool.get_nowait().close()
+            except queue.Empty:
+                break
@@ -1,107 +1,387 @@
-import sqlite3
+import atexit
 import os
+import threading
+import time
 from datetime import datetime
+from app import metrics, rollups
+from app.connection import ConnectionManager
+from app.tick_writer import TickWriter
+from config import Config
 
+CALL_SECONDS = metrics.histogram('stockwatcher_database_call_seconds', 'Database method latency',
+                                 labels=('method',))
+
+
+def _watchlist_version(conn):
+    return conn.execute('SELECT MAX(version) FROM watchlist_changes').fetchone()[0] or 0
+
+
+def _alert_version(conn):
+    return conn.execute('SELECT MAX(version) FROM alert_changes').fetchone()[0] or 0
+
+
+def _newest_first(row):
+    # Sort key matching ORDER BY created_at DESC, id DESC (with reverse=True)
+    return row[4] or '', row[0]
+
+
+class WatchlistSnapshot:
+    """In-memory copy of the watchlist as of `version` of the watchlist_changes log."""
+
+    COLUMNS = 'id, symbol, target_price, alert_enabled, created_at'
+
+    def __init__(self, version, rows):
+        self.version = version
+        self.entries = {row[1]: row for row in rows}
+        self.rows = [row[1:4] for row in rows]
+
+    @classmethod
+    def load(cls, conn, version):
+        return cls(version, conn.execute(
+            f'SELECT {cls.COLUMNS} FROM watchlist ORDER BY created_at DESC, id DESC'
+        ).fetchall())
+
+    def apply(self, conn, version):
+        # Re-reads only the symbols logged after our version. Entries keep
+        # their place (newest first); re-added symbols go to the front
+        symbols = [row[0] for row in conn.execute(
+            'SELECT DISTINCT symbol FROM watchlist_changes WHERE version > ? AND version <= ?',
+            (self.version, version)
+        )]
+        fetched = {}
+        for i in range(0, len(symbols), 500):
+            chunk = symbols[i:i + 500]
+            fetched.update((row[1], row) for row in conn.execute(
+                f"SELECT {self.COLUMNS} FROM watchlist WHERE symbol IN ({','.join('?' * len(chunk))})", chunk
+            ))
+        added = []
+        for symbol in symbols:
+            row = fetched.get(symbol)
+            current = self.entries.get(symbol)
+            if row is not None and current is not None and row[0] == current[0]:
+                self.entries[symbol] = row
+                continue
+            self.entries.pop(symbol, None)
+            if row is not None:
+                added.append(row)
+        if added:
+            added.sort(key=_newest_first, reverse=True)
+            first = next(iter(self.entries.values()), None)
+            entries = added + list(self.entries.values())
+            if first is not None and _newest_first(added[-1]) < _newest_first(first):
+                entries.sort(key=_newest_first, reverse=True)
+            self.entries = {row[1]: row for row in entries}
+        self.rows = [row[1:4] for row in self.entries.values()]
+        self.version = version
+
+
+@metrics.instrument(CALL_SECONDS)
 class Database:
-    def __init__(self, db_path='stock_data.db'):
-        self.db_path = db_path
+    def __init__(self, db_path=None, connections=None, write_behind=False, cold_store=None, config=None):
+        self.config = config or Config()
+        self.connections = connections or ConnectionManager.for_path(db_path or self.config.DATABASE_PATH)
+        self.db_path = self.connections.db_path
+        self.cold_store = cold_store  # archived ticks (app.cold_storage.ColdStore), if any
+        self.listeners = []
+        self.watchlist = None  # WatchlistSnapshot, loaded on first read
+        self.watchlist_lock = threading.Lock()
         self.init_db()
-    
+
+        # Price ticks are queued and written in batches off the request path
+        self.tick_writer = None
+        if write_behind:
+            self.tick_writer = TickWriter(self.connections,
+                                          batch_size=self.config.TICK_BATCH_SIZE,
+                                          flush_interval=self.config.TICK_FLUSH_INTERVAL).start()
+            atexit.register(self.close)
+
+    def close(self):
+        if self.tick_writer:
+            self.tick_writer.stop()
+
+    def ingest_stats(self):
+        return self.tick_writer.stats() if self.tick_writer else None
+
     def init_db(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS stock_prices (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                symbol TEXT NOT NULL,
-                price REAL NOT NULL,
-                currency TEXT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS watchlist (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                symbol TEXT NOT NULL UNIQUE,
-                target_price REAL,
-                alert_enabled BOOLEAN DEFAULT TRUE,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
-    
+        self.connections.ensure_schema()
+
     def save_stock_price(self, symbol, price, currency):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            'INSERT INTO stock_prices (symbol, price, currency) VALUES (?, ?, ?)',
-            (symbol, price, currency)
-        )
-        
-        conn.commit()
-        conn.close()
-    
-    def get_stock_history(self, symbol, limit=100):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            'SELECT price, timestamp FROM stock_prices WHERE symbol = ? ORDER BY timestamp DESC LIMIT ?',
-            (symbol, limit)
-        )
-        
-        results = cursor.fetchall()
-        conn.close()
-        return results
-    
-    def add_to_watchlist(self, symbol, target_price=None):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute(
-                'INSERT INTO watchlist (symbol, target_price) VALUES (?, ?)',
-                (symbol, target_price)
+        if self.tick_writer:
+            self.tick_writer.submit(symbol, price, currency)
+            return
+        tick = (symbol, price, currency, int(time.time()))
+        with self.connections.transaction() as conn:
+            conn.execute(
+                'INSERT INTO stock_prices (symbol, price, currency, timestamp) VALUES (?, ?, ?, ?)',
+                tick
             )
-            conn.commit()
-            return True
-        except sqlite3.IntegrityError:
-            # Symbol already exists
-            return False
-        finally:
-            conn.close()
-    
-    def get_watchlist(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT symbol, target_price, alert_enabled FROM watchlist ORDER BY created_at DESC')
-        results = cursor.fetchall()
-        conn.close()
-        return results
-    
+            rollups.apply_ticks(conn, [tick])
+
+    def history_resolution(self, limit, start=None, end=None, resolution=None):
+        # Resolution get_stock_history will use for these arguments
+        if resolution is None and start is None and end is None:
+            return 'raw'
+        if resolution not in (None, 'auto'):
+            return resolution
+        limit = min(limit, self.config.MAX_HISTORY_RECORDS)
+        end = end if end is not None else int(time.time())
+        start = start if start is not None else end - limit * rollups.RESOLUTIONS['1d']
+        return rollups.choose_resolution(start, end, limit)
+
+    def get_stock_history(self, symbol, limit=100, start=None, end=None, resolution=None):
+        """Price history for a symbol, newest first.
+
+        Without `start`/`end`/`resolution` (or with resolution='raw') this
+        returns raw (price, timestamp) ticks. Otherwise it returns OHLC bars as
+        (timestamp, open, high, low, close, ticks) at the given resolution
+        ('1m', '1h', '1d'), or at the finest one that covers the range in
+        `limit` bars. Times are epoch seconds; the result never exceeds
+        MAX_HISTORY_RECORDS rows. Raw ticks that have been archived to
+        the cold store are read from there once the hot table runs out.
+        """
+        limit = min(limit, self.config.MAX_HISTORY_RECORDS)
+        resolution = self.history_resolution(limit, start, end, resolution)
+        with self.connections.connection() as conn:
+            if resolution != 'raw':
+                return rollups.get_bars(conn, symbol, resolution, start, end, limit)
+            rows = conn.execute(
+                '''SELECT price, timestamp FROM stock_prices
+                   WHERE symbol = ? AND timestamp >= ? AND timestamp <= ?
+                   ORDER BY timestamp DESC LIMIT ?''',
+                (symbol, start or 0, end if end is not None else 2 ** 62, limit)
+            ).fetchall()
+        if len(rows) < limit and self.cold_store is not None:
+            # Everything archived is older than what is left in the hot table
+            cold_end = rows[-1][1] - 1 if rows else end
+            rows += self.cold_store.read(symbol, start, cold_end, limit - len(rows))
+        return rows
+
+    def get_ticks_since(self, symbol, after_id=0, limit=None):
+        # (id, price, timestamp) ticks newer than after_id, oldest first;
+        # with a limit only the newest `limit` of them are returned
+        with self.connections.connection() as conn:
+            rows = conn.execute(
+                'SELECT id, price, timestamp FROM stock_prices WHERE symbol = ? AND id > ? ORDER BY id DESC LIMIT ?',
+                (symbol, after_id, limit if limit is not None else -1)
+            ).fetchall()
+        rows.reverse()
+        return rows
+
+    def subscribe(self, callback):
+        # callback(event, payload) runs after commit: ('alert_upserted', row) or ('alert_removed', id)
+        self.listeners.append(callback)
+
+    def _notify(self, event, payload):
+        for callback in self.listeners:
+            callback(event, payload)
+
+    def _alert_rows(self, conn, where, params):
+        return conn.execute(
+            f'''SELECT id, symbol, condition, threshold, band_pct, cooldown, enabled, last_triggered
+                FROM alerts WHERE {where}''',
+            params
+        ).fetchall()
+
+    def add_to_watchlist(self, symbol, target_price=None):
+        return bool(self.edit_watchlist(add=[(symbol, target_price)])['added'])
+
     def remove_from_watchlist(self, symbol):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('DELETE FROM watchlist WHERE symbol = ?', (symbol,))
-        conn.commit()
-        conn.close()
-        return cursor.rowcount > 0
-    
+        return bool(self.edit_watchlist(remove=[symbol])['removed'])
+
     def update_alert_status(self, symbol, enabled):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute(
+        return bool(self.edit_watchlist(update=[(symbol, enabled)])['updated'])
+
+    def edit_watchlist(self, add=(), remove=(), update=()):
+        """Apply many watchlist edits in one transaction.
+
+        `add` holds (symbol, target_price) pairs, `remove` symbols and
+        `update` (symbol, alert_enabled) pairs, applied in that order. Returns
+        the symbols added, removed and updated, the ones skipped as
+        already_listed (add) or not_listed (remove, update), and the
+        watchlist version after the edits.
+        """
+        result = {'added': [], 'removed': [], 'updated': [], 'already_listed': [], 'not_listed': []}
+        events = []
+        with self.connections.transaction() as conn:
+            for symbol, target_price in add:
+                alerts = self._watchlist_add(conn, symbol, target_price)
+                if alerts is None:
+                    result['already_listed'].append(symbol)
+                    continue
+                result['added'].append(symbol)
+                events.extend(('alert_upserted', row) for row in alerts)
+            for symbol in remove:
+                alert_ids = self._watchlist_remove(conn, symbol)
+                if alert_ids is None:
+                    result['not_listed'].append(symbol)
+                    continue
+                result['removed'].append(symbol)
+                events.extend(('alert_removed', alert_id) for alert_id in alert_ids)
+            for symbol, enabled in update:
+                alerts = self._watchlist_update(conn, symbol, enabled)
+                if alerts is None:
+                    result['not_listed'].append(symbol)
+                    continue
+                result['updated'].append(symbol)
+                events.extend(('alert_upserted', row) for row in alerts)
+            changes = [(symbol, change) for change in ('added', 'removed', 'updated') for symbol in result[change]]
+            result['version'] = self._log_watchlist_changes(conn, changes)
+            if events:
+                self._trim_alert_changes(conn)
+        for event, payload in events:
+            self._notify(event, payload)
+        return result
+
+    def _watchlist_add(self, conn, symbol, target_price):
+        # The watchlist alert rows created with the entry, None if the symbol is already listed
+        if target_price is not None:
+            target_price = float(target_price)
+        cursor = conn.execute(
+            'INSERT OR IGNORE INTO watchlist (symbol, target_price) VALUES (?, ?)',
+            (symbol, target_price)
+        )
+        if not cursor.rowcount:
+            return None
+        if target_price is None:
+            return []
+        cursor = conn.execute(
+            "INSERT INTO alerts (symbol, condition, threshold, source) VALUES (?, 'near', ?, 'watchlist')",
+            (symbol, target_price)
+        )
+        return self._alert_rows(conn, 'id = ?', (cursor.lastrowid,))
+
+    def _watchlist_remove(self, conn, symbol):
+        # Ids of the watchlist alerts removed with the entry, None if the symbol is not listed
+        cursor = conn.execute('DELETE FROM watchlist WHERE symbol = ?', (symbol,))
+        if not cursor.rowcount:
+            return None
+        alert_ids = [row[0] for row in conn.execute(
+            "SELECT id FROM alerts WHERE symbol = ? AND source = 'watchlist'", (symbol,))]
+        conn.execute("DELETE FROM alerts WHERE symbol = ? AND source = 'watchlist'", (symbol,))
+        return alert_ids
+
+    def _watchlist_update(self, conn, symbol, enabled):
+        # The entry's watchlist alert rows after the update, None if the symbol is not listed
+        cursor = conn.execute(
             'UPDATE watchlist SET alert_enabled = ? WHERE symbol = ?',
             (enabled, symbol)
         )
-        conn.commit()
-        conn.close()
-        return cursor.rowcount > 0
\ No newline at end of file
+        if not cursor.rowcount:
+            return None
+        conn.execute(
+            "UPDATE alerts SET enabled = ? WHERE symbol = ? AND source = 'watchlist'",
+            (enabled, symbol)
+        )
+        return self._alert_rows(conn, "symbol = ? AND source = 'watchlist'", (symbol,))
+
+    def _log_watchlist_changes(self, conn, changes):
+        # Appends (symbol, change) rows and trims the log; returns the watchlist version
+        if changes:
+            conn.executemany('INSERT INTO watchlist_changes (symbol, change) VALUES (?, ?)', changes)
+        version = _watchlist_version(conn)
+        if changes:
+            conn.execute('DELETE FROM watchlist_changes WHERE version <= ?',
+                         (version - self.config.WATCHLIST_CHANGES_KEEP,))
+        return version
+
+    def watchlist_version(self):
+        """Change counter of the watchlist, bumped by every edit from any process."""
+        with self.connections.connection() as conn:
+            return _watchlist_version(conn)
+
+    def get_watchlist(self):
+        # (symbol, target_price, alert_enabled) rows, newest first, served from an
+        # in-memory snapshot; a version check is the only query while nothing changed
+        with self.connections.connection() as conn:
+            version = _watchlist_version(conn)
+            with self.watchlist_lock:
+                snapshot = self.watchlist
+                if snapshot is None or not 0 <= version - snapshot.version <= self.config.WATCHLIST_CHANGES_KEEP:
+                    snapshot = self.watchlist = WatchlistSnapshot.load(conn, version)
+                elif snapshot.version != version:
+                    snapshot.apply(conn, version)
+                return list(snapshot.rows)
+
+    def get_watchlist_changes(self, since):
+        """(version, changes) after version `since`, as (version, symbol, change, changed_at) rows.
+
+        Changes is None when `since` is older than the kept log (or newer than
+        the database), in which case the caller has to reload the watchlist.
+        """
+        with self.connections.connection() as conn:
+            version = _watchlist_version(conn)
+            if not 0 <= version - since <= self.config.WATCHLIST_CHANGES_KEEP:
+                return version, None
+            return version, conn.execute(
+                'SELECT version, symbol, change, changed_at FROM watchlist_changes WHERE version > ? ORDER BY version',
+                (since,)
+            ).fetchall()
+
+    def _trim_alert_changes(self, conn):
+        # The triggers on alerts append to the log; keep only its newest rows
+        conn.execute('DELETE FROM alert_changes WHERE version <= ?',
+                     (_alert_version(conn) - self.config.ALERT_CHANGES_KEEP,))
+
+    def alerts_version(self):
+        """Change counter of the alerts table, bumped by every write from any process."""
+        with self.connections.connection() as conn:
+            return _alert_version(conn)
+
+    def get_alert_changes(self, since):
+        """(version, rows, removed_ids) for alerts changed after version `since`.
+
+        Rows are the changed alerts as get_alerts returns them, removed_ids
+        the changed ids that no longer exist. Rows is None when `since` is
+        older than the kept log (or newer than the database): reload then.
+        """
+        with self.connections.connection() as conn:
+            version = _alert_version(conn)
+            if version == since:
+                return version, [], []
+            if not 0 < version - since <= self.config.ALERT_CHANGES_KEEP:
+                return version, None, None
+            alert_ids = [row[0] for row in conn.execute(
+                'SELECT DISTINCT alert_id FROM alert_changes WHERE version > ? AND version <= ?',
+                (since, version)
+            )]
+            rows = []
+            for i in range(0, len(alert_ids), 500):
+                chunk = alert_ids[i:i + 500]
+                rows.extend(self._alert_rows(conn, f"id IN ({','.join('?' * len(chunk))})", chunk))
+        found = {row[0] for row in rows}
+        return version, rows, [alert_id for alert_id in alert_ids if alert_id not in found]
+
+    def get_alerts(self, symbol=None):
+        # (id, symbol, condition, threshold, band_pct, cooldown, enabled, last_triggered)
+        with self.connections.connection() as conn:
+            if symbol:
+                return self._alert_rows(conn, 'symbol = ? ORDER BY id', (symbol,))
+            return self._alert_rows(conn, '1 ORDER BY id', ())
+
+    def add_alert(self, symbol, condition, threshold, band_pct=2.0, cooldown=3600):
+        with self.connections.transaction() as conn:
+            cursor = conn.execute(
+                'INSERT INTO alerts (symbol, condition, threshold, band_pct, cooldown) VALUES (?, ?, ?, ?, ?)',
+                (symbol, condition, threshold, band_pct, cooldown)
+            )
+            row = self._alert_rows(conn, 'id = ?', (cursor.lastrowid,))[0]
+            self._trim_alert_changes(conn)
+        self._notify('alert_upserted', row)
+        return row[0]
+
+    def remove_alert(self, alert_id):
+        with self.connections.transaction() as conn:
+            cursor = conn.execute('DELETE FROM alerts WHERE id = ?', (alert_id,))
+            self._trim_alert_changes(conn)
+        if cursor.rowcount:
+            self._notify('alert_removed', alert_id)
+        return cursor.rowcount > 0
+
+    def mark_alerts_triggered(self, triggered):
+        # triggered: iterable of (alert_id, timestamp)
+        with self.connections.transaction() as conn:
+            conn.executemany(
+                'UPDATE alerts SET last_triggered = ? WHERE id = ?',
+                [(timestamp, alert_id) for alert_id, timestamp in triggered]
+            )
+            self._trim_alert_changes(conn)
@@ -0,0 +1,206 @@
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from app import metrics
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Per attempt, by response status ('error' for timeouts and connection errors)
+UPSTREAM_SECONDS = metrics.histogram('stockwatcher_upstream_request_seconds', 'Quote provider request latency',
+                                     labels=('status',))
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """Stops calls to a failing upstream for `reset_timeout` seconds.
+
+    After `failure_threshold` consecutive failures the circuit opens. Once the
+    timeout has passed a single trial request is let through (half-open); its
+    outcome closes the circuit again or re-opens it. A trial that reports no
+    outcome within `reset_timeout` is given up on and another is allowed.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.open_count = 0
+        self.trial_in_flight = False
+        self.trial_started = 0.0
+        self.lock = threading.Lock()
+
+    def allow_request(self):
+        with self.lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self.trial_in_flight = False
+            now = time.monotonic()
+            if self.trial_in_flight and now - self.trial_started < self.reset_timeout:
+                return False
+            self.trial_in_flight = True
+            self.trial_started = now
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.open_count += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+def _counting_pool_class(pool_class, on_new_connection):
+    def _new_conn(self):
+        on_new_connection()
+        return pool_class._new_conn(self)
+
+    return type(pool_class.__name__, (pool_class,), {'_new_conn': _new_conn})
+
+
+class CountingAdapter(HTTPAdapter):
+    """HTTPAdapter that reports every new TCP connection it opens."""
+
+    def __init__(self, on_new_connection, **kwargs):
+        self.on_new_connection = on_new_connection
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            scheme: _counting_pool_class(pool_class, self.on_new_connection)
+            for scheme, pool_class in self.poolmanager.pool_classes_by_scheme.items()
+        }
+
+
+class HTTPClient:
+    """Pooled keep-alive session with retries, backoff and a circuit breaker.
+
+    429 and 5xx responses, timeouts and connection errors are retried up to
+    `max_retries` times with full-jitter exponential backoff (a numeric
+    Retry-After header is honoured, capped at `backoff_max`). When every
+    attempt fails the breaker records a failure; while it is open `get`
+    raises CircuitOpenError without touching the network.
+    """
+
+    def __init__(self, pool_size=10, timeout=10, max_retries=3, backoff_base=0.25,
+                 backoff_max=4.0, breaker=None, rate_limiter=None):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.rate_limiter = rate_limiter
+
+        self.stats = {
+            'requests': 0,
+            'retries': 0,
+            'failures': 0,
+            'connections_opened': 0,
+            'circuit_rejections': 0
+        }
+        self.stats_lock = threading.Lock()
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            'User-Agent': 'StockWatcher/1.0',
+            'Connection': 'keep-alive'
+        })
+        adapter = CountingAdapter(self._on_new_connection, pool_connections=pool_size,
+                                  pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _on_new_connection(self):
+        self._count('connections_opened')
+
+    def _count(self, key, amount=1):
+        with self.stats_lock:
+            self.stats[key] += amount
+
+    def backoff_delay(self, attempt, headers=None):
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        if headers is not None:
+            retry_after = headers.get('Retry-After')
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, min(float(retry_after), self.backoff_max))
+        return delay
+
+    def _backoff(self, attempt, response=None):
+        time.sleep(self.backoff_delay(attempt, response.headers if response is not None else None))
+
+    def get(self, url, params=None):
+        if not self.breaker.allow_request():
+            self._count('circuit_rejections')
+            raise CircuitOpenError(f"Circuit open for upstream, skipping {url}")
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self._count('retries')
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+            self._count('requests')
+            start = time.perf_counter()
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
+                UPSTREAM_SECONDS.labels('error').observe(time.perf_counter() - start)
+                if attempt < self.max_retries:
+                    self._backoff(attempt)
+                    continue
+                self._count('failures')
+                self.breaker.record_failure()
+                raise
+            except Exception:
+                # Anything else (broken chunked body, redirect loop, ...) is not retried,
+                # but still has to settle the breaker, or a half-open trial never ends
+                UPSTREAM_SECONDS.labels('error').observe(time.perf_counter() - start)
+                self._count('failures')
+                self.breaker.record_failure()
+                raise
+            UPSTREAM_SECONDS.labels(str(response.status_code)).observe(time.perf_counter() - start)
+
+            if response.status_code not in RETRY_STATUSES:
+                self.breaker.record_success()
+                return response
+            if attempt < self.max_retries:
+                response.close()
+                self._backoff(attempt, response)
+                continue
+            self._count('failures')
+            self.breaker.record_failure()
+            return response
+
+    def metrics(self):
+        with self.stats_lock:
+            metrics = dict(self.stats)
+        metrics['connections_reused'] = max(metrics['requests'] - metrics['connections_opened'], 0)
+        metrics['circuit_state'] = self.breaker.state
+        metrics['circuit_opens'] = self.breaker.open_count
+        return metrics
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,287 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# Technical indicators over NumPy price arrays. Every function works on the
+# whole array at once (cumulative sums, ufunc accumulate), and the recursive
+# ones (EMA, RSI) accept a seed so a series can be extended with new ticks
+# without recomputing from the first point.
+
+
+def ema(values, alpha, seed=None):
+    """Exponential moving average: out[t] = (1 - alpha) * out[t-1] + alpha * x[t].
+
+    Evaluated in closed form, out[j] = b^(j+1) * seed + alpha * sum b^(j-i) x[i]
+    with b = 1 - alpha, over chunks short enough that b^chunk stays far from
+    underflow. Without a seed the series starts at values[0].
+    """
+    values = np.asarray(values, dtype=float)
+    out = np.empty_like(values)
+    if not len(values):
+        return out
+    beta = 1.0 - alpha
+    if beta <= 0:
+        out[:] = values
+        return out
+    prev = values[0] if seed is None else seed
+    chunk = max(1, int(100 / -np.log10(beta)))
+    for start in range(0, len(values), chunk):
+        x = values[start:start + chunk]
+        powers = beta ** np.arange(1, len(x) + 1)
+        out[start:start + len(x)] = powers * (prev + alpha * np.cumsum(x / powers))
+        prev = out[start + len(x) - 1]
+    return out
+
+
+def rolling_mean_std(values, window, chunk=65536):
+    """Rolling mean and population standard deviation; NaN until the window fills.
+
+    Computed over strided window views a block at a time, which keeps the
+    result exact (no running-sum cancellation) with bounded temporary memory.
+    """
+    values = np.asarray(values, dtype=float)
+    mean = np.full(len(values), np.nan)
+    std = np.full(len(values), np.nan)
+    if len(values) < window:
+        return mean, std
+    windows = np.lib.stride_tricks.sliding_window_view(values, window)
+    for start in range(0, len(windows), chunk):
+        block = windows[start:start + chunk]
+        block_mean = block.mean(axis=1)
+        mean[window - 1 + start:window - 1 + start + len(block)] = block_mean
+        std[window - 1 + start:window - 1 + start + len(block)] = np.sqrt(
+            ((block - block_mean[:, None]) ** 2).mean(axis=1))
+    return mean, std
+
+
+def _rsi_from_averages(avg_gain, avg_loss):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = avg_gain / avg_loss
+        rsi = 100.0 - 100.0 / (1.0 + rs)
+    return np.where(avg_loss == 0, np.where(avg_gain == 0, 50.0, 100.0), rsi)
+
+
+def drawdown(values, peak=None):
+    """Drawdown from the running peak (<= 0) and the peak after the last value."""
+    values = np.asarray(values, dtype=float)
+    if peak is not None:
+        running_peak = np.maximum.accumulate(np.concatenate(([peak], values)))[1:]
+    else:
+        running_peak = np.maximum.accumulate(values)
+    return values / running_peak - 1.0, running_peak[-1] if len(values) else peak
+
+
+class _Column:
+    """Growable array with amortised O(1) appends and cheap front trimming."""
+
+    def __init__(self, dtype=float, capacity=1024):
+        self.data = np.empty(capacity, dtype=dtype)
+        self.start = 0
+        self.end = 0
+
+    def __len__(self):
+        return self.end - self.start
+
+    def view(self):
+        return self.data[self.start:self.end]
+
+    def append(self, values):
+        count = len(values)
+        if self.end + count > len(self.data):
+            size = len(self)
+            capacity = len(self.data)
+            if size + count > capacity // 2:
+                capacity = 2 * (size + count)
+            data = np.empty(capacity, dtype=self.data.dtype)
+            data[:size] = self.view()
+            self.data, self.start, self.end = data, 0, size
+        self.data[self.end:self.end + count] = values
+        self.end += count
+
+    def trim(self, keep):
+        if len(self) > keep:
+            self.start = self.end - keep
+
+
+SERIES = ('sma', 'ema', 'stdev', 'bollinger_upper', 'bollinger_lower', 'rsi', 'drawdown')
+
+
+class IndicatorSeries:
+    """SMA, EMA, RSI, Bollinger bands, rolling stdev and drawdown for one series.
+
+    `extend` appends new prices and updates every indicator from the saved
+    state (EMA value, RSI averages, running peak, the last window of prices)
+    instead of recomputing the whole history. At most `max_points` points are
+    kept; trimming old points does not affect the recursive state.
+    """
+
+    def __init__(self, window=20, ema_span=20, rsi_period=14, bands=2.0, max_points=100000):
+        self.window = window
+        self.ema_alpha = 2.0 / (ema_span + 1)
+        self.rsi_period = rsi_period
+        self.bands = bands
+        self.max_points = max_points
+
+        self.timestamps = _Column(np.int64)
+        self.prices = _Column()
+        self.series = {name: _Column() for name in SERIES}
+        self.ema_last = None
+        self.avg_gain = None
+        self.avg_loss = None
+        self.peak = None
+        self.max_drawdown = 0.0
+
+    def _rsi(self, prices, previous_price):
+        # Wilder smoothing: seeded with the mean of the first `period` moves
+        period = self.rsi_period
+        out = np.full(len(prices), np.nan)
+        if previous_price is not None:
+            moves = np.diff(np.concatenate(([previous_price], prices)))
+            offset = 0
+        else:
+            moves = np.diff(prices)
+            offset = 1
+        gains = np.clip(moves, 0, None)
+        losses = np.clip(-moves, 0, None)
+
+        if self.avg_gain is None:
+            if len(moves) < period:
+                return out
+            self.avg_gain = gains[:period].mean()
+            self.avg_loss = losses[:period].mean()
+            out[offset + period - 1] = _rsi_from_averages(np.array([self.avg_gain]),
+                                                          np.array([self.avg_loss]))[0]
+            gains, losses = gains[period:], losses[period:]
+            offset += period
+        if len(gains):
+            alpha = 1.0 / period
+            avg_gain = ema(gains, alpha, self.avg_gain)
+            avg_loss = ema(losses, alpha, self.avg_loss)
+            out[offset:] = _rsi_from_averages(avg_gain, avg_loss)
+            self.avg_gain, self.avg_loss = avg_gain[-1], avg_loss[-1]
+        return out
+
+    def extend(self, timestamps, prices):
+        prices = np.asarray(prices, dtype=float)
+        if not len(prices):
+            return
+        history = self.prices.view()
+        previous_price = history[-1] if len(history) else None
+
+        # Rolling windows only need the last window-1 points as context
+        context = history[-(self.window - 1):] if self.window > 1 else history[:0]
+        mean, std = rolling_mean_std(np.concatenate((context, prices)), self.window)
+        mean, std = mean[len(context):], std[len(context):]
+
+        ema_values = ema(prices, self.ema_alpha, self.ema_last)
+        self.ema_last = ema_values[-1]
+
+        if self.avg_gain is None and previous_price is not None:
+            # RSI still warming up: seed it from all the points seen so far
+            rsi_values = self._rsi(np.concatenate((history, prices)), None)[len(history):]
+        else:
+            rsi_values = self._rsi(prices, previous_price)
+
+        dd, self.peak = drawdown(prices, self.peak)
+        self.max_drawdown = min(self.max_drawdown, float(dd.min()))
+
+        new = {
+            'sma': mean,
+            'ema': ema_values,
+            'stdev': std,
+            'bollinger_upper': mean + self.bands * std,
+            'bollinger_lower': mean - self.bands * std,
+            'rsi': rsi_values,
+            'drawdown': dd
+        }
+        # Only the newest max_points are stored, so a long first batch never sizes the columns
+        keep = slice(-self.max_points, None)
+        self.timestamps.append(np.asarray(timestamps, dtype=np.int64)[keep])
+        self.prices.append(prices[keep])
+        for name, values in new.items():
+            self.series[name].append(values[keep])
+        for column in (self.timestamps, self.prices, *self.series.values()):
+            column.trim(self.max_points)
+
+    def __len__(self):
+        return len(self.prices)
+
+    def tail(self, limit):
+        def clean(values):
+            return [None if np.isnan(v) else round(float(v), 6) for v in values[-limit:]]
+
+        return {
+            'timestamps': [int(t) for t in self.timestamps.view()[-limit:]],
+            'price': clean(self.prices.view()),
+            **{name: clean(column.view()) for name, column in self.series.items()},
+            'max_drawdown': self.max_drawdown
+        }
+
+
+class _CacheEntry:
+    def __init__(self, series):
+        self.series = series
+        self.last_id = 0
+        self.lock = threading.Lock()
+
+
+class IndicatorEngine:
+    """Per-symbol IndicatorSeries cache fed incrementally from stock_prices.
+
+    Entries are keyed by symbol and indicator parameters, which come from
+    the query string, so at most `max_entries` are kept (least recently used
+    evicted) and one is only created for a symbol that has ticks. A new
+    entry is seeded from the newest `seed_points` ticks, but keeps only the
+    `max_limit` points a request can return plus one window: the recursive
+    state (EMA, RSI averages, peak) does not need older points.
+    """
+
+    def __init__(self, db, max_limit=1000, seed_points=100000, max_entries=64):
+        self.db = db
+        self.max_limit = max_limit
+        self.seed_points = seed_points
+        self.max_entries = max_entries
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _entry(self, key):
+        with self.lock:
+            entry = self.cache.get(key)
+            if entry is not None:
+                self.cache.move_to_end(key)
+            return entry
+
+    def _create(self, key, series, last_id):
+        entry = _CacheEntry(series)
+        entry.last_id = last_id
+        with self.lock:
+            # Another request may have built the same entry meanwhile; keep the first
+            existing = self.cache.get(key)
+            if existing is not None:
+                return existing
+            self.cache[key] = entry
+            while len(self.cache) > self.max_entries:
+                self.cache.popitem(last=False)
+        return entry
+
+    def get(self, symbol, limit=100, window=20, ema_span=20, rsi_period=14):
+        key = (symbol, window, ema_span, rsi_period)
+        limit = min(limit, self.max_limit)
+        entry = self._entry(key)
+        if entry is None:
+            rows = self.db.get_ticks_since(symbol, 0, self.seed_points)
+            if not rows:
+                return None
+            series = IndicatorSeries(window, ema_span, rsi_period,
+                                     max_points=self.max_limit + max(window, rsi_period))
+            series.extend([row[2] for row in rows], [row[1] for row in rows])
+            entry = self._create(key, series, rows[-1][0])
+        with entry.lock:
+            # Only ticks written since the last call are read and folded in
+            rows = self.db.get_ticks_since(symbol, entry.last_id, self.seed_points)
+            if rows:
+                entry.last_id = rows[-1][0]
+                entry.series.extend([row[2] for row in rows], [row[1] for row in rows])
+            if not len(entry.series):
+                return None
+            return entry.series.tail(limit)
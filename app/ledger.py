@@ -0,0 +1,191 @@
+import math
+import time
+
+# Lot ledger behind the portfolio. Every BUY opens a lot; every SELL closes
+# shares out of the open lots, either oldest first ('fifo') or pro rata
+# ('average', i.e. average-cost basis). The per-symbol `holdings` row
+# (open shares, cost of those shares, realized P&L) is updated in the same
+# transaction, so reads never aggregate over the trade history.
+#
+# New trades are checked with check_trade before they are stored. Older
+# databases can hold trades that never passed it (zero or negative shares,
+# sells of more than was held); replay and rebuild skip and report those
+# instead of failing on them.
+
+METHODS = ('fifo', 'average')
+EPSILON = 1e-9
+
+
+class InsufficientSharesError(ValueError):
+    pass
+
+
+class InvalidTradeError(ValueError):
+    pass
+
+
+def check_trade(shares, price):
+    """Reject trades whose share count or price is not a positive, finite number."""
+    for name, value in (('shares', shares), ('price', price)):
+        if not (isinstance(value, (int, float)) and math.isfinite(value) and value > 0):
+            raise InvalidTradeError(f"{name} must be a positive number, got {value}")
+
+
+def match_sell(lots, shares, price, method):
+    """Close `shares` out of `lots` ([lot_id, open_shares, lot_price] lists, oldest first).
+
+    Mutates the lots in place and returns (realized_pnl, cost_removed).
+    """
+    open_shares = sum(lot[1] for lot in lots)
+    if shares > open_shares + EPSILON:
+        raise InsufficientSharesError(f"Cannot sell {shares} shares, only {open_shares} held")
+
+    realized = 0.0
+    cost_removed = 0.0
+    if method == 'average':
+        fraction = min(shares / open_shares, 1.0) if open_shares else 0.0
+        for lot in lots:
+            closed = lot[1] * fraction
+            cost_removed += closed * lot[2]
+            lot[1] -= closed
+        realized = shares * price - cost_removed
+    else:
+        remaining = shares
+        for lot in lots:
+            if remaining <= EPSILON:
+                break
+            closed = min(lot[1], remaining)
+            cost_removed += closed * lot[2]
+            realized += closed * (price - lot[2])
+            lot[1] -= closed
+            remaining -= closed
+    for lot in lots:
+        if lot[1] < EPSILON:
+            lot[1] = 0.0
+    return realized, cost_removed
+
+
+def _open_lots(conn, symbol):
+    return [list(row) for row in conn.execute(
+        'SELECT id, shares_open, price FROM lots WHERE symbol = ? AND shares_open > 0 ORDER BY id',
+        (symbol,)
+    )]
+
+
+def _update_holding(conn, symbol, shares_delta, cost_delta, realized_delta):
+    conn.execute(
+        '''INSERT INTO holdings (symbol, shares, cost_basis, realized_pnl, updated_at)
+           VALUES (?, ?, ?, ?, ?)
+           ON CONFLICT(symbol) DO UPDATE SET
+               shares = holdings.shares + excluded.shares,
+               cost_basis = holdings.cost_basis + excluded.cost_basis,
+               realized_pnl = holdings.realized_pnl + excluded.realized_pnl,
+               updated_at = excluded.updated_at''',
+        (symbol, shares_delta, cost_delta, realized_delta, int(time.time()))
+    )
+    # Clamp float residue once a position is fully closed
+    conn.execute(
+        'UPDATE holdings SET shares = 0, cost_basis = 0 WHERE symbol = ? AND ABS(shares) < ?',
+        (symbol, EPSILON)
+    )
+
+
+def record_buy(conn, symbol, shares, price, transaction_id):
+    conn.execute(
+        'INSERT INTO lots (symbol, transaction_id, shares, shares_open, price) VALUES (?, ?, ?, ?, ?)',
+        (symbol, transaction_id, shares, shares, price)
+    )
+    _update_holding(conn, symbol, shares, shares * price, 0.0)
+
+
+def record_sell(conn, symbol, shares, price, method):
+    lots = _open_lots(conn, symbol)
+    realized, cost_removed = match_sell(lots, shares, price, method)
+    conn.executemany('UPDATE lots SET shares_open = ? WHERE id = ?', [(lot[1], lot[0]) for lot in lots])
+    _update_holding(conn, symbol, -shares, -cost_removed, realized)
+    return realized
+
+
+def _skipped(row, error):
+    transaction_id, symbol, transaction_type, shares, price = row
+    return f"transaction {transaction_id} ({transaction_type} {shares} {symbol} at {price}) skipped: {error}"
+
+
+def replay(transactions, method, skipped=None):
+    """Holdings implied by (id, symbol, type, shares, price) rows in trade order.
+
+    Invalid trades are left out; their descriptions are appended to `skipped`.
+    """
+    books = {}
+    for row in transactions:
+        _, symbol, transaction_type, shares, price = row
+        book = books.setdefault(symbol, {'lots': [], 'realized': 0.0})
+        try:
+            check_trade(shares, price)
+            if transaction_type == 'BUY':
+                book['lots'].append([None, shares, price])
+            else:
+                realized, _ = match_sell(book['lots'], shares, price, method)
+                book['realized'] += realized
+        except ValueError as e:
+            if skipped is not None:
+                skipped.append(_skipped(row, e))
+    return {
+        symbol: (sum(lot[1] for lot in book['lots']),
+                 sum(lot[1] * lot[2] for lot in book['lots']),
+                 book['realized'])
+        for symbol, book in books.items()
+    }
+
+
+def _transactions(conn):
+    return conn.execute(
+        'SELECT id, symbol, transaction_type, shares, price FROM transactions ORDER BY id'
+    ).fetchall()
+
+
+def rebuild(conn, method):
+    """Recompute lots and holdings from transactions; returns the skipped trades."""
+    conn.execute('DELETE FROM lots')
+    conn.execute('DELETE FROM holdings')
+    skipped = []
+    for row in _transactions(conn):
+        transaction_id, symbol, transaction_type, shares, price = row
+        try:
+            check_trade(shares, price)
+            if transaction_type == 'BUY':
+                record_buy(conn, symbol, shares, price, transaction_id)
+            else:
+                # Raises before touching any lot when more is sold than held
+                record_sell(conn, symbol, shares, price, method)
+        except ValueError as e:
+            skipped.append(_skipped(row, e))
+    return skipped
+
+
+def skipped_transactions(conn, method):
+    skipped = []
+    replay(_transactions(conn), method, skipped)
+    return skipped
+
+
+def verify(conn, method, tolerance=1e-6):
+    """Compare holdings and lots against a replay of transactions.
+
+    Returns a list of human-readable discrepancies (empty when consistent).
+    """
+    expected = replay(_transactions(conn), method)
+    actual = {row[0]: row[1:] for row in conn.execute(
+        'SELECT symbol, shares, cost_basis, realized_pnl FROM holdings')}
+    lot_shares = dict(conn.execute('SELECT symbol, SUM(shares_open) FROM lots GROUP BY symbol').fetchall())
+
+    problems = []
+    for symbol in sorted(set(expected) | set(actual)):
+        want = expected.get(symbol, (0.0, 0.0, 0.0))
+        have = actual.get(symbol, (0.0, 0.0, 0.0))
+        for name, w, h in zip(('shares', 'cost_basis', 'realized_pnl'), want, have):
+            if abs(w - h) > tolerance:
+                problems.append(f"{symbol}: {name} is {h}, transactions imply {w}")
+        if abs((lot_shares.get(symbol) or 0.0) - have[0]) > tolerance:
+            problems.append(f"{symbol}: open lots hold {lot_shares.get(symbol) or 0.0} shares, holdings say {have[0]}")
+    return problems
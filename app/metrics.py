@@ -0,0 +1,254 @@
+import bisect
+import collections
+import functools
+import inspect
+import math
+import threading
+import time
+
+# Latency buckets in seconds, fine-grained at the low end where SQLite calls
+# and cache hits land
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        if math.isinf(value):
+            return '+Inf' if value > 0 else '-Inf'
+        return repr(value)
+    return str(value)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = []
+    for name, value in labels.items():
+        value = str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+class _CounterChild:
+    __slots__ = ('value', 'lock')
+
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def set(self, value):
+        self.value = value
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+
+class _HistogramChild:
+    # observe() only appends to a deque (atomic, no lock); values are folded
+    # into the buckets in batches and before every scrape
+    __slots__ = ('bounds', 'counts', 'sum', 'pending', 'lock')
+
+    BATCH = 512
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # per bucket, the last one is +Inf
+        self.sum = 0.0
+        self.pending = collections.deque()
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        self.pending.append(value)
+        if len(self.pending) >= self.BATCH:
+            self.fold()
+
+    def fold(self):
+        with self.lock:
+            self._fold_locked()
+
+    def _fold_locked(self):
+        pending, bounds, counts = self.pending, self.bounds, self.counts
+        total = 0.0
+        for _ in range(len(pending)):
+            value = pending.popleft()
+            counts[bisect.bisect_left(bounds, value)] += 1
+            total += value
+        self.sum += total
+
+    def snapshot(self):
+        with self.lock:
+            self._fold_locked()
+            return list(self.counts), self.sum
+
+    def time(self):
+        return _Timer(self)
+
+
+class _Timer:
+    __slots__ = ('child', 'start')
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.start)
+
+
+class Metric:
+    """A named metric family; with label names, `labels(...)` returns one series.
+
+    Series are created on first use and kept, so label values must come from
+    a small fixed set (routes, methods, status codes), never from symbols.
+    """
+
+    def __init__(self, name, help, type, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.type = type
+        self.labelnames = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.children = {}
+        self.lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def _new_child(self):
+        if self.type == 'histogram':
+            return _HistogramChild(self.buckets)
+        if self.type == 'gauge':
+            return _GaugeChild()
+        return _CounterChild()
+
+    def labels(self, *values):
+        try:
+            return self.children[values]
+        except KeyError:
+            pass
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {values}")
+        with self.lock:
+            return self.children.setdefault(tuple(str(value) for value in values), self._new_child())
+
+    # Unlabelled metrics are used directly
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+    def set(self, value):
+        self._default.set(value)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def time(self):
+        return self._default.time()
+
+    def samples(self):
+        """(suffix, labels, value) tuples for the exposition format."""
+        with self.lock:
+            children = list(self.children.items())
+        for values, child in sorted(children):
+            labels = dict(zip(self.labelnames, values))
+            if self.type != 'histogram':
+                yield '', labels, child.value
+                continue
+            counts, total = child.snapshot()
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                yield '_bucket', dict(labels, le=_format_value(float(bound))), cumulative
+            yield '_sum', labels, total
+            yield '_count', labels, cumulative
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        with self.lock:
+            if metric.name in self.metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self.metrics[metric.name] = metric
+        return metric
+
+    def render(self, collected=()):
+        """Prometheus text exposition of the registered metrics.
+
+        `collected` adds families gathered at scrape time, as
+        ``(name, type, help, [(labels, value), ...])`` tuples.
+        """
+        lines = []
+        with self.lock:
+            metrics = list(self.metrics.values())
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            for suffix, labels, value in metric.samples():
+                lines.append(f'{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}')
+        for name, type, help, samples in collected:
+            lines.append(f'# HELP {name} {help}')
+            lines.append(f'# TYPE {name} {type}')
+            for labels, value in samples:
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def counter(name, help, labels=()):
+    return REGISTRY.register(Metric(name, help, 'counter', labels))
+
+
+def gauge(name, help, labels=()):
+    return REGISTRY.register(Metric(name, help, 'gauge', labels))
+
+
+def histogram(name, help, labels=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.register(Metric(name, help, 'histogram', labels, buckets))
+
+
+def timed(series):
+    """Decorator observing each call's duration (exceptions included) in a histogram series."""
+    def decorate(func):
+        observe = series.observe
+        perf_counter = time.perf_counter
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe(perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+def instrument(metric):
+    """Class decorator timing every public method in `metric`, labelled by method name."""
+    def decorate(cls):
+        for name, attr in list(vars(cls).items()):
+            if not name.startswith('_') and inspect.isfunction(attr):
+                setattr(cls, name, timed(metric.labels(name))(attr))
+        return cls
+    return decorate
+
+
+# Request latency for both the Flask app and the routes AsyncApp serves itself
+HTTP_REQUEST_SECONDS = histogram('stockwatcher_http_request_seconds', 'HTTP request latency by route',
+                                 labels=('method', 'route', 'status'))
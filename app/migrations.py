@@ -0,0 +1,257 @@
+import logging
+from app import ledger, rollups
+from config import Config
+
+# Schema versions are tracked in PRAGMA user_version. Each migration runs in
+# its own BEGIN IMMEDIATE transaction together with the version bump, so a
+# failed migration leaves the database at the previous version and two
+# processes starting at once cannot apply the same step twice.
+
+logger = logging.getLogger(__name__)
+
+
+def _base_schema(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS stock_prices (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            symbol TEXT NOT NULL,
+            price REAL NOT NULL,
+            currency TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS watchlist (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            symbol TEXT NOT NULL UNIQUE,
+            target_price REAL,
+            alert_enabled BOOLEAN DEFAULT TRUE,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS portfolio (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            symbol TEXT NOT NULL,
+            shares REAL NOT NULL,
+            purchase_price REAL NOT NULL,
+            purchase_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+            notes TEXT
+        )
+    ''')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            symbol TEXT NOT NULL,
+            transaction_type TEXT NOT NULL,
+            shares REAL NOT NULL,
+            price REAL NOT NULL,
+            transaction_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+            total_value REAL NOT NULL
+        )
+    ''')
+
+
+def _epoch_timestamps(conn):
+    # Rebuild stock_prices with integer epoch-second timestamps. Old rows hold
+    # CURRENT_TIMESTAMP text (UTC), which strftime('%s') converts directly.
+    conn.execute('''
+        CREATE TABLE stock_prices_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            symbol TEXT NOT NULL,
+            price REAL NOT NULL,
+            currency TEXT,
+            timestamp INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER))
+        )
+    ''')
+    conn.execute('''
+        INSERT INTO stock_prices_new (id, symbol, price, currency, timestamp)
+        SELECT id, symbol, price, currency,
+               CASE
+                   WHEN typeof(timestamp) = 'integer' THEN timestamp
+                   ELSE COALESCE(CAST(strftime('%s', timestamp) AS INTEGER), 0)
+               END
+        FROM stock_prices
+    ''')
+    conn.execute('DROP TABLE stock_prices')
+    conn.execute('ALTER TABLE stock_prices_new RENAME TO stock_prices')
+
+    # Covers history reads (symbol filter, timestamp order, price column)
+    # without touching the table, and keeps time-range deletes off a scan.
+    conn.execute('CREATE INDEX idx_stock_prices_symbol_ts ON stock_prices (symbol, timestamp, price)')
+    conn.execute('CREATE INDEX idx_stock_prices_ts ON stock_prices (timestamp)')
+
+
+def _price_bars(conn):
+    # Incrementally maintained OHLC bars (see app/rollups.py); `ticks` counts
+    # the observations folded into each bar, open_ts/close_ts keep open and
+    # close correct when ticks arrive out of order.
+    conn.execute('''
+        CREATE TABLE price_bars (
+            symbol TEXT NOT NULL,
+            resolution INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            open REAL NOT NULL,
+            high REAL NOT NULL,
+            low REAL NOT NULL,
+            close REAL NOT NULL,
+            ticks INTEGER NOT NULL,
+            open_ts INTEGER NOT NULL,
+            close_ts INTEGER NOT NULL,
+            PRIMARY KEY (symbol, resolution, bucket)
+        ) WITHOUT ROWID
+    ''')
+    rollups.rebuild(conn)
+
+
+def _lot_ledger(conn):
+    # Materialized holdings maintained by app/ledger.py, rebuilt from the
+    # BUY history that already exists in transactions.
+    conn.execute('''
+        CREATE TABLE lots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            symbol TEXT NOT NULL,
+            transaction_id INTEGER,
+            shares REAL NOT NULL,
+            shares_open REAL NOT NULL,
+            price REAL NOT NULL
+        )
+    ''')
+    conn.execute('CREATE INDEX idx_lots_symbol ON lots (symbol, id)')
+
+    conn.execute('''
+        CREATE TABLE holdings (
+            symbol TEXT PRIMARY KEY,
+            shares REAL NOT NULL,
+            cost_basis REAL NOT NULL,
+            realized_pnl REAL NOT NULL DEFAULT 0,
+            updated_at INTEGER NOT NULL
+        )
+    ''')
+    for skipped in ledger.rebuild(conn, Config.COST_BASIS_METHOD):
+        logger.warning("Lot ledger: %s", skipped)
+
+
+def _alerts(conn):
+    # Price alerts indexed in memory by app/alert_engine.py. Watchlist target
+    # prices become 'near' alerts (the old fixed 2% band) owned by the
+    # watchlist row; source='user' alerts are managed through /api/alerts.
+    conn.execute('''
+        CREATE TABLE alerts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            symbol TEXT NOT NULL,
+            condition TEXT NOT NULL,
+            threshold REAL NOT NULL,
+            band_pct REAL NOT NULL DEFAULT 2.0,
+            cooldown INTEGER NOT NULL DEFAULT 3600,
+            enabled BOOLEAN NOT NULL DEFAULT TRUE,
+            last_triggered REAL,
+            source TEXT NOT NULL DEFAULT 'user',
+            created_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER))
+        )
+    ''')
+    conn.execute('CREATE INDEX idx_alerts_symbol ON alerts (symbol)')
+    conn.execute('''
+        INSERT INTO alerts (symbol, condition, threshold, enabled, source)
+        SELECT symbol, 'near', target_price, alert_enabled, 'watchlist'
+        FROM watchlist WHERE target_price IS NOT NULL
+    ''')
+
+
+def _notifications(conn):
+    # Outgoing alert emails, kept until delivered so a restart does not lose them
+    conn.execute('''
+        CREATE TABLE notifications (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            recipient TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            body TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            created_at REAL NOT NULL,
+            next_attempt_at REAL NOT NULL,
+            sent_at REAL,
+            last_error TEXT
+        )
+    ''')
+    conn.execute('CREATE INDEX idx_notifications_pending ON notifications (status, next_attempt_at)')
+
+
+def _watchlist_changes(conn):
+    # Change log behind the in-memory watchlist snapshot (see Database.get_watchlist):
+    # every edit appends one row per symbol in the same transaction, so MAX(version)
+    # is a cheap change counter for every process and the rows since a reader's
+    # version say which symbols to re-read.
+    conn.execute('''
+        CREATE TABLE watchlist_changes (
+            version INTEGER PRIMARY KEY AUTOINCREMENT,
+            symbol TEXT NOT NULL,
+            change TEXT NOT NULL,
+            changed_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER))
+        )
+    ''')
+    conn.execute('CREATE INDEX idx_watchlist_created_at ON watchlist (created_at)')
+
+
+def _alert_changes(conn):
+    # Change log of the alerts table, written by triggers so every writer (web
+    # workers, scripts, the alert monitor) is covered. MAX(version) tells a
+    # process whether its in-memory alert index is current, and the alert ids
+    # logged since its version say which rows to re-read.
+    conn.execute('''
+        CREATE TABLE alert_changes (
+            version INTEGER PRIMARY KEY AUTOINCREMENT,
+            alert_id INTEGER NOT NULL
+        )
+    ''')
+    for event, row in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD')):
+        conn.execute(f'''
+            CREATE TRIGGER alerts_log_{event.lower()} AFTER {event} ON alerts
+            BEGIN
+                INSERT INTO alert_changes (alert_id) VALUES ({row}.id);
+            END
+        ''')
+
+
+MIGRATIONS = [
+    (1, _base_schema),
+    (2, _epoch_timestamps),
+    (3, _price_bars),
+    (4, _lot_ledger),
+    (5, _alerts),
+    (6, _notifications),
+    (7, _watchlist_changes),
+    (8, _alert_changes),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn):
+    """Bring the database up to LATEST_VERSION; returns the versions applied."""
+    applied = []
+    if schema_version(conn) >= LATEST_VERSION:
+        return applied
+
+    for version, step in MIGRATIONS:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Re-check under the write lock in case another process got here first
+            if schema_version(conn) >= version:
+                conn.rollback()
+                continue
+            step(conn)
+            conn.execute(f'PRAGMA user_version = {version}')
+            conn.commit()
+            applied.append(version)
+        except Exception:
+            conn.rollback()
+            raise
+    return applied
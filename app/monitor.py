@@ -0,0 +1,217 @@
+import asyncio
+import json
+import logging
+import os
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class AlertMonitor:
+    """Long-running alert monitor.
+
+    Keeps one StockAPI, Database and AlertSystem for its whole life and polls
+    quotes in batches, with at most `concurrency` batches in flight. Each
+    symbol has its own due time: symbols sitting on a threshold are polled
+    every `min_interval` seconds, slowing linearly to `max_interval` as the
+    price moves `near_range` (relative) or further away. The HTTP client is
+    blocking, so fetches run on a thread pool sized to the concurrency limit
+    while the event loop does the scheduling. Database reads for reloads and
+    the status file run on one more thread; only the event loop touches the
+    schedule (`due`, `in_flight`, `last_polled`).
+    """
+
+    def __init__(self, stock_api, db, alert_system, config=None, status_path=None, notifier=None):
+        self.config = config or Config()
+        self.stock_api = stock_api
+        self.db = db
+        self.alert_system = alert_system
+        self.notifier = notifier
+        self.concurrency = self.config.MONITOR_CONCURRENCY
+        self.min_interval = self.config.MONITOR_MIN_INTERVAL
+        self.max_interval = self.config.MONITOR_MAX_INTERVAL
+        self.near_range = self.config.MONITOR_NEAR_RANGE
+        self.reload_interval = self.config.MONITOR_RELOAD_INTERVAL
+        self.batch_size = max(1, self.config.STOCK_API_BATCH_SIZE)
+        self.status_path = status_path or self.config.MONITOR_STATUS_PATH
+        self.tick = 0.25
+
+        self.due = {}  # symbol -> monotonic time of its next poll
+        self.last_polled = {}  # symbol -> monotonic time of its last successful poll
+        self.in_flight = set()
+        self.symbols = set()  # as of the last reload
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        self.housekeeping = ThreadPoolExecutor(max_workers=1)
+        self.notification_stats = None
+        self.stop_event = None
+        self.started = time.monotonic()
+        self.started_at = time.time()
+        self.counters = {'polls': 0, 'quotes': 0, 'errors': 0, 'alerts_triggered': 0}
+
+    def interval_for(self, symbol, price):
+        distance = self.alert_system.engine.distance(symbol, price)
+        if distance is None:
+            return self.max_interval
+        fraction = min(distance / self.near_range, 1.0) if self.near_range else 1.0
+        return self.min_interval + (self.max_interval - self.min_interval) * fraction
+
+    def load_symbols(self):
+        # Picks up alerts and watchlist rows written by other processes; runs off the loop
+        self.alert_system.sync(self.db)
+        symbols = set(self.alert_system.engine.symbols())
+        symbols.update(row[0] for row in self.db.get_watchlist())
+        return symbols
+
+    def apply_symbols(self, symbols):
+        # Schedules new symbols and drops removed ones; runs on the loop
+        self.symbols = symbols
+        now = time.monotonic()
+        for symbol in symbols:
+            if symbol not in self.due and symbol not in self.in_flight:
+                self.due[symbol] = now
+        for symbol in list(self.due):
+            if symbol not in symbols:
+                del self.due[symbol]
+                self.last_polled.pop(symbol, None)
+        return len(symbols)
+
+    def _poll(self, batch):
+        quotes, errors = self.stock_api.fetch_quotes(batch, refresh=True)
+        alerts = self.alert_system.process_quotes(self.db, quotes.values())
+        if self.notifier is not None:
+            # Queued for the dispatcher thread; delivery never holds up polling
+            self.notifier.enqueue_alerts(alerts)
+        else:
+            for alert in alerts:
+                self.alert_system.send_email_alert(alert)
+        return quotes, errors, alerts
+
+    async def _run_batch(self, batch):
+        loop = asyncio.get_running_loop()
+        try:
+            quotes, errors, alerts = await loop.run_in_executor(self.executor, partial(self._poll, batch))
+        except Exception as e:
+            logger.exception("Poll of %d symbols failed", len(batch))
+            quotes, errors, alerts = {}, {symbol: str(e) for symbol in batch}, []
+
+        now = time.monotonic()
+        self.counters['polls'] += 1
+        self.counters['quotes'] += len(quotes)
+        self.counters['errors'] += len(errors)
+        self.counters['alerts_triggered'] += len(alerts)
+        for symbol in batch:
+            self.in_flight.discard(symbol)
+            if symbol not in self.symbols:
+                continue  # dropped by a reload while it was being polled
+            quote = quotes.get(symbol)
+            if quote:
+                self.last_polled[symbol] = now
+                self.due[symbol] = now + self.interval_for(symbol, quote['price'])
+            else:
+                # Failed symbols are retried soon; the API client applies backoff
+                self.due[symbol] = now + self.min_interval
+        for alert in alerts:
+            logger.info("Alert: %s %s %.2f at %.2f", alert['symbol'], alert['condition'],
+                        alert['target_price'], alert['current_price'])
+
+    def _dispatch(self, tasks):
+        now = time.monotonic()
+        due = sorted((t, symbol) for symbol, t in self.due.items() if t <= now)
+        slots = self.concurrency - len(tasks)
+        for start in range(0, min(len(due), slots * self.batch_size), self.batch_size):
+            batch = [symbol for _, symbol in due[start:start + self.batch_size]]
+            for symbol in batch:
+                del self.due[symbol]
+                self.in_flight.add(symbol)
+            task = asyncio.ensure_future(self._run_batch(batch))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+    def status(self, state='running'):
+        now = time.monotonic()
+        tracked = set(self.due) | self.in_flight
+        staleness = max((now - self.last_polled.get(symbol, self.started) for symbol in tracked), default=0.0)
+        return {
+            'state': state,
+            'pid': os.getpid(),
+            'started_at': self.started_at,
+            'updated_at': time.time(),
+            'symbols': len(tracked),
+            'in_flight': len(self.in_flight),
+            'overdue': sum(1 for t in self.due.values() if t <= now),
+            'max_staleness': round(staleness, 3),
+            'healthy': state == 'running' and staleness <= 2 * self.max_interval,
+            **self.counters,
+            'alerts': len(self.alert_system.engine),
+            'api': self.stock_api.client_stats(),
+            'notifications': self.notification_stats
+        }
+
+    def write_status(self, state='running'):
+        if not self.status_path:
+            return
+        tmp_path = f"{self.status_path}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(self.status(state), f, indent=2)
+            os.replace(tmp_path, self.status_path)
+        except OSError as e:
+            logger.warning("Could not write status file %s: %s", self.status_path, e)
+
+    def stop(self):
+        if self.stop_event is not None:
+            self.stop_event.set()
+
+    async def _refresh_notification_stats(self):
+        if self.notifier is None:
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            self.notification_stats = await loop.run_in_executor(self.housekeeping, self.notifier.stats)
+        except Exception:
+            logger.exception("Reading notification stats failed")
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        self.stop_event = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError, ValueError):
+                pass  # not on the main thread, or no signal support (Windows)
+
+        tasks = set()
+        next_reload = 0.0
+        next_status = 0.0
+        try:
+            while not self.stop_event.is_set():
+                now = time.monotonic()
+                if now >= next_reload:
+                    try:
+                        symbols = await loop.run_in_executor(self.housekeeping, self.load_symbols)
+                        count = self.apply_symbols(symbols)
+                        logger.info("Monitoring %d symbols, %d alerts", count, len(self.alert_system.engine))
+                    except Exception:
+                        logger.exception("Reloading alerts failed")
+                    next_reload = now + self.reload_interval
+                self._dispatch(tasks)
+                if now >= next_status:
+                    await self._refresh_notification_stats()
+                    self.write_status()
+                    next_status = now + 1.0
+                try:
+                    await asyncio.wait_for(self.stop_event.wait(), self.tick)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            # Let in-flight polls finish so triggered alerts are recorded and sent
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            await self._refresh_notification_stats()
+            self.write_status('stopped')
+            self.executor.shutdown(wait=True)
+            self.housekeeping.shutdown(wait=True)
@@ -0,0 +1,242 @@
+import logging
+import random
+import smtplib
+import threading
+import time
+from email.mime.text import MIMEText
+from app.alerts import format_alert_email
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class SMTPTransport:
+    """One SMTP connection reused across messages.
+
+    The connection (and STARTTLS/login) is set up on the first send and kept
+    open; it is checked with NOOP before reuse and dropped after
+    SMTP_IDLE_TIMEOUT idle seconds or on a connection error.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or Config()
+        self.server = None
+        self.last_used = 0.0
+        self.connections_opened = 0
+        self.messages_sent = 0
+
+    def _connect(self):
+        server = smtplib.SMTP(self.config.SMTP_SERVER, self.config.SMTP_PORT, timeout=30)
+        try:
+            if self.config.SMTP_USE_TLS:
+                server.starttls()
+            if self.config.EMAIL_USER and self.config.EMAIL_PASS:
+                server.login(self.config.EMAIL_USER, self.config.EMAIL_PASS)
+        except Exception:
+            server.close()
+            raise
+        self.connections_opened += 1
+        return server
+
+    def _connection(self):
+        if self.server is not None:
+            idle = time.monotonic() - self.last_used
+            try:
+                if idle > self.config.SMTP_IDLE_TIMEOUT or self.server.noop()[0] != 250:
+                    self.close()
+            except smtplib.SMTPException:
+                self.close()
+        if self.server is None:
+            self.server = self._connect()
+        return self.server
+
+    def send(self, recipient, subject, body):
+        msg = MIMEText(body, 'plain')
+        msg['From'] = self.config.EMAIL_USER or 'stockwatcher@localhost'
+        msg['To'] = recipient
+        msg['Subject'] = subject
+        try:
+            self._connection().send_message(msg)
+        except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+            # A rejected message leaves the session usable (smtplib resets it)
+            # unless the server hung up with it
+            if self.server is not None and self.server.sock is None:
+                self.server = None
+            raise
+        except Exception:
+            self.close()
+            raise
+        self.last_used = time.monotonic()
+        self.messages_sent += 1
+
+    def close(self):
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except Exception:
+                self.server.close()
+            self.server = None
+
+
+class NotificationDispatcher:
+    """Persistent, batched delivery of alert emails.
+
+    `enqueue_alerts` only inserts rows into the notifications table, so the
+    alert monitor never waits on SMTP. A background thread delivers them over
+    one reused SMTP connection: alerts for the same recipient are held for up
+    to `digest_window` seconds after the oldest one and sent as a single
+    digest (at most `digest_max` alerts per email). A failed send is retried
+    with full-jitter exponential backoff and marked 'failed' after
+    `max_attempts`. Undelivered rows survive restarts.
+    """
+
+    def __init__(self, connections, config=None, transport=None):
+        self.config = config or Config()
+        self.connections = connections
+        self.transport = transport or SMTPTransport(self.config)
+        self.recipient = self.config.ALERT_RECIPIENT
+        self.digest_window = self.config.NOTIFY_DIGEST_WINDOW
+        self.digest_max = max(1, self.config.NOTIFY_DIGEST_MAX)
+        self.max_attempts = self.config.NOTIFY_MAX_ATTEMPTS
+        self.backoff_base = self.config.NOTIFY_BACKOFF_BASE
+        self.backoff_max = self.config.NOTIFY_BACKOFF_MAX
+        self.wakeup = threading.Event()
+        self.stopping = threading.Event()
+        self.thread = None
+        self.send_errors = 0
+
+    def enqueue_alerts(self, alerts):
+        alerts = list(alerts)
+        if not alerts:
+            return 0
+        if not self.recipient:
+            for alert_info in alerts:
+                print(f"Email not configured, alert: {alert_info['symbol']} hit target")
+            return 0
+
+        now = time.time()
+        rows = [(self.recipient, *format_alert_email(alert_info), now, now) for alert_info in alerts]
+        with self.connections.transaction() as conn:
+            conn.executemany(
+                '''INSERT INTO notifications (recipient, subject, body, created_at, next_attempt_at)
+                   VALUES (?, ?, ?, ?, ?)''',
+                rows
+            )
+        self.wakeup.set()
+        return len(rows)
+
+    def _backoff(self, attempts):
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempts)))
+
+    def _digest(self, rows):
+        if len(rows) == 1:
+            return rows[0][2], rows[0][3]
+        subject = f"StockWatcher: {len(rows)} alerts triggered"
+        body = '\n'.join(f"{row[2]}\n{row[3]}" for row in rows)
+        return subject, body
+
+    def deliver_due(self, flush=False):
+        """Send every notification that is due.
+
+        Returns ``(delivered, wait)``: the number of notifications sent and
+        the seconds until the next one becomes due (None when nothing else
+        is pending). `flush` ignores the digest window.
+        """
+        now = time.time()
+        with self.connections.connection() as conn:
+            rows = conn.execute(
+                '''SELECT id, recipient, subject, body, created_at, attempts, next_attempt_at
+                   FROM notifications WHERE status = 'pending' ORDER BY id'''
+            ).fetchall()
+
+        groups = {}
+        for row in rows:
+            groups.setdefault(row[1], []).append(row)
+
+        delivered = 0
+        wait = None
+        for recipient, group in groups.items():
+            ready = [row for row in group if row[6] <= now]
+            if not ready:
+                due = min(row[6] for row in group) - now
+                wait = due if wait is None else min(wait, due)
+                continue
+            # Hold the digest open until the oldest alert in it has waited out the window
+            window_left = min(row[4] for row in ready) + self.digest_window - now
+            if window_left > 0 and not flush:
+                wait = window_left if wait is None else min(wait, window_left)
+                continue
+            for start in range(0, len(ready), self.digest_max):
+                chunk = ready[start:start + self.digest_max]
+                if self._send(recipient, chunk):
+                    delivered += len(chunk)
+        return delivered, wait
+
+    def _send(self, recipient, rows):
+        subject, body = self._digest(rows)
+        try:
+            self.transport.send(recipient, subject, body)
+        except Exception as e:
+            self.send_errors += 1
+            logger.warning("Sending %d alert(s) to %s failed: %s", len(rows), recipient, e)
+            now = time.time()
+            with self.connections.transaction() as conn:
+                conn.executemany(
+                    '''UPDATE notifications SET attempts = attempts + 1, last_error = ?,
+                           next_attempt_at = ?,
+                           status = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE 'pending' END
+                       WHERE id = ?''',
+                    [(str(e), now + self._backoff(row[5]), self.max_attempts, row[0]) for row in rows]
+                )
+            return False
+
+        with self.connections.transaction() as conn:
+            conn.executemany(
+                "UPDATE notifications SET status = 'sent', sent_at = ?, attempts = attempts + 1 WHERE id = ?",
+                [(time.time(), row[0]) for row in rows]
+            )
+        return True
+
+    def _run(self):
+        while not self.stopping.is_set():
+            try:
+                _, wait = self.deliver_due()
+            except Exception:
+                logger.exception("Notification delivery failed")
+                wait = self.backoff_base
+            self.wakeup.wait(timeout=min(wait, self.digest_window) if wait is not None else self.digest_window)
+            self.wakeup.clear()
+        self.transport.close()
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name='notifications', daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self, flush=True):
+        self.stopping.set()
+        self.wakeup.set()
+        if self.thread is not None:
+            self.thread.join(timeout=60)
+            self.thread = None
+        if flush:
+            # One last attempt at whatever is due, ignoring the digest window
+            try:
+                self.deliver_due(flush=True)
+            except Exception:
+                logger.exception("Final notification flush failed")
+        self.transport.close()
+
+    def stats(self):
+        with self.connections.connection() as conn:
+            counts = dict(conn.execute(
+                'SELECT status, COUNT(*) FROM notifications GROUP BY status').fetchall())
+        return {
+            'pending': counts.get('pending', 0),
+            'sent': counts.get('sent', 0),
+            'failed': counts.get('failed', 0),
+            'send_errors': self.send_errors,
+            'smtp_connections': self.transport.connections_opened,
+            'emails_sent': self.transport.messages_sent
+        }
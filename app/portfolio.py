@@ -1,102 +1,160 @@
-import sqlite3
+import numpy as np
 from datetime import datetime
+from app import ledger, metrics
+from app.connection import ConnectionManager
+from config import Config
 
+CALL_SECONDS = metrics.histogram('stockwatcher_portfolio_call_seconds', 'Portfolio method latency',
+                                 labels=('method',))
+
+
+@metrics.instrument(CALL_SECONDS)
 class Portfolio:
-    def __init__(self, db_path='stock_data.db'):
-        self.db_path = db_path
+    def __init__(self, db_path=None, connections=None, cost_basis_method=None):
+        self.connections = connections or ConnectionManager.for_path(db_path or Config.DATABASE_PATH)
+        self.db_path = self.connections.db_path
+        self.cost_basis_method = cost_basis_method or Config.COST_BASIS_METHOD
+        if self.cost_basis_method not in ledger.METHODS:
+            raise ValueError(f"Unknown cost basis method: {self.cost_basis_method}")
         self.init_portfolio_tables()
     
     def init_portfolio_tables(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS portfolio (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                symbol TEXT NOT NULL,
-                shares REAL NOT NULL,
-                purchase_price REAL NOT NULL,
-                purchase_date DATETIME DEFAULT CURRENT_TIMESTAMP,
-                notes TEXT
+        self.connections.ensure_schema()
+    
+    def add_position(self, symbol, shares, purchase_price, notes=None):
+        """Buy shares, opening a lot; returns the position id.
+
+        Raises ledger.InvalidTradeError unless shares and price are positive.
+        """
+        ledger.check_trade(shares, purchase_price)
+        with self.connections.transaction() as conn:
+            cursor = conn.execute(
+                'INSERT INTO portfolio (symbol, shares, purchase_price, notes) VALUES (?, ?, ?, ?)',
+                (symbol, shares, purchase_price, notes)
             )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS transactions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                symbol TEXT NOT NULL,
-                transaction_type TEXT NOT NULL,
-                shares REAL NOT NULL,
-                price REAL NOT NULL,
-                transaction_date DATETIME DEFAULT CURRENT_TIMESTAMP,
-                total_value REAL NOT NULL
+            position_id = cursor.lastrowid
+            
+            # Record transaction and open a lot for it
+            total_value = shares * purchase_price
+            cursor = conn.execute(
+                'INSERT INTO transactions (symbol, transaction_type, shares, price, total_value) VALUES (?, ?, ?, ?, ?)',
+                (symbol, 'BUY', shares, purchase_price, total_value)
             )
-        ''')
+            ledger.record_buy(conn, symbol, shares, purchase_price, cursor.lastrowid)
         
-        conn.commit()
-        conn.close()
+        return position_id
     
-    def add_position(self, symbol, shares, purchase_price, notes=None):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            'INSERT INTO portfolio (symbol, shares, purchase_price, notes) VALUES (?, ?, ?, ?)',
-            (symbol, shares, purchase_price, notes)
-        )
-        
-        # Record transaction
-        total_value = shares * purchase_price
-        cursor.execute(
-            'INSERT INTO transactions (symbol, transaction_type, shares, price, total_value) VALUES (?, ?, ?, ?, ?)',
-            (symbol, 'BUY', shares, purchase_price, total_value)
-        )
-        
-        conn.commit()
-        conn.close()
-        return cursor.lastrowid
+    def sell_position(self, symbol, shares, sale_price):
+        """Sell shares against open lots; returns the realized P&L.
+
+        Raises ledger.InsufficientSharesError when more shares are sold than held
+        and ledger.InvalidTradeError unless shares and price are positive.
+        """
+        ledger.check_trade(shares, sale_price)
+        with self.connections.transaction() as conn:
+            realized = ledger.record_sell(conn, symbol, shares, sale_price, self.cost_basis_method)
+            conn.execute(
+                'INSERT INTO transactions (symbol, transaction_type, shares, price, total_value) VALUES (?, ?, ?, ?, ?)',
+                (symbol, 'SELL', shares, sale_price, shares * sale_price)
+            )
+        return realized
+    
+    def rebuild_ledger(self):
+        # Recompute lots and holdings from transactions; returns any problems found before
+        with self.connections.transaction() as conn:
+            problems = ledger.verify(conn, self.cost_basis_method)
+            ledger.rebuild(conn, self.cost_basis_method)
+        return problems
+    
+    def verify_ledger(self):
+        with self.connections.connection() as conn:
+            return ledger.verify(conn, self.cost_basis_method)
+    
+    def skipped_transactions(self):
+        # Stored trades the ledger ignores (non-positive shares or price, oversells)
+        with self.connections.connection() as conn:
+            return ledger.skipped_transactions(conn, self.cost_basis_method)
     
     def get_portfolio_summary(self, stock_api):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        positions, realized_total = self.load_positions()
+        quotes = {}
+        if positions:
+            # One batched/concurrent quote call for every held symbol
+            quotes, _ = stock_api.fetch_quotes([row[0] for row in positions], allow_stale=True)
+        return self.summarize(positions, realized_total, quotes)
+    
+    def load_positions(self):
+        """Open positions as (symbol, shares, avg_price, realized_pnl) rows, plus total realized P&L."""
+        with self.connections.connection() as conn:
+            positions = conn.execute('''
+                SELECT symbol, shares, cost_basis / shares AS avg_price, realized_pnl
+                FROM holdings
+                WHERE shares > 0
+                ORDER BY symbol
+            ''').fetchall()
+            realized_total = conn.execute(
+                'SELECT COALESCE(SUM(realized_pnl), 0) FROM holdings'
+            ).fetchone()[0]
+        return positions, realized_total
+    
+    def summarize(self, positions, realized_total, quotes):
+        """Portfolio summary for `load_positions` rows priced from `quotes` (cost basis when missing)."""
+        if not positions:
+            return {
+                'positions': [],
+                'summary': {
+                    'total_invested': 0,
+                    'total_current_value': 0,
+                    'total_profit_loss': 0,
+                    'total_profit_loss_pct': 0,
+                    'total_realized_pnl': realized_total,
+                    'stale_symbols': [],
+                    'fallback_symbols': []
+                }
+            }
         
-        cursor.execute('''
-            SELECT symbol, SUM(shares) as total_shares, AVG(purchase_price) as avg_price 
-            FROM portfolio 
-            GROUP BY symbol 
-            HAVING total_shares > 0
-        ''')
+        symbols = [row[0] for row in positions]
+        shares = np.array([row[1] for row in positions], dtype=float)
+        avg_price = np.array([row[2] for row in positions], dtype=float)
+        quoted = np.array([quotes[s]['price'] if s in quotes else np.nan for s in symbols], dtype=float)
+        current_price = np.where(np.isnan(quoted), avg_price, quoted)
         
-        positions = cursor.fetchall()
-        conn.close()
+        position_value = shares * current_price
+        invested_value = shares * avg_price
+        profit_loss = position_value - invested_value
+        with np.errstate(divide='ignore', invalid='ignore'):
+            profit_loss_pct = np.where(invested_value > 0, profit_loss / invested_value * 100, 0.0)
         
         portfolio_data = []
-        total_invested = 0
-        total_current_value = 0
-        
-        for symbol, shares, avg_price in positions:
-            current_data = stock_api.get_stock_price(symbol)
-            current_price = current_data['price'] if current_data else avg_price
-            
-            position_value = shares * current_price
-            invested_value = shares * avg_price
-            profit_loss = position_value - invested_value
-            profit_loss_pct = (profit_loss / invested_value) * 100 if invested_value > 0 else 0
+        stale_symbols = []
+        fallback_symbols = []
+        for i, symbol in enumerate(symbols):
+            quote = quotes.get(symbol)
+            if quote is None:
+                price_source = 'cost_basis'
+                fallback_symbols.append(symbol)
+            elif quote.get('stale'):
+                price_source = 'stale'
+                stale_symbols.append(symbol)
+            else:
+                price_source = 'live'
             
             portfolio_data.append({
                 'symbol': symbol,
-                'shares': shares,
-                'avg_price': avg_price,
-                'current_price': current_price,
-                'position_value': position_value,
-                'invested_value': invested_value,
-                'profit_loss': profit_loss,
-                'profit_loss_pct': profit_loss_pct
+                'shares': float(shares[i]),
+                'avg_price': float(avg_price[i]),
+                'current_price': float(current_price[i]),
+                'position_value': float(position_value[i]),
+                'invested_value': float(invested_value[i]),
+                'profit_loss': float(profit_loss[i]),
+                'profit_loss_pct': float(profit_loss_pct[i]),
+                'realized_pnl': positions[i][3],
+                'price_source': price_source,
+                'quote_timestamp': quote['timestamp'] if quote else None
             })
-            
-            total_invested += invested_value
-            total_current_value += position_value
         
+        total_invested = float(invested_value.sum())
+        total_current_value = float(position_value.sum())
         total_profit_loss = total_current_value - total_invested
         total_profit_loss_pct = (total_profit_loss / total_invested) * 100 if total_invested > 0 else 0
         
@@ -106,18 +164,15 @@ class Portfolio:
                 'total_invested': total_invested,
                 'total_current_value': total_current_value,
                 'total_profit_loss': total_profit_loss,
-                'total_profit_loss_pct': total_profit_loss_pct
+                'total_profit_loss_pct': total_profit_loss_pct,
+                'total_realized_pnl': realized_total,
+                'stale_symbols': stale_symbols,
+                'fallback_symbols': fallback_symbols
             }
         }
     
     def get_transaction_history(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            'SELECT * FROM transactions ORDER BY transaction_date DESC LIMIT 50'
-        )
-        
-        transactions = cursor.fetchall()
-        conn.close()
-        return transactions
\ No newline at end of file
+        with self.connections.connection() as conn:
+            return conn.execute(
+                'SELECT * FROM transactions ORDER BY transaction_date DESC LIMIT 50'
+            ).fetchall()
\ No newline at end of file
@@ -0,0 +1,86 @@
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+try:
+    import msgpack
+except ImportError:  # optional: only needed for format=msgpack
+    msgpack = None
+
+# Encodings for /api/quotes. 'json' is a list of quote objects; 'columnar'
+# is one array per field (symbol names are not repeated per quote), and
+# 'msgpack' is the columnar layout in MessagePack.
+
+FORMATS = ('json', 'columnar', 'msgpack')
+MIMETYPES = {
+    'json': 'application/json',
+    'columnar': 'application/json',
+    'msgpack': 'application/x-msgpack'
+}
+FIELDS = ('symbol', 'price', 'currency', 'market_state', 'previous_close', 'timestamp', 'stale')
+GZIP_MIN_BYTES = 512
+
+
+def available(fmt):
+    return fmt != 'msgpack' or msgpack is not None
+
+
+def etag(quotes, errors):
+    """Validator for a quote set; changes whenever any price, timestamp or error does."""
+    digest = hashlib.blake2b(digest_size=12)
+    for symbol, quote in quotes.items():
+        digest.update(f"{symbol}|{quote['price']}|{quote['timestamp']}|{quote.get('stale', False)}\n".encode())
+    for symbol in sorted(errors):
+        digest.update(f"!{symbol}\n".encode())
+    return digest.hexdigest()
+
+
+def columnar(quotes, errors):
+    rows = list(quotes.values())
+    data = {field: [row.get(field) for row in rows] for field in FIELDS}
+    data['stale'] = [bool(stale) for stale in data['stale']]
+    data['errors'] = sorted(errors)
+    return data
+
+
+def encode(quotes, errors, fmt):
+    if fmt == 'columnar':
+        return json.dumps(columnar(quotes, errors), separators=(',', ':')).encode()
+    if fmt == 'msgpack':
+        return msgpack.packb(columnar(quotes, errors))
+    return json.dumps({'quotes': list(quotes.values()), 'errors': sorted(errors)},
+                      separators=(',', ':')).encode()
+
+
+class EncodedCache:
+    """Small LRU of encoded response bodies keyed by (etag, format, gzip).
+
+    Clients polling the same symbols get byte-identical bodies, so a quote
+    set is serialized (and compressed) once per change rather than once per
+    request.
+    """
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, tag, fmt, compress, quotes, errors):
+        """Returns (body, gzipped); bodies under GZIP_MIN_BYTES are never compressed."""
+        key = (tag, fmt, compress)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                return entry
+        body = encode(quotes, errors, fmt)
+        gzipped = compress and len(body) >= GZIP_MIN_BYTES
+        if gzipped:
+            body = gzip.compress(body, compresslevel=6)
+        with self.lock:
+            self.entries[key] = (body, gzipped)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        return body, gzipped
@@ -0,0 +1,181 @@
+import logging
+import random
+import threading
+import time
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class PriceRefresher:
+    """Keeps the quote cache warm for the symbols users care about.
+
+    The tracked symbols are the union of the watchlist, open portfolio
+    positions, alert symbols and Config.DEFAULT_SYMBOLS, reloaded every
+    `reload_interval` seconds. Symbols looked up in the cache during the
+    last PRICE_UPDATE_INTERVAL are refreshed just before their cached quote
+    expires, so requests for them never wait on the provider; the others
+    are refreshed once per PRICE_UPDATE_INTERVAL. Refreshes are scheduled
+    from the cached quote's own fetch time, so a quote a request already
+    fetched is not fetched again early.
+
+    A background thread wakes every `tick` seconds and refreshes the due
+    symbols with batched fetch_quotes calls. It uses at most `rate_share` of
+    one rate-limit burst per tick, in upstream requests: `batch_size`
+    symbols each, or one while the batch endpoint fails and symbols fall
+    back to chart requests. When more symbols are due, the most requested
+    (lookups decayed with PRICE_UPDATE_INTERVAL as half-life) go first and
+    the rest wait for the next tick, which also spreads a cold start over
+    several ticks. A small fixed jitter on each symbol's period
+    keeps symbols fetched together from staying in lock-step.
+    """
+
+    def __init__(self, stock_api, db, portfolio, config=None):
+        self.config = config or Config()
+        self.stock_api = stock_api
+        self.db = db
+        self.portfolio = portfolio
+        self.interval = self.config.PRICE_UPDATE_INTERVAL
+        self.tick = self.config.PRICE_REFRESH_TICK
+        self.reload_interval = self.config.PRICE_REFRESH_RELOAD_INTERVAL
+        self.rate_share = self.config.PRICE_REFRESH_RATE_SHARE
+        self.batch_size = max(1, self.config.STOCK_API_BATCH_SIZE)
+        # Requested symbols are refreshed this long after their fetch, two ticks before expiry
+        self.min_period = min(self.interval, max(self.tick, stock_api.cache.ttl - 2 * self.tick))
+
+        self.symbols = {}  # symbol -> its fixed period jitter factor
+        self.scores = {}  # symbol -> decayed cache lookups
+        self.retry_at = {}  # symbol -> earliest retry after a failed refresh
+        self.overdue = 0
+        self.last_reload = 0.0
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.thread = None
+        self.counters = {'refreshed': 0, 'failed': 0, 'deferred': 0, 'ticks': 0}
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.stock_api.cache.track_demand()
+                self.stopping.clear()
+                self.thread = threading.Thread(target=self._run, name='price-refresher', daemon=True)
+                self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join(timeout=self.tick + 5)
+            self.thread = None
+
+    def tracked_symbols(self):
+        symbols = {symbol.upper() for symbol in self.config.DEFAULT_SYMBOLS}
+        symbols.update(row[0] for row in self.db.get_watchlist())
+        symbols.update(row[1] for row in self.db.get_alerts() if row[6])
+        positions, _ = self.portfolio.load_positions()
+        symbols.update(row[0] for row in positions)
+        return symbols
+
+    def reload(self):
+        symbols = self.tracked_symbols()
+        with self.lock:
+            self.symbols = {symbol: self.symbols.get(symbol) or random.uniform(0.9, 1.0) for symbol in symbols}
+            for table in (self.scores, self.retry_at):
+                for symbol in set(table) - symbols:
+                    del table[symbol]
+        self.last_reload = time.monotonic()
+        return len(symbols)
+
+    def period(self, symbol):
+        # A single lookup scores 1 and decays below 0.5 after one interval
+        return self.min_period if self.scores.get(symbol, 0.0) >= 0.5 else self.interval
+
+    def _update_scores(self, elapsed):
+        demand = self.stock_api.cache.take_demand()
+        decay = 0.5 ** (elapsed / self.interval)
+        with self.lock:
+            for symbol in self.symbols:
+                score = self.scores.get(symbol, 0.0) * decay + demand.get(symbol, 0)
+                if score > 0.01:
+                    self.scores[symbol] = score
+                else:
+                    self.scores.pop(symbol, None)
+
+    def budget(self):
+        """Symbols that may be refreshed this tick, None when the rate limit is off."""
+        limiter = self.stock_api.rate_limiter
+        if limiter.rate <= 0:
+            return None
+        # Never more than our share of one burst, so requests behind us still find tokens
+        requests = max(1, int(self.rate_share * min(limiter.rate * self.tick, limiter.capacity)))
+        if not self.stock_api.batch_working:
+            # Batches are failing and every symbol falls back to its own chart request:
+            # one symbol per request, less the batch attempt that detects recovery
+            return max(1, requests - 1)
+        return requests * self.batch_size
+
+    def due_symbols(self, now):
+        """Symbols to refresh now, most requested first, capped at the tick budget."""
+        cache = self.stock_api.cache
+        due = []
+        with self.lock:
+            for symbol, jitter in self.symbols.items():
+                if self.retry_at.get(symbol, 0) > now:
+                    continue
+                # Uncached (never fetched, or evicted) symbols are due straight away
+                stored_at = cache.stored_at(symbol) or 0
+                if stored_at + self.period(symbol) * jitter <= now:
+                    due.append((-self.scores.get(symbol, 0.0), stored_at, symbol))
+            due.sort()
+            self.overdue = len(due)
+            budget = self.budget()
+            if budget is not None and len(due) > budget:
+                self.counters['deferred'] += len(due) - budget
+                due = due[:budget]
+        return [symbol for _, _, symbol in due]
+
+    def refresh(self, symbols):
+        # While batches work the budget assumes one request per batch, so a batch that
+        # fails now must not turn into a chart request per symbol
+        quotes, errors = self.stock_api.fetch_quotes(symbols, refresh=True,
+                                                     batch_only=self.stock_api.batch_working)
+        now = time.time()
+        with self.lock:
+            for symbol in errors:
+                self.retry_at[symbol] = now + self.min_period
+            for symbol in quotes:
+                self.retry_at.pop(symbol, None)
+            self.counters['refreshed'] += len(quotes)
+            self.counters['failed'] += len(errors)
+        for error in errors.values():
+            logger.debug(error)
+        return len(quotes)
+
+    def run_once(self, elapsed):
+        if time.monotonic() - self.last_reload >= self.reload_interval:
+            self.reload()
+        self._update_scores(elapsed)
+        symbols = self.due_symbols(time.time())
+        if symbols:
+            self.refresh(symbols)
+        self.counters['ticks'] += 1
+        return len(symbols)
+
+    def _run(self):
+        last = time.monotonic()
+        while not self.stopping.is_set():
+            started = time.monotonic()
+            try:
+                self.run_once(started - last)
+            except Exception:
+                logger.exception("Price refresh failed")
+            last = started
+            self.stopping.wait(max(0.0, self.tick - (time.monotonic() - started)))
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+            stats['symbols'] = len(self.symbols)
+            stats['requested_symbols'] = sum(1 for score in self.scores.values() if score >= 0.5)
+            stats['overdue'] = self.overdue
+        return stats
@@ -0,0 +1,87 @@
+from config import Config
+
+# Bar resolutions kept for every symbol, in seconds, finest first
+RESOLUTIONS = {
+    '1m': 60,
+    '1h': 3600,
+    '1d': 86400
+}
+
+UPSERT_BAR = '''
+    INSERT INTO price_bars (symbol, resolution, bucket, open, high, low, close, ticks, open_ts, close_ts)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(symbol, resolution, bucket) DO UPDATE SET
+        open = CASE WHEN excluded.open_ts < price_bars.open_ts THEN excluded.open ELSE price_bars.open END,
+        open_ts = MIN(price_bars.open_ts, excluded.open_ts),
+        high = MAX(price_bars.high, excluded.high),
+        low = MIN(price_bars.low, excluded.low),
+        close = CASE WHEN excluded.close_ts >= price_bars.close_ts THEN excluded.close ELSE price_bars.close END,
+        close_ts = MAX(price_bars.close_ts, excluded.close_ts),
+        ticks = price_bars.ticks + excluded.ticks
+'''
+
+
+def aggregate(ticks):
+    """Fold (symbol, price, currency, timestamp) rows into partial OHLC bars.
+
+    Returns UPSERT_BAR parameter tuples, one per symbol/resolution/bucket, so
+    a batch of ticks costs one upsert per touched bar rather than per tick.
+    """
+    bars = {}
+    for symbol, price, _currency, ts in ticks:
+        for seconds in RESOLUTIONS.values():
+            key = (symbol, seconds, ts - ts % seconds)
+            bar = bars.get(key)
+            if bar is None:
+                bars[key] = [price, price, price, price, 1, ts, ts]
+                continue
+            if ts < bar[5]:
+                bar[0], bar[5] = price, ts
+            bar[1] = max(bar[1], price)
+            bar[2] = min(bar[2], price)
+            if ts >= bar[6]:
+                bar[3], bar[6] = price, ts
+            bar[4] += 1
+    return [key + tuple(bar) for key, bar in bars.items()]
+
+
+def apply_ticks(conn, ticks):
+    conn.executemany(UPSERT_BAR, aggregate(ticks))
+
+
+def rebuild(conn, chunk_size=50000):
+    # Recompute every bar from the raw ticks still in stock_prices
+    conn.execute('DELETE FROM price_bars')
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            'SELECT id, symbol, price, currency, timestamp FROM stock_prices WHERE id > ? ORDER BY id LIMIT ?',
+            (last_id, chunk_size)
+        ).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        apply_ticks(conn, [row[1:] for row in rows])
+
+
+def choose_resolution(start, end, max_points):
+    """Finest resolution that covers [start, end] in at most max_points bars."""
+    span = max(end - start, 1)
+    for name, seconds in RESOLUTIONS.items():
+        if span / seconds <= max_points:
+            return name
+    return '1d'
+
+
+def get_bars(conn, symbol, resolution, start=None, end=None, limit=None):
+    limit = limit or Config.MAX_HISTORY_RECORDS  # callers cap it with their own config
+    seconds = RESOLUTIONS[resolution]
+    return conn.execute(
+        '''SELECT bucket, open, high, low, close, ticks FROM price_bars
+           WHERE symbol = ? AND resolution = ? AND bucket >= ? AND bucket <= ?
+           ORDER BY bucket DESC LIMIT ?''',
+        (symbol, seconds,
+         (start - start % seconds) if start is not None else 0,
+         end if end is not None else 2 ** 62,
+         limit)
+    ).fetchall()
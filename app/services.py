@@ -0,0 +1,168 @@
+import functools
+import threading
+from config import Config
+
+# Components are imported inside their builders, so a script that only needs
+# the database never pays for requests, numpy or Flask at startup.
+
+
+def service(build):
+    """Turn a builder method into a lazily built, per-container attribute."""
+    name = build.__name__
+
+    @property
+    @functools.wraps(build)
+    def getter(self):
+        try:
+            return self._built[name]
+        except KeyError:
+            pass
+        with self._lock:
+            if name not in self._built:
+                self._built[name] = build(self)
+            return self._built[name]
+    return getter
+
+
+class Services:
+    """The application's components, each built from `config` on first use.
+
+    All of them share one connection pool for Config.DATABASE_PATH, whose
+    schema is migrated once, when the first database-backed component is
+    built. Construction is thread-safe, so concurrent first requests still
+    get a single instance of each.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or Config()
+        self._built = {}
+        self._lock = threading.RLock()
+
+    @service
+    def connections(self):
+        from app.connection import ConnectionManager
+        connections = ConnectionManager.for_path(self.config.DATABASE_PATH)
+        connections.ensure_schema()
+        return connections
+
+    @service
+    def stock_api(self):
+        from app.stock_api import StockAPI
+        return StockAPI(self.config)
+
+    @service
+    def db(self):
+        from app.database import Database
+        return Database(connections=self.connections, write_behind=self.config.TICK_WRITE_BEHIND,
+                        cold_store=self.cold_store, config=self.config)
+
+    @service
+    def cold_store(self):
+        from app import cold_storage
+        if not cold_storage.available():
+            return None
+        return cold_storage.ColdStore(self.config.COLD_STORAGE_PATH)
+
+    @service
+    def alert_system(self):
+        from app.alerts import AlertSystem
+        alert_system = AlertSystem(self.config)
+        alert_system.attach(self.db)
+        return alert_system
+
+    @service
+    def portfolio(self):
+        from app.portfolio import Portfolio
+        return Portfolio(connections=self.connections, cost_basis_method=self.config.COST_BASIS_METHOD)
+
+    @service
+    def indicators(self):
+        from app.indicators import IndicatorEngine
+        return IndicatorEngine(self.db, max_limit=self.config.MAX_HISTORY_RECORDS,
+                               max_entries=self.config.INDICATOR_CACHE_SIZE)
+
+    @service
+    def broadcaster(self):
+        from app.streaming import QuoteBroadcaster
+        return QuoteBroadcaster(self.stock_api, config=self.config)
+
+    @service
+    def refresher(self):
+        from app.refresher import PriceRefresher
+        return PriceRefresher(self.stock_api, self.db, self.portfolio, config=self.config)
+
+    @service
+    def encoded_quotes(self):
+        from app.quote_encoding import EncodedCache
+        return EncodedCache()
+
+    @service
+    def notifier(self):
+        from app.notifications import NotificationDispatcher
+        return NotificationDispatcher(self.connections, self.config)
+
+    def provide(self, name, component):
+        """Use `component` for `name` instead of building it (benchmarks swap the database this way)."""
+        with self._lock:
+            self._built[name] = component
+
+    def built(self, name):
+        return name in self._built
+
+    def start_refresher(self):
+        # Started by the first request rather than at app creation, so it also runs after a fork
+        if self.config.PRICE_REFRESH_ENABLED and not self.built('refresher'):
+            self.refresher.start()
+
+    def collect_metrics(self):
+        """Scrape-time metric families (see metrics.Registry.render) from the built components."""
+        families = []
+        if self.built('stock_api'):
+            stock_api = self.stock_api
+            cache = stock_api.cache.stats()
+            families.append(('stockwatcher_quote_cache_lookups_total', 'counter', 'Quote cache lookups by outcome',
+                             [({'result': key}, cache[key])
+                              for key in ('hits', 'stale_hits', 'misses', 'coalesced', 'shared_hits')]))
+            families.append(('stockwatcher_quote_cache_entries', 'gauge', 'Quotes held in the cache',
+                             [({}, cache['size'])]))
+            http = stock_api.http.metrics()
+            families.append(('stockwatcher_upstream_events_total', 'counter', 'Quote provider client events',
+                             [({'event': key}, http[key])
+                              for key in ('requests', 'retries', 'failures', 'connections_opened',
+                                          'circuit_rejections', 'circuit_opens')]))
+            families.append(('stockwatcher_upstream_circuit_open', 'gauge', '1 while the circuit breaker is open',
+                             [({}, int(http['circuit_state'] == 'open'))]))
+            families.append(('stockwatcher_symbols_known', 'gauge', 'Symbols in the symbol registry',
+                             [({}, len(stock_api.symbols))]))
+        if self.built('db') and self.db.tick_writer is not None:
+            ticks = self.db.ingest_stats()
+            families.append(('stockwatcher_tick_writer_rows_total', 'counter', 'Price ticks written behind',
+                             [({}, ticks['rows_written'])]))
+            families.append(('stockwatcher_tick_writer_queue_depth', 'gauge', 'Price ticks waiting to be written',
+                             [({}, ticks['queue_depth'])]))
+        if self.built('refresher'):
+            refresh = self.refresher.stats()
+            families.append(('stockwatcher_price_refresh_total', 'counter', 'Background quote refreshes by outcome',
+                             [({'result': key}, refresh[key]) for key in ('refreshed', 'failed', 'deferred')]))
+            families.append(('stockwatcher_price_refresh_symbols', 'gauge', 'Symbols kept warm by the refresher',
+                             [({}, refresh['symbols'])]))
+            families.append(('stockwatcher_price_refresh_overdue', 'gauge', 'Tracked symbols past their refresh time',
+                             [({}, refresh['overdue'])]))
+        if self.built('broadcaster'):
+            stream = self.broadcaster.stats()
+            families.append(('stockwatcher_stream_subscribers', 'gauge', 'Open /api/stream connections',
+                             [({}, stream['subscribers'])]))
+        return families
+
+    def close(self):
+        """Stop background work of whatever was built."""
+        if self.built('refresher'):
+            self.refresher.stop()
+        if self.built('broadcaster'):
+            self.broadcaster.close()
+        if self.built('notifier'):
+            self.notifier.stop()
+        if self.built('db'):
+            self.db.close()
+        if self.built('stock_api'):
+            self.stock_api.http.close()
@@ -1,66 +1,232 @@
 import requests
-import json
+import logging
 import time
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from app import metrics
+from app.cache import QuoteCache, SharedQuoteCache
+from app.http_client import HTTPClient, CircuitBreaker, CircuitOpenError
+from app.rate_limiter import TokenBucket
+from app.symbols import SymbolRegistry
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Whole calls, cache hits included (upstream requests are in stockwatcher_upstream_request_seconds)
+CALL_SECONDS = metrics.histogram('stockwatcher_stock_api_call_seconds', 'StockAPI quote lookup latency',
+                                 labels=('method',))
+
+
+def parse_chart(symbol, payload):
+    """Quote dict from a chart endpoint response body."""
+    meta = payload['chart']['result'][0]['meta']
+    return {
+        'symbol': symbol.upper(),
+        'price': meta['regularMarketPrice'],
+        'currency': meta['currency'],
+        'market_state': meta.get('marketState', 'UNKNOWN'),
+        'previous_close': meta.get('previousClose'),
+        'timestamp': datetime.now().isoformat()
+    }
+
+
+def parse_batch(quotes):
+    """Quote dicts by symbol from a multi-quote result list, skipping unpriced entries."""
+    results = {}
+    now = datetime.now().isoformat()
+    for quote in quotes:
+        if quote.get('regularMarketPrice') is None:
+            continue
+        symbol = quote['symbol'].upper()
+        results[symbol] = {
+            'symbol': symbol,
+            'price': quote['regularMarketPrice'],
+            'currency': quote.get('currency'),
+            'market_state': quote.get('marketState', 'UNKNOWN'),
+            'previous_close': quote.get('regularMarketPreviousClose'),
+            'timestamp': now
+        }
+    return results
+
 
 class StockAPI:
-    def __init__(self):
-        self.base_url = "https://query1.finance.yahoo.com/v8/finance/chart/"
-        self.cache = {}
-        self.cache_ttl = 60  # Cache for 60 seconds
-    
-    def get_stock_price(self, symbol):
-        # Check cache first
-        cache_key = symbol.upper()
-        if cache_key in self.cache:
-            cached_data, timestamp = self.cache[cache_key]
-            if time.time() - timestamp < self.cache_ttl:
-                return cached_data
-        
+    def __init__(self, config=None):
+        self.config = config or Config()
+        self.base_url = f"{self.config.STOCK_API_BASE_URL}/v8/finance/chart/"
+        self.quote_url = f"{self.config.STOCK_API_BASE_URL}/v7/finance/quote"
+        self.timeout = self.config.STOCK_API_TIMEOUT
+        shared_cache = None
+        if self.config.SHARED_CACHE_PATH:
+            shared_cache = SharedQuoteCache(self.config.SHARED_CACHE_PATH)
+        self.cache = QuoteCache(max_size=self.config.QUOTE_CACHE_SIZE,
+                                ttl=self.config.QUOTE_CACHE_TTL,
+                                stale_ttl=self.config.QUOTE_CACHE_STALE_TTL,
+                                backend=shared_cache)
+        self.symbols = SymbolRegistry(self.config.SYMBOL_LIST_PATH,
+                                      negative_ttl=self.config.SYMBOL_NEGATIVE_TTL)
+        self.rate_limiter = TokenBucket(self.config.STOCK_API_RATE_LIMIT,
+                                        self.config.STOCK_API_RATE_BURST)
+        self.max_workers = self.config.STOCK_API_MAX_WORKERS
+        self.batch_size = self.config.STOCK_API_BATCH_SIZE
+        # False after a failed multi-quote request until one succeeds again;
+        # meanwhile fetch_quotes costs one chart request per symbol
+        self.batch_working = True
+        self.http = HTTPClient(
+            pool_size=self.config.STOCK_API_POOL_SIZE,
+            timeout=self.timeout,
+            max_retries=self.config.STOCK_API_MAX_RETRIES,
+            backoff_base=self.config.STOCK_API_BACKOFF_BASE,
+            backoff_max=self.config.STOCK_API_BACKOFF_MAX,
+            breaker=CircuitBreaker(self.config.STOCK_API_BREAKER_THRESHOLD,
+                                   self.config.STOCK_API_BREAKER_RESET),
+            rate_limiter=self.rate_limiter
+        )
+
+    def _store(self, stock_data):
+        self.cache.set(stock_data['symbol'], stock_data)
+        self.symbols.add(stock_data['symbol'])
+
+    def _fetch_chart(self, symbol):
+        """Fetch one symbol from the chart endpoint.
+
+        Returns a ``(stock_data, error)`` pair; exactly one of them is None.
+        """
         try:
             url = f"{self.base_url}{symbol}"
-            response = requests.get(url, timeout=10)
-            
+            response = self.http.get(url)
+
             if response.status_code == 200:
-                data = response.json()
-                result = data['chart']['result'][0]
-                current_price = result['meta']['regularMarketPrice']
-                
-                stock_data = {
-                    'symbol': symbol.upper(),
-                    'price': current_price,
-                    'currency': result['meta']['currency'],
-                    'market_state': result['meta'].get('marketState', 'UNKNOWN'),
-                    'previous_close': result['meta'].get('previousClose'),
-                    'timestamp': datetime.now().isoformat()
-                }
-                
-                # Cache the result
-                self.cache[cache_key] = (stock_data, time.time())
-                return stock_data
+                return parse_chart(symbol, response.json()), None
             else:
-                print(f"API returned status {response.status_code} for {symbol}")
-                return None
-                
+                if response.status_code == 404:
+                    self.symbols.reject(symbol.upper())
+                return None, f"API returned status {response.status_code} for {symbol}"
+
+        except CircuitOpenError:
+            return None, f"Upstream circuit open, not fetching {symbol}"
         except requests.exceptions.Timeout:
-            print(f"Timeout fetching stock data for {symbol}")
-            return None
+            return None, f"Timeout fetching stock data for {symbol}"
         except requests.exceptions.ConnectionError:
-            print(f"Connection error fetching stock data for {symbol}")
-            return None
+            return None, f"Connection error fetching stock data for {symbol}"
         except Exception as e:
-            print(f"Error fetching stock data for {symbol}: {e}")
+            return None, f"Error fetching stock data for {symbol}: {e}"
+
+    def _fetch_batch(self, symbols):
+        """Fetch several symbols with one multi-quote request.
+
+        Returns a dict of the symbols the provider answered for, so the
+        caller can fall back to per-symbol fetches for the rest; None when
+        the request itself failed.
+        """
+        try:
+            response = self.http.get(self.quote_url, params={'symbols': ','.join(symbols)})
+            if response.status_code != 200:
+                self.batch_working = False
+                return None
+            quotes = response.json()['quoteResponse']['result'] or []
+        except Exception:
+            self.batch_working = False
             return None
-    
+
+        self.batch_working = True
+        return parse_batch(quotes)
+
+    def _load(self, symbol):
+        stock_data, error = self._fetch_chart(symbol)
+        if error:
+            logger.warning(error)
+        else:
+            self.symbols.add(stock_data['symbol'])
+        return stock_data
+
+    @metrics.timed(CALL_SECONDS.labels('get_stock_price'))
+    def get_stock_price(self, symbol):
+        # Served from cache when fresh; concurrent misses share one fetch
+        return self.cache.get_or_load(symbol.upper(), lambda: self._load(symbol))
+
+    @metrics.timed(CALL_SECONDS.labels('fetch_quotes'))
+    def fetch_quotes(self, symbols, allow_stale=False, refresh=False, batch_only=False):
+        """Fetch many symbols at once.
+
+        Cached symbols are served directly. The rest are grouped into
+        multi-quote requests of ``batch_size`` symbols; anything the batch
+        endpoint does not answer is fetched from the chart endpoint through a
+        bounded worker pool. All upstream calls share the token bucket.
+
+        Returns ``(results, errors)``: ``results`` maps symbol to quote data
+        in input order and ``errors`` maps each failed symbol to a message.
+        With ``allow_stale``, a failed symbol that still has an expired cache
+        entry is returned from it as a copy flagged ``'stale': True`` (and
+        stays listed in ``errors``). ``refresh`` skips the cache lookup and
+        fetches every symbol, still storing the results. Symbols the symbol
+        registry knows to be invalid fail without an upstream request. With
+        ``batch_only``, the symbols of a failed multi-quote request fail too
+        instead of costing one chart request each.
+        """
+        ordered = list(dict.fromkeys(s.upper() for s in symbols))
+        found = {} if refresh else self.cache.get_many(ordered)
+        errors = self.unknown_symbols([symbol for symbol in ordered if symbol not in found])
+        missing = [symbol for symbol in ordered if symbol not in found and symbol not in errors]
+
+        if missing and self.batch_size > 1 and len(missing) > 1:
+            batches = [missing[i:i + self.batch_size]
+                       for i in range(0, len(missing), self.batch_size)]
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as pool:
+                for batch, batch_results in zip(batches, pool.map(self._fetch_batch, batches)):
+                    if batch_results is None and batch_only:
+                        errors.update((symbol, f"Multi-quote request failed for {symbol}") for symbol in batch)
+                    for symbol, stock_data in (batch_results or {}).items():
+                        self._store(stock_data)
+                        found[symbol] = stock_data
+            missing = [s for s in missing if s not in found and s not in errors]
+
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(missing))) as pool:
+                for symbol, (stock_data, error) in zip(missing, pool.map(self._fetch_chart, missing)):
+                    if error:
+                        errors[symbol] = error
+                    else:
+                        self._store(stock_data)
+                        found[symbol] = stock_data
+
+        return self.collect(ordered, found, errors, allow_stale)
+
+    def unknown_symbols(self, symbols):
+        return {symbol: f"Unknown symbol {symbol}" for symbol in symbols
+                if self.symbols.lookup(symbol) is False}
+
+    def collect(self, ordered, found, errors, allow_stale=False):
+        """``(results, errors)`` for fetch_quotes: `found` in `ordered` order, plus stale fallbacks."""
+        if allow_stale:
+            for symbol in errors:
+                stale_data = self.cache.peek(symbol)
+                if stale_data:
+                    found[symbol] = dict(stale_data, stale=True)
+
+        results = {symbol: found[symbol] for symbol in ordered if symbol in found}
+        return results, errors
+
     def get_multiple_prices(self, symbols):
-        results = {}
-        for symbol in symbols:
-            data = self.get_stock_price(symbol)
-            if data:
-                results[symbol.upper()] = data
-            time.sleep(0.1)  # Rate limiting
+        results, errors = self.fetch_quotes(symbols)
+        for error in errors.values():
+            logger.warning(error)
         return results
-    
+
+    def freshness(self, symbols):
+        """Seconds until the first of these cached quotes expires (0 if any is missing or stale)."""
+        oldest = self.cache.oldest([symbol.upper() for symbol in symbols])
+        if oldest is None:
+            return 0
+        return max(0, int(self.cache.ttl - (time.time() - oldest)))
+
+    def client_stats(self):
+        stats = self.http.metrics()
+        stats['cache'] = self.cache.stats()
+        return stats
+
     def validate_symbol(self, symbol):
-        data = self.get_stock_price(symbol)
-        return data is not None
\ No newline at end of file
+        # Answered by the symbol registry; only symbols it has never seen cost a quote fetch
+        known = self.symbols.lookup(symbol.upper())
+        if known is not None:
+            return known
+        return self.get_stock_price(symbol) is not None
@@ -0,0 +1,150 @@
+import logging
+import threading
+import time
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """One streaming client: its symbols and the quotes waiting to be sent.
+
+    Pending quotes are coalesced per symbol, so a slow client only ever
+    receives the latest quote for each symbol instead of a growing backlog.
+    Threaded clients block in `get`; async ones pass `on_ready`, called from
+    the pushing thread whenever quotes arrive or the subscription closes,
+    and then take the quotes with `get(timeout=0)`.
+    """
+
+    def __init__(self, symbols, on_ready=None):
+        self.symbols = frozenset(symbols)
+        self.pending = {}
+        self.ready = threading.Condition()
+        self.on_ready = on_ready
+        self.closed = False
+
+    def push(self, quote):
+        with self.ready:
+            self.pending[quote['symbol']] = quote
+            self.ready.notify()
+        if self.on_ready is not None:
+            self.on_ready()
+
+    def get(self, timeout=None):
+        """Quotes pending for this client, waiting up to `timeout` seconds; [] on timeout."""
+        with self.ready:
+            if not self.pending and not self.closed:
+                self.ready.wait(timeout)
+            quotes = list(self.pending.values())
+            self.pending.clear()
+            return quotes
+
+    def close(self):
+        with self.ready:
+            self.closed = True
+            self.ready.notify_all()
+        if self.on_ready is not None:
+            self.on_ready()
+
+
+class QuoteBroadcaster:
+    """One shared quote poller fanned out to every streaming client.
+
+    While anyone is subscribed, a background thread fetches the union of all
+    subscribed symbols once per `interval` (one batched fetch_quotes call
+    through the quote cache, so fresh quotes, e.g. kept warm by the price
+    refresher, cost no upstream request) and pushes each quote that changed
+    to the clients watching that symbol. New subscribers get the last known quotes
+    straight away. The thread exits when the last client leaves.
+    """
+
+    def __init__(self, stock_api, interval=None, config=None):
+        self.config = config or Config()
+        self.stock_api = stock_api
+        self.interval = interval or self.config.STREAM_INTERVAL
+        self.subscriptions = set()
+        self.latest = {}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+        self.polls = 0
+
+    def subscribe(self, symbols, on_ready=None):
+        sub = Subscription((s.upper() for s in symbols), on_ready)
+        with self.lock:
+            self.subscriptions.add(sub)
+            known = [self.latest[s] for s in sub.symbols if s in self.latest]
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='quote-stream', daemon=True)
+                self.thread.start()
+        for quote in known:
+            sub.push(quote)
+        if len(known) < len(sub.symbols):
+            self.wakeup.set()  # fetch the new symbols now rather than at the next interval
+        return sub
+
+    def unsubscribe(self, sub):
+        sub.close()
+        with self.lock:
+            self.subscriptions.discard(sub)
+
+    def symbols(self):
+        with self.lock:
+            return sorted(set().union(*(sub.symbols for sub in self.subscriptions)))
+
+    def poll(self):
+        symbols = self.symbols()
+        if not symbols:
+            return 0
+        quotes, errors = self.stock_api.fetch_quotes(symbols)
+        for symbol, error in errors.items():
+            logger.warning(error)
+
+        changed = []
+        with self.lock:
+            self.polls += 1
+            for symbol, quote in quotes.items():
+                previous = self.latest.get(symbol)
+                self.latest[symbol] = quote
+                if previous is None or previous['price'] != quote['price'] \
+                        or previous.get('market_state') != quote.get('market_state'):
+                    changed.append(quote)
+            # Forget symbols nobody watches so a later subscriber never gets an old quote
+            for symbol in set(self.latest) - set(symbols):
+                del self.latest[symbol]
+            subscriptions = list(self.subscriptions)
+        for sub in subscriptions:
+            for quote in changed:
+                if quote['symbol'] in sub.symbols:
+                    sub.push(quote)
+        return len(changed)
+
+    def _run(self):
+        while True:
+            with self.lock:
+                if not self.subscriptions:
+                    self.thread = None
+                    return
+            started = time.monotonic()
+            self.wakeup.clear()
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("Quote stream poll failed")
+            self.wakeup.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def close(self):
+        with self.lock:
+            subscriptions = list(self.subscriptions)
+            self.subscriptions.clear()
+        for sub in subscriptions:
+            sub.close()
+        self.wakeup.set()
+
+    def stats(self):
+        with self.lock:
+            return {
+                'subscribers': len(self.subscriptions),
+                'symbols': len(set().union(*(sub.symbols for sub in self.subscriptions))),
+                'polls': self.polls
+            }
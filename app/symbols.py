@@ -0,0 +1,150 @@
+import bisect
+import csv
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# Anything outside this can never be a quote symbol (e.g. AAPL, BRK-B, ^GSPC, EURUSD=X, 7203.T)
+SYMBOL_PATTERN = re.compile(r'[A-Z0-9^][A-Z0-9.\-=^&]{0,19}')
+# Words too common in security names to be worth indexing
+STOPWORDS = frozenset(('inc', 'corp', 'co', 'ltd', 'plc', 'the', 'of', 'and', 'class',
+                       'common', 'stock', 'shares', 'ordinary'))
+
+
+def _words(name):
+    return set(re.findall(r'[a-z0-9]+', name.lower())) - STOPWORDS
+
+
+class SymbolRegistry:
+    """Known quote symbols, for validating and autocompleting without quote fetches.
+
+    Symbols come from a CSV listing with symbol, name and exchange columns
+    (written by scripts/update_symbols.py), reloaded when the file changes,
+    plus every symbol a quote has been fetched for. Symbols the provider
+    answered 404 for are remembered as invalid for `negative_ttl` seconds.
+
+    The listing is indexed as a sorted symbol list and a sorted list of
+    (name word, symbol) pairs, so lookups are a set membership test and
+    prefix searches a bisect.
+    """
+
+    def __init__(self, path=None, negative_ttl=3600, max_negative=10000, check_interval=60):
+        self.path = path
+        self.negative_ttl = negative_ttl
+        self.max_negative = max_negative
+        self.check_interval = check_interval
+        # (listing, symbols, words), replaced as a whole on reload
+        self.index = ({}, [], [])
+        self.learned = set()
+        self.negative = OrderedDict()
+        self.mtime = None
+        self.checked_at = None
+        self.lock = threading.Lock()
+        self.load_lock = threading.Lock()
+
+    def _refresh(self):
+        # Re-read the listing when it changed, checking the file at most every check_interval
+        now = time.monotonic()
+        if self.path is None or (self.checked_at is not None and now - self.checked_at < self.check_interval):
+            return
+        with self.load_lock:
+            if self.checked_at is not None and now - self.checked_at < self.check_interval:
+                return
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except FileNotFoundError:
+                mtime = None
+            if mtime != self.mtime:
+                self.index = self._load(self.path) if mtime is not None else ({}, [], [])
+                self.mtime = mtime
+            self.checked_at = now
+
+    @staticmethod
+    def _load(path):
+        listing = {}
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                symbol = row['symbol'].strip().upper()
+                if SYMBOL_PATTERN.fullmatch(symbol):
+                    listing[symbol] = (row.get('name') or '', row.get('exchange') or '')
+        words = sorted((word, symbol) for symbol, (name, _) in listing.items() for word in _words(name))
+        return listing, sorted(listing), words
+
+    def __len__(self):
+        self._refresh()
+        return len(self.index[0]) + len(self.learned)
+
+    def lookup(self, symbol):
+        """True if `symbol` is known, False if known to be invalid, None if undecided."""
+        if not SYMBOL_PATTERN.fullmatch(symbol):
+            return False
+        self._refresh()
+        if symbol in self.index[0] or symbol in self.learned:
+            return True
+        with self.lock:
+            expires = self.negative.get(symbol)
+            if expires is None:
+                return None
+            if expires > time.monotonic():
+                return False
+            del self.negative[symbol]
+        return None
+
+    def add(self, symbol):
+        # A quote was fetched for `symbol`
+        if symbol in self.learned or symbol in self.index[0]:
+            return
+        with self.lock:
+            self.learned.add(symbol)
+            self.negative.pop(symbol, None)
+
+    def reject(self, symbol):
+        # The provider does not know `symbol`
+        with self.lock:
+            self.learned.discard(symbol)
+            self.negative[symbol] = time.monotonic() + self.negative_ttl
+            self.negative.move_to_end(symbol)
+            while len(self.negative) > self.max_negative:
+                self.negative.popitem(last=False)
+
+    def search(self, query, limit=10):
+        """Symbols starting with `query`, then symbols whose name has words starting with its words.
+
+        Returns up to `limit` dicts with symbol, name and exchange; an exact
+        symbol match comes first.
+        """
+        self._refresh()
+        listing, symbols, words = self.index
+        prefix = query.strip().upper()
+        if not prefix or limit <= 0:
+            return []
+        found = []
+        i = bisect.bisect_left(symbols, prefix)
+        while i < len(symbols) and symbols[i].startswith(prefix) and len(found) < limit:
+            found.append(symbols[i])
+            i += 1
+        if len(found) < limit:
+            found.extend(sorted(s for s in self.learned if s.startswith(prefix))[:limit - len(found)])
+            found.sort(key=lambda s: (s != prefix, s))
+
+        terms = list(_words(query)) or [query.strip().lower()]
+        terms.sort(key=len, reverse=True)  # the longest word narrows the scan the most
+        seen = set(found)
+        i = bisect.bisect_left(words, (terms[0],))
+        while i < len(words) and words[i][0].startswith(terms[0]) and len(found) < limit:
+            symbol = words[i][1]
+            i += 1
+            if symbol in seen:
+                continue
+            name_words = _words(listing[symbol][0])
+            if all(any(word.startswith(term) for word in name_words) for term in terms[1:]):
+                found.append(symbol)
+                seen.add(symbol)
+
+        results = []
+        for symbol in found:
+            name, exchange = listing.get(symbol, ('', ''))
+            results.append({'symbol': symbol, 'name': name, 'exchange': exchange})
+        return results
@@ -0,0 +1,130 @@
+import logging
+import queue
+import threading
+import time
+from app import rollups
+
+logger = logging.getLogger(__name__)
+
+INSERT_TICK = 'INSERT INTO stock_prices (symbol, price, currency, timestamp) VALUES (?, ?, ?, ?)'
+
+
+class TickWriter:
+    """Write-behind buffer for stock_prices inserts.
+
+    `submit` only enqueues the observation (stamped with the time it was
+    seen); a background thread drains the queue and writes up to
+    `batch_size` rows per transaction with executemany, at least every
+    `flush_interval` seconds. When the queue is full the row is written
+    synchronously instead of being dropped. `stop` flushes everything still
+    pending and is registered to run at interpreter exit by Database.
+    """
+
+    def __init__(self, connections, batch_size=500, flush_interval=1.0, max_queue=100000):
+        self.connections = connections
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.flush_lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.thread = None
+        self.stats_lock = threading.Lock()
+        self.counters = {
+            'rows_written': 0,
+            'batches': 0,
+            'sync_writes': 0,
+            'errors': 0,
+            'last_flush_ms': 0.0,
+            'max_flush_ms': 0.0,
+            'total_flush_ms': 0.0
+        }
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name='tick-writer', daemon=True)
+            self.thread.start()
+        return self
+
+    def submit(self, symbol, price, currency, timestamp=None):
+        row = (symbol, price, currency, int(timestamp or time.time()))
+        try:
+            self.queue.put_nowait(row)
+        except queue.Full:
+            with self.connections.transaction() as conn:
+                conn.execute(INSERT_TICK, row)
+                rollups.apply_ticks(conn, [row])
+            with self.stats_lock:
+                self.counters['sync_writes'] += 1
+
+    def _drain(self, first=None):
+        rows = [] if first is None else [first]
+        while len(rows) < self.batch_size:
+            try:
+                row = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if row is not None:
+                rows.append(row)
+        return rows
+
+    def _write(self, rows):
+        start = time.perf_counter()
+        try:
+            with self.connections.transaction() as conn:
+                conn.executemany(INSERT_TICK, rows)
+                rollups.apply_ticks(conn, rows)
+        except Exception as e:
+            logger.error(f"Failed to write {len(rows)} ticks: {e}")
+            with self.stats_lock:
+                self.counters['errors'] += 1
+            return
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self.stats_lock:
+            self.counters['rows_written'] += len(rows)
+            self.counters['batches'] += 1
+            self.counters['last_flush_ms'] = elapsed_ms
+            self.counters['max_flush_ms'] = max(self.counters['max_flush_ms'], elapsed_ms)
+            self.counters['total_flush_ms'] += elapsed_ms
+
+    def _run(self):
+        while not self.stopping.is_set():
+            try:
+                first = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            if first is None:  # woken by stop()
+                continue
+            # Give the batch a chance to fill before writing
+            deadline = time.monotonic() + self.flush_interval
+            while self.queue.qsize() < self.batch_size - 1 and time.monotonic() < deadline \
+                    and not self.stopping.is_set():
+                time.sleep(min(0.05, self.flush_interval))
+            with self.flush_lock:
+                self._write(self._drain(first))
+
+    def flush(self):
+        with self.flush_lock:
+            while True:
+                rows = self._drain()
+                if not rows:
+                    break
+                self._write(rows)
+
+    def stop(self):
+        self.stopping.set()
+        try:
+            self.queue.put_nowait(None)  # wake the writer instead of waiting out its poll timeout
+        except queue.Full:
+            pass
+        if self.thread is not None:
+            self.thread.join(timeout=self.flush_interval + 5)
+            self.thread = None
+        self.flush()
+
+    def stats(self):
+        with self.stats_lock:
+            stats = dict(self.counters)
+        stats['queue_depth'] = self.queue.qsize()
+        stats['avg_flush_ms'] = stats['total_flush_ms'] / stats['batches'] if stats['batches'] else 0.0
+        del stats['total_flush_ms']
+        return stats
@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+"""Production entry point: ``uvicorn asgi:app`` or ``python asgi.py``."""
+
+import argparse
+from app.asgi import AsyncApp
+from main import create_app
+
+flask_app = create_app()
+app = AsyncApp(flask_app, flask_app.extensions['stockwatcher'])
+
+if __name__ == '__main__':
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description='Serve StockWatcher over ASGI with uvicorn')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port)
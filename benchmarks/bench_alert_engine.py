@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Alert evaluation per price tick: threshold index vs scanning every alert."""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.alert_engine import CONDITIONS, Alert, AlertEngine
+
+
+def scan(alerts, symbol, price, previous, reference):
+    # The old approach: walk every alert and test its condition
+    fired = []
+    for alert in alerts:
+        if alert.symbol != symbol:
+            continue
+        t = alert.threshold
+        if alert.condition == 'above':
+            hit = price >= t
+        elif alert.condition == 'below':
+            hit = price <= t
+        elif alert.condition == 'cross':
+            hit = previous is not None and min(previous, price) < t <= max(previous, price)
+        elif alert.condition == 'near':
+            hit = abs(price - t) / t < alert.band_pct / 100.0
+        else:
+            hit = bool(reference) and abs(price / reference - 1.0) * 100 >= t
+        if hit:
+            fired.append(alert.id)
+    return fired
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--alerts', type=int, default=100_000)
+    parser.add_argument('--symbols', type=int, default=5000)
+    parser.add_argument('--ticks', type=int, default=20_000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    symbols = [f"SYM{i:04d}" for i in range(args.symbols)]
+    base = {symbol: rng.uniform(10, 500) for symbol in symbols}
+    alerts = []
+    for i in range(args.alerts):
+        symbol = rng.choice(symbols)
+        condition = rng.choice(CONDITIONS)
+        if condition == 'percent_move':
+            threshold = rng.uniform(1, 10)
+        else:
+            threshold = base[symbol] * rng.uniform(0.8, 1.2)
+        alerts.append(Alert(i + 1, symbol, condition, threshold, cooldown=0))
+
+    start = time.perf_counter()
+    engine = AlertEngine()
+    engine.load(alerts)
+    print(f"index build, {args.alerts:,} alerts      {(time.perf_counter() - start) * 1000:10.1f} ms")
+
+    ticks = []
+    for _ in range(args.ticks):
+        symbol = rng.choice(symbols)
+        ticks.append((symbol, base[symbol] * rng.uniform(0.8, 1.2)))
+
+    start = time.perf_counter()
+    indexed = []
+    for symbol, price in ticks:
+        indexed.append(sorted(a.id for a in engine.on_price(symbol, price, base[symbol], now=0)))
+    per_tick = (time.perf_counter() - start) / args.ticks
+    print(f"indexed evaluation              {per_tick * 1e6:10.1f} us/tick")
+
+    scan_ticks = min(args.ticks, 500)
+    previous = {}
+    start = time.perf_counter()
+    for i, (symbol, price) in enumerate(ticks[:scan_ticks]):
+        fired = sorted(scan(alerts, symbol, price, previous.get(symbol), base[symbol]))
+        previous[symbol] = price
+        assert fired == indexed[i], symbol
+    per_scan = (time.perf_counter() - start) / scan_ticks
+    print(f"full scan                       {per_scan * 1e6:10.1f} us/tick "
+          f"({per_scan / per_tick:.0f}x slower)")
+    print(f"indexed results match the scan for the first {scan_ticks} ticks")
+
+
+if __name__ == '__main__':
+    main()
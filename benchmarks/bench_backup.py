@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""Backup and export of a large tick database while a writer keeps inserting."""
+
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from app import backup
+from app.connection import ConnectionManager
+
+
+def populate(db_path, rows):
+    connections = ConnectionManager(db_path)
+    connections.ensure_schema()
+    with connections.transaction() as conn:
+        conn.executemany(
+            'INSERT INTO stock_prices (symbol, price, currency, timestamp) VALUES (?, ?, ?, ?)',
+            ((f"SYM{i % 500:03d}", 100 + i % 997 / 10, 'USD', 1700000000 + i) for i in range(rows))
+        )
+    connections.close_all()
+
+
+class Writer(threading.Thread):
+    """Inserts one tick every few milliseconds, recording commit latency."""
+
+    def __init__(self, db_path):
+        super().__init__(daemon=True)
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self.stopping = threading.Event()
+        self.latencies = []
+
+    def run(self):
+        while not self.stopping.is_set():
+            start = time.perf_counter()
+            self.conn.execute("INSERT INTO stock_prices (symbol, price, currency, timestamp) "
+                              "VALUES ('LIVE', 1.0, 'USD', 1800000000)")
+            self.conn.commit()
+            self.latencies.append(time.perf_counter() - start)
+            time.sleep(0.002)
+
+    def stop(self):
+        self.stopping.set()
+        self.join()
+        return len(self.latencies), max(self.latencies, default=0) * 1000
+
+
+def legacy_export(db_path, dest_path):
+    # Load every row into lists, then json.dump with indentation (the old export, minus its row cap)
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    data = {table: [dict(row) for row in conn.execute(f'SELECT * FROM {table}')]
+            for table in backup.SNAPSHOT_TABLES + backup.INCREMENTAL_TABLES}
+    conn.close()
+    with open(dest_path, 'w') as f:
+        json.dump(data, f, indent=2, default=str)
+
+
+def _child(func, results):
+    start_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    peak = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - start_rss) / 1024
+    results.put((elapsed, peak, result))
+
+
+def timed(label, func, writer=None):
+    # Runs in a forked child so the peak RSS growth belongs to this case alone
+    results = multiprocessing.Queue()
+    child = multiprocessing.Process(target=_child, args=(func, results))
+    child.start()
+    elapsed, peak, result = results.get()
+    child.join()
+    line = f"{label:<34} {elapsed:7.2f}s  peak RSS +{peak:6.0f} MB"
+    if writer is not None:
+        writes, worst = writer.stop()
+        line += f"  writer: {writes} commits, max {worst:.0f} ms"
+    print(line)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--new-rows', type=int, default=10000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    db_path = os.path.join(workdir, 'stock_data.db')
+    populate(db_path, args.rows)
+    print(f"{args.rows} ticks, {os.path.getsize(db_path) / 1e6:.0f} MB database")
+
+    try:
+        timed('shutil.copy2 (unsafe while live)',
+              lambda: shutil.copy2(db_path, os.path.join(workdir, 'copy.db')))
+
+        writer = Writer(db_path)
+        writer.start()
+        dest = os.path.join(workdir, 'backup.db')
+        timed('online backup, 1024 pages/step', lambda: backup.backup_database(db_path, dest), writer)
+        check = sqlite3.connect(dest)
+        print(f"  backup integrity: {check.execute('PRAGMA integrity_check').fetchone()[0]}, "
+              f"{check.execute('SELECT COUNT(*) FROM stock_prices').fetchone()[0]} ticks")
+        check.close()
+
+        timed('load-all json.dump export', lambda: legacy_export(db_path, os.path.join(workdir, 'legacy.json')))
+
+        writer = Writer(db_path)
+        writer.start()
+        dest = os.path.join(workdir, 'full.ndjson.gz')
+        state, counts = timed('streaming NDJSON.gz, full', lambda: backup.export_ndjson(db_path, dest), writer)
+        print(f"  {counts['stock_prices']} ticks, {os.path.getsize(dest) / 1e6:.0f} MB")
+
+        populate(db_path, args.new_rows)
+        dest = os.path.join(workdir, 'incremental.ndjson.gz')
+        state, counts = timed('streaming NDJSON.gz, incremental', lambda: backup.export_ndjson(db_path, dest, state))
+        print(f"  {counts['stock_prices']} new ticks, {os.path.getsize(dest) / 1e3:.0f} KB")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    multiprocessing.set_start_method('fork')
+    main()
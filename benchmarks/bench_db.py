@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Requests/sec for /api/stock and /api/watchlist with per-call vs pooled SQLite connections."""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from benchmarks.stub_server import StubServer
+
+
+class LegacyDatabase:
+    """The connect-per-call implementation the connection pool replaced."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+
+    def save_stock_price(self, symbol, price, currency):
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute(
+            'INSERT INTO stock_prices (symbol, price, currency) VALUES (?, ?, ?)',
+            (symbol, price, currency)
+        )
+        conn.commit()
+        conn.close()
+
+    def get_watchlist(self):
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT symbol, target_price, alert_enabled FROM watchlist ORDER BY created_at DESC')
+        results = cursor.fetchall()
+        conn.close()
+        return results
+
+
+def measure(app, path, count, threads):
+    def hit(_):
+        with app.test_client() as client:
+            return client.get(path).status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        statuses = list(pool.map(hit, range(count)))
+    elapsed = time.perf_counter() - start
+    assert all(status == 200 for status in statuses), set(statuses)
+    return count / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+
+    server = StubServer().start()
+    os.environ['STOCK_API_BASE_URL'] = server.base_url
+    workdir = tempfile.mkdtemp()
+    os.chdir(workdir)
+
+    import main as webapp
+
+    app = webapp.create_app()
+    services = app.extensions['stockwatcher']
+    for i in range(50):
+        services.db.add_to_watchlist(f"SYM{i:04d}", 100.0 + i)
+    services.stock_api.get_stock_price('AAPL')  # warm the quote cache
+
+    pooled_db = services.db
+    try:
+        for label, db in (('per-call connections', LegacyDatabase(pooled_db.db_path)),
+                          ('pooled connections', pooled_db)):
+            services.provide('db', db)
+            stock_rps = measure(app, '/api/stock/AAPL', args.requests, args.threads)
+            watchlist_rps = measure(app, '/api/watchlist', args.requests, args.threads)
+            print(f"{label:<22} /api/stock {stock_rps:8.0f} req/s   /api/watchlist {watchlist_rps:8.0f} req/s")
+    finally:
+        services.provide('db', pooled_db)
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""History and time-range query latency on a large synthetic stock_prices table.
+
+Builds the table through the regular migrations, then times
+Database.get_stock_history and a cleanup-style range count with the
+migration's indexes and again with them dropped (the pre-migration state).
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import Database
+
+
+def fill(db_path, rows, symbols):
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA synchronous=OFF')
+    now = int(time.time())
+    start_ts = now - rows  # one tick per second across all symbols
+
+    def generate():
+        for i in range(rows):
+            yield (symbols[i % len(symbols)], 100 + random.random(), 'USD', start_ts + i)
+
+    conn.executemany('INSERT INTO stock_prices (symbol, price, currency, timestamp) VALUES (?, ?, ?, ?)',
+                     generate())
+    conn.commit()
+    conn.close()
+    return start_ts, now
+
+
+def time_queries(db, symbols, start_ts, end_ts, queries):
+    start = time.perf_counter()
+    for _ in range(queries):
+        db.get_stock_history(random.choice(symbols), 100)
+    history_ms = (time.perf_counter() - start) * 1000 / queries
+
+    cutoff = start_ts + (end_ts - start_ts) // 10
+    start = time.perf_counter()
+    with db.connections.connection() as conn:
+        conn.execute('SELECT COUNT(*) FROM stock_prices WHERE timestamp < ?', (cutoff,)).fetchone()
+    range_ms = (time.perf_counter() - start) * 1000
+    return history_ms, range_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--symbols', type=int, default=500)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    symbols = [f"SYM{i:04d}" for i in range(args.symbols)]
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'history.db'))
+        start = time.perf_counter()
+        start_ts, end_ts = fill(db.db_path, args.rows, symbols)
+        print(f"Inserted {args.rows:,} rows for {args.symbols} symbols in {time.perf_counter() - start:.1f}s")
+
+        history_ms, range_ms = time_queries(db, symbols, start_ts, end_ts, args.queries)
+        print(f"indexed      get_stock_history {history_ms:9.3f} ms/query   range count {range_ms:9.1f} ms")
+
+        with db.connections.connection() as conn:
+            conn.execute('DROP INDEX idx_stock_prices_symbol_ts')
+            conn.execute('DROP INDEX idx_stock_prices_ts')
+        history_ms, range_ms = time_queries(db, symbols, start_ts, end_ts, max(args.queries // 20, 3))
+        print(f"no indexes   get_stock_history {history_ms:9.3f} ms/query   range count {range_ms:9.1f} ms")
+        db.connections.close_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Connection reuse, retry and circuit-breaker behaviour against the stub server."""
+
+import argparse
+import os
+import sys
+import time
+
+import requests
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.http_client import HTTPClient, CircuitBreaker, CircuitOpenError
+from benchmarks.stub_server import StubServer
+
+
+def fetch_all(get, base_url, count):
+    ok = failed = 0
+    for i in range(count):
+        try:
+            response = get(f"{base_url}/v8/finance/chart/SYM{i:04d}")
+            if response.status_code == 200:
+                ok += 1
+            else:
+                failed += 1
+        except (requests.exceptions.RequestException, CircuitOpenError):
+            failed += 1
+    return ok, failed
+
+
+def run(label, get, server, count):
+    start = time.perf_counter()
+    ok, failed = fetch_all(get, server.base_url, count)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {elapsed:7.3f}s  ok={ok:<5d} failed={failed:<5d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.002)
+    parser.add_argument('--error-rate', type=float, default=0.2)
+    args = parser.parse_args()
+
+    server = StubServer(latency=args.latency).start()
+    try:
+        run('requests.get (new connection)', lambda url: requests.get(url, timeout=10), server, args.requests)
+        client = HTTPClient(backoff_base=0.01, backoff_max=0.1)
+        run('pooled session', client.get, server, args.requests)
+        print(f"  metrics: {client.metrics()}")
+
+        server.error_rate = args.error_rate
+        client = HTTPClient(backoff_base=0.01, backoff_max=0.1)
+        run(f'pooled, {args.error_rate:.0%} injected errors', client.get, server, args.requests)
+        print(f"  metrics: {client.metrics()}")
+
+        server.error_rate = 1.0
+        client = HTTPClient(backoff_base=0.01, backoff_max=0.1,
+                            breaker=CircuitBreaker(failure_threshold=3, reset_timeout=60))
+        run('upstream down (breaker)', client.get, server, args.requests)
+        print(f"  metrics: {client.metrics()}")
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
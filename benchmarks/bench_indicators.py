@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Vectorized indicator pass vs per-point Python loops, plus incremental updates."""
+
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.indicators import IndicatorSeries
+
+
+def loop_indicators(prices, window=20, ema_span=20):
+    # The per-point approach the dashboard used client-side
+    alpha = 2.0 / (ema_span + 1)
+    sma, stdev, ema_values = [], [], []
+    ema_value = prices[0]
+    peak = prices[0]
+    max_drawdown = 0.0
+    for i, price in enumerate(prices):
+        if i + 1 >= window:
+            chunk = prices[i + 1 - window:i + 1]
+            mean = sum(chunk) / window
+            sma.append(mean)
+            stdev.append(math.sqrt(sum((p - mean) ** 2 for p in chunk) / window))
+        ema_value = (1 - alpha) * ema_value + alpha * price
+        ema_values.append(ema_value)
+        peak = max(peak, price)
+        max_drawdown = min(max_drawdown, price / peak - 1)
+    return sma, stdev, ema_values, max_drawdown
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--points', type=int, default=1_000_000)
+    parser.add_argument('--ticks', type=int, default=1000, help='single-tick incremental updates to time')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.001, args.points)))
+    timestamps = np.arange(args.points)
+
+    start = time.perf_counter()
+    full = IndicatorSeries(max_points=args.points)
+    full.extend(timestamps, prices)
+    vectorized = time.perf_counter() - start
+    print(f"vectorized, {args.points:,} points     {vectorized * 1000:10.1f} ms")
+
+    loop_points = min(args.points, 200_000)
+    start = time.perf_counter()
+    sma, stdev, ema_values, max_dd = loop_indicators(prices[:loop_points].tolist())
+    looped = time.perf_counter() - start
+    print(f"python loop, {loop_points:,} points    {looped * 1000:10.1f} ms "
+          f"(~{looped * args.points / loop_points:.1f}s extrapolated)")
+
+    reference = IndicatorSeries(max_points=loop_points)
+    reference.extend(timestamps[:loop_points], prices[:loop_points])
+    assert np.allclose(reference.series['sma'].view()[19:], sma)
+    assert np.allclose(reference.series['stdev'].view()[19:], stdev, atol=1e-6)
+    assert np.allclose(reference.series['ema'].view(), ema_values)
+    assert math.isclose(reference.max_drawdown, max_dd)
+
+    split = args.points - args.ticks
+    incremental = IndicatorSeries(max_points=args.points)
+    incremental.extend(timestamps[:split], prices[:split])
+    start = time.perf_counter()
+    for i in range(split, args.points):
+        incremental.extend(timestamps[i:i + 1], prices[i:i + 1])
+    per_tick = (time.perf_counter() - start) / args.ticks
+    print(f"incremental update               {per_tick * 1000:10.3f} ms/tick")
+
+    for name, column in full.series.items():
+        assert np.allclose(column.view(), incremental.series[name].view(), equal_nan=True), name
+    print("incremental results match the full recomputation")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Cost of the always-on instrumentation on hot paths, and of a /metrics scrape.
+
+Times a histogram observation, then cached StockAPI.get_stock_price and
+Database.get_watchlist calls with and without their timing wrapper (via
+__wrapped__), a Flask request with and without the latency hooks, and
+rendering /metrics. Also samples the app with the profiler running.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from benchmarks.stub_server import StubServer
+
+
+def per_call(func, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        func()
+    return (time.perf_counter() - start) / count
+
+
+def compare(label, wrapped, bare, count):
+    bare_time = min(per_call(bare, count) for _ in range(3))
+    wrapped_time = min(per_call(wrapped, count) for _ in range(3))
+    print(f"{label:<34} {bare_time * 1e6:9.2f} us bare {wrapped_time * 1e6:9.2f} us instrumented "
+          f"(+{(wrapped_time - bare_time) * 1e9:5.0f} ns)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--calls', type=int, default=100000)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    server = StubServer().start()
+    os.environ['STOCK_API_BASE_URL'] = server.base_url
+    os.chdir(tempfile.mkdtemp())
+
+    import main as webapp
+    from app import metrics
+    from app.database import Database
+    from app.profiler import SamplingProfiler
+    from app.stock_api import StockAPI
+
+    app = webapp.create_app()
+    client = app.test_client()
+    services = app.extensions['stockwatcher']
+    stock_api, db = services.stock_api, services.db
+    stock_api.get_stock_price('AAPL')
+    db.add_to_watchlist('AAPL')
+
+    series = metrics.Metric('bench_seconds', 'benchmark', 'histogram')  # not registered
+    start = time.perf_counter()
+    for i in range(args.calls):
+        series.observe(0.001)
+    print(f"{'histogram observe':<34} {(time.perf_counter() - start) / args.calls * 1e9:9.0f} ns")
+
+    compare('get_stock_price (cache hit)', lambda: stock_api.get_stock_price('AAPL'),
+            lambda: StockAPI.get_stock_price.__wrapped__(stock_api, 'AAPL'), args.calls)
+    compare('Database.get_watchlist', db.get_watchlist,
+            lambda: Database.get_watchlist.__wrapped__(db), args.calls // 10)
+
+    hooks = (app.before_request_funcs[None], app.after_request_funcs[None])
+    bare_hooks = ([f for f in hooks[0] if f is not webapp.start_timer],
+                  [f for f in hooks[1] if f is not webapp.record_latency])
+
+    def with_hooks(enabled):
+        app.before_request_funcs[None], app.after_request_funcs[None] = hooks if enabled else bare_hooks
+
+    def request():
+        client.get('/api/watchlist')
+
+    with_hooks(False)
+    bare = min(per_call(request, args.requests) for _ in range(3))
+    with_hooks(True)
+    instrumented = min(per_call(request, args.requests) for _ in range(3))
+    print(f"{'GET /api/watchlist (test client)':<34} {bare * 1e6:9.2f} us bare {instrumented * 1e6:9.2f} us "
+          f"instrumented (+{(instrumented - bare) * 1e6:5.1f} us)")
+
+    start = time.perf_counter()
+    body = client.get('/metrics').data
+    print(f"{'GET /metrics':<34} {(time.perf_counter() - start) * 1000:9.2f} ms, "
+          f"{body.count(10)} lines, {len(body)} bytes")
+
+    def throughput():
+        workers = [threading.Thread(target=lambda: [request() for _ in range(args.requests)]) for _ in range(4)]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return 4 * args.requests / (time.perf_counter() - start)
+
+    print(f"{'4 threads, profiler off':<34} {throughput():9.0f} req/s")
+    profiler = SamplingProfiler(0.005).start()
+    rps = throughput()
+    profiler.stop()
+    print(f"{'4 threads, profiler at 5 ms':<34} {rps:9.0f} req/s, {sum(profiler.samples.values())} stack samples")
+
+    services.close()
+    server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Alert monitor freshness for a large watchlist against the local stub server."""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.alerts import AlertSystem
+from app.database import Database
+from app.monitor import AlertMonitor
+from app.stock_api import StockAPI
+from benchmarks.stub_server import StubServer, _price_for
+from config import Config
+
+
+class QuietAlertSystem(AlertSystem):
+    def send_email_alert(self, alert_info):
+        return False
+
+
+async def observe(monitor, duration, samples):
+    start = time.monotonic()
+    first_sweep = None
+    while time.monotonic() - start < duration:
+        await asyncio.sleep(0.5)
+        if first_sweep is None and monitor.due and len(monitor.last_polled) == len(monitor.due) + len(monitor.in_flight):
+            first_sweep = time.monotonic() - start
+        samples.append(monitor.status()['max_staleness'])
+    monitor.stop()
+    return first_sweep
+
+
+async def run(monitor, duration):
+    samples = []
+    _, first_sweep = await asyncio.gather(monitor.run(), observe(monitor, duration, samples))
+    return first_sweep, samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--symbols', type=int, default=5000)
+    parser.add_argument('--near', type=float, default=0.1, help='fraction of symbols within 1%% of a target')
+    parser.add_argument('--duration', type=float, default=75)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--budget', type=float, default=30, help='freshness budget in seconds')
+    args = parser.parse_args()
+
+    server = StubServer(latency=args.latency).start()
+
+    class BenchConfig(Config):
+        STOCK_API_BASE_URL = server.base_url
+
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'monitor.db'))
+        for i in range(args.symbols):
+            symbol = f"SYM{i:05d}"
+            offset = rng.uniform(-0.01, 0.01) if rng.random() < args.near else rng.uniform(0.1, 0.3)
+            db.add_to_watchlist(symbol, round(_price_for(symbol) * (1 + offset), 2))
+
+        stock_api = StockAPI(BenchConfig())
+        monitor = AlertMonitor(stock_api, db, QuietAlertSystem(), BenchConfig(),
+                               os.path.join(tmp, 'status.json'))
+        try:
+            first_sweep, samples = asyncio.run(run(monitor, args.duration))
+        finally:
+            server.stop()
+            db.close()
+
+        settled = samples[len(samples) // 2:]
+        print(f"{args.symbols} symbols, {args.latency * 1000:.0f}ms upstream latency, "
+              f"{Config.STOCK_API_RATE_LIMIT:g} req/s limit, "
+              f"{Config.MONITOR_MIN_INTERVAL:g}-{Config.MONITOR_MAX_INTERVAL:g}s intervals")
+        print(f"first full sweep                {first_sweep:8.1f} s")
+        print(f"max staleness (second half)     {max(settled):8.1f} s (budget {args.budget:g}s)")
+        print(f"upstream requests               {server.request_count:8d}")
+        print(f"quotes fetched                  {monitor.counters['quotes']:8d}")
+        print(f"alerts triggered                {monitor.counters['alerts_triggered']:8d}")
+
+
+if __name__ == '__main__':
+    main()
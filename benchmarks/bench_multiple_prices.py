@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Wall-clock comparison of the old serial quote loop and fetch_quotes."""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.stock_api import StockAPI
+from benchmarks.stub_server import StubServer
+from config import Config
+
+
+def make_api(base_url, **overrides):
+    class BenchConfig(Config):
+        STOCK_API_BASE_URL = base_url
+
+    for name, value in overrides.items():
+        setattr(BenchConfig, name, value)
+    return StockAPI(BenchConfig())
+
+
+def legacy_multiple_prices(api, symbols):
+    # The pre-batching implementation: one request at a time, fixed sleep.
+    results = {}
+    for symbol in symbols:
+        data = api.get_stock_price(symbol)
+        if data:
+            results[symbol.upper()] = data
+        time.sleep(0.1)
+    return results
+
+
+def run(label, func, server):
+    start_requests = server.request_count
+    start = time.perf_counter()
+    results = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed:8.3f}s  {len(results):4d} quotes  "
+          f"{server.request_count - start_requests:4d} upstream requests")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--symbols', type=int, default=40)
+    parser.add_argument('--latency', type=float, default=0.05)
+    args = parser.parse_args()
+
+    symbols = [f"SYM{i:04d}" for i in range(args.symbols)]
+    server = StubServer(latency=args.latency).start()
+    try:
+        print(f"{args.symbols} symbols, {args.latency * 1000:.0f}ms upstream latency")
+        run('legacy serial loop',
+            lambda: legacy_multiple_prices(make_api(server.base_url, STOCK_API_RATE_LIMIT=0), symbols),
+            server)
+        run('concurrent, no batching',
+            lambda: make_api(server.base_url, STOCK_API_BATCH_SIZE=1).get_multiple_prices(symbols),
+            server)
+        run('batched + concurrent',
+            lambda: make_api(server.base_url).get_multiple_prices(symbols),
+            server)
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Alert email delivery for a burst of alerts: per-alert SMTP sessions vs the dispatcher."""
+
+import argparse
+import os
+import smtplib
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.alerts import format_alert_email
+from app.database import Database
+from app.notifications import NotificationDispatcher
+from benchmarks.smtp_sink import SMTPSink
+from config import Config
+
+
+def make_alerts(count):
+    return [{
+        'alert_id': i,
+        'symbol': f"SYM{i:04d}",
+        'condition': 'near',
+        'current_price': 100.0 + i,
+        'target_price': 101.0 + i,
+        'timestamp': datetime.now()
+    } for i in range(count)]
+
+
+def legacy_send(config, alerts):
+    # What send_email_alert did: a fresh SMTP session per alert, inline
+    for alert_info in alerts:
+        subject, body = format_alert_email(alert_info)
+        server = smtplib.SMTP(config.SMTP_SERVER, config.SMTP_PORT)
+        server.sendmail(config.ALERT_RECIPIENT, [config.ALERT_RECIPIENT],
+                        f"Subject: {subject}\r\n\r\n{body}")
+        server.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--alerts', type=int, default=200)
+    parser.add_argument('--connect-latency', type=float, default=0.3,
+                        help='per-connection cost standing in for TLS and login')
+    parser.add_argument('--fail-rate', type=float, default=0.2)
+    parser.add_argument('--window', type=float, default=2.0, help='digest window in seconds')
+    args = parser.parse_args()
+
+    sink = SMTPSink(connect_latency=args.connect_latency).start()
+
+    class BenchConfig(Config):
+        SMTP_SERVER = '127.0.0.1'
+        SMTP_PORT = sink.port
+        SMTP_USE_TLS = False
+        EMAIL_PASS = None
+        ALERT_RECIPIENT = 'alerts@example.com'
+        NOTIFY_DIGEST_WINDOW = args.window
+        NOTIFY_DIGEST_MAX = 50
+        NOTIFY_BACKOFF_BASE = 0.2
+
+    config = BenchConfig()
+    alerts = make_alerts(args.alerts)
+    print(f"{args.alerts} alerts, {args.connect_latency * 1000:.0f}ms per SMTP connection, "
+          f"{args.fail_rate:.0%} of dispatcher sends rejected")
+
+    start = time.perf_counter()
+    legacy_send(config, alerts)
+    legacy = time.perf_counter() - start
+    print(f"legacy inline sends              {legacy * 1000:10.1f} ms blocking, "
+          f"{sink.connections} connections, {len(sink.messages)} emails")
+
+    sink.connections = 0
+    sink.messages.clear()
+    sink.fail_rate = args.fail_rate
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'notify.db'))
+        dispatcher = NotificationDispatcher(db.connections, config).start()
+        try:
+            start = time.perf_counter()
+            dispatcher.enqueue_alerts(alerts)
+            enqueue = time.perf_counter() - start
+            while dispatcher.stats()['pending']:
+                time.sleep(0.05)
+            delivered = time.perf_counter() - start
+            stats = dispatcher.stats()
+        finally:
+            dispatcher.stop()
+            db.close()
+            sink.stop()
+
+    print(f"dispatcher enqueue               {enqueue * 1000:10.1f} ms blocking")
+    print(f"dispatcher delivered all         {delivered * 1000:10.1f} ms "
+          f"(includes the {args.window:g}s digest window)")
+    print(f"  {stats['smtp_connections']} connections, {stats['emails_sent']} emails, "
+          f"{stats['send_errors']} retried sends, {stats['sent']} sent, {stats['failed']} failed")
+    received = sum(message.count('Stock Alert Triggered!') for _, message in sink.messages)
+    assert received == stats['sent'], (received, stats['sent'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Portfolio valuation latency for a large portfolio with cold and warm quote caches."""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.portfolio import Portfolio
+from app.stock_api import StockAPI
+from benchmarks.stub_server import StubServer
+from config import Config
+
+
+def make_api(base_url):
+    class BenchConfig(Config):
+        STOCK_API_BASE_URL = base_url
+
+    return StockAPI(BenchConfig())
+
+
+def legacy_valuation(portfolio, stock_api):
+    # One get_stock_price round trip per position, as before batching
+    with portfolio.connections.connection() as conn:
+        positions = conn.execute(
+            'SELECT symbol, SUM(shares), AVG(purchase_price) FROM portfolio GROUP BY symbol'
+        ).fetchall()
+    total = 0.0
+    for symbol, shares, avg_price in positions:
+        data = stock_api.get_stock_price(symbol)
+        total += shares * (data['price'] if data else avg_price)
+    return total
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    func()
+    print(f"{label:<28} {(time.perf_counter() - start) * 1000:10.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--positions', type=int, default=500)
+    parser.add_argument('--latency', type=float, default=0.05)
+    args = parser.parse_args()
+
+    server = StubServer(latency=args.latency).start()
+    with tempfile.TemporaryDirectory() as tmp:
+        portfolio = Portfolio(os.path.join(tmp, 'portfolio.db'))
+        for i in range(args.positions):
+            portfolio.add_position(f"SYM{i:04d}", 10, 100.0 + i % 50)
+
+        try:
+            print(f"{args.positions} positions, {args.latency * 1000:.0f}ms upstream latency")
+            if args.positions <= 100:
+                timed('legacy serial, cold cache', lambda: legacy_valuation(portfolio, make_api(server.base_url)))
+            stock_api = make_api(server.base_url)
+            timed('batched summary, cold cache', lambda: portfolio.get_portfolio_summary(stock_api))
+            timed('batched summary, warm cache', lambda: portfolio.get_portfolio_summary(stock_api))
+        finally:
+            server.stop()
+            portfolio.connections.close_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Payload size and throughput of /api/quotes encodings and 304 revalidation vs /api/compare."""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from benchmarks.stub_server import StubServer
+
+
+def measure(client, path, count, headers=None):
+    start = time.perf_counter()
+    for _ in range(count):
+        response = client.get(path, headers=headers or {})
+    elapsed = time.perf_counter() - start
+    return response, count / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--symbols', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    server = StubServer().start()
+    os.environ['STOCK_API_BASE_URL'] = server.base_url
+    os.environ['PRICE_REFRESH_ENABLED'] = '0'  # only count the requests under test
+    os.chdir(tempfile.mkdtemp())
+
+    import main as webapp
+
+    client = webapp.create_app().test_client()
+    symbols = ','.join(f"SYM{i:04d}" for i in range(args.symbols))
+    client.get(f'/api/quotes?symbols={symbols}')  # warm the quote cache
+
+    print(f"{args.symbols} symbols, {args.requests} requests each, warm quote cache")
+    cases = [
+        ('/api/compare', f'/api/compare?symbols={symbols}', {}),
+        ('/api/quotes json', f'/api/quotes?symbols={symbols}', {}),
+        ('/api/quotes columnar', f'/api/quotes?symbols={symbols}&format=columnar', {}),
+        ('/api/quotes columnar+gzip', f'/api/quotes?symbols={symbols}&format=columnar',
+         {'Accept-Encoding': 'gzip'}),
+    ]
+    try:
+        for label, path, headers in cases:
+            response, rps = measure(client, path, args.requests, headers)
+            assert response.status_code == 200, response.status_code
+            print(f"{label:<28} {len(response.data):8d} bytes {rps:8.0f} req/s")
+
+        etag = client.get(f'/api/quotes?symbols={symbols}').headers['ETag']
+        before = server.request_count
+        response, rps = measure(client, f'/api/quotes?symbols={symbols}', args.requests,
+                                {'If-None-Match': etag})
+        assert response.status_code == 304, response.status_code
+        print(f"{'/api/quotes If-None-Match':<28} {len(response.data):8d} bytes {rps:8.0f} req/s "
+              f"(304, {server.request_count - before} upstream requests)")
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
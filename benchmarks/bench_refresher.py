@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Request latency with and without the background price refresher.
+
+Fills the watchlist and portfolio with `--symbols` symbols, then replays
+the same Zipf-distributed stream of /api/stock/<symbol> requests (plus a
+/api/portfolio every `--portfolio-every` requests) for `--duration`
+seconds against the Yahoo stub, once with PRICE_REFRESH_ENABLED off and
+once on. The cache TTL and refresh interval are scaled down (`--ttl`) so
+a short run covers many expiries.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from benchmarks.stub_server import StubServer
+from config import Config
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))] * 1000
+
+
+def run(args, server, enabled):
+    workdir = tempfile.mkdtemp()
+
+    class BenchConfig(Config):
+        DATABASE_PATH = os.path.join(workdir, 'stock_data.db')
+        STOCK_API_BASE_URL = server.base_url
+        SYMBOL_LIST_PATH = os.path.join(workdir, 'symbols.csv')
+        QUOTE_CACHE_TTL = args.ttl
+        QUOTE_CACHE_STALE_TTL = 0
+        PRICE_UPDATE_INTERVAL = args.ttl * 5
+        PRICE_REFRESH_TICK = max(0.2, args.ttl / 12)
+        PRICE_REFRESH_RELOAD_INTERVAL = 1
+        PRICE_REFRESH_ENABLED = enabled
+        DEFAULT_SYMBOLS = []
+
+    import main as webapp
+    app = webapp.create_app(BenchConfig)
+    client = app.test_client()
+    services = app.extensions['stockwatcher']
+    symbols = [f"SYM{i:04d}" for i in range(args.symbols)]
+    for symbol in symbols:
+        services.db.add_to_watchlist(symbol)
+    for symbol in symbols[:args.symbols // 2]:
+        services.portfolio.add_position(symbol, 10, 100.0)
+
+    rng = random.Random(7)
+    weights = [1 / (rank + 1) for rank in range(len(symbols))]
+    client.get('/api/watchlist')  # first request starts the refresher when enabled
+    time.sleep(1)
+    before = server.request_count
+    latencies = []
+    portfolio = []
+    deadline = time.monotonic() + args.duration
+    count = 0
+    while time.monotonic() < deadline:
+        count += 1
+        start = time.perf_counter()
+        if count % args.portfolio_every == 0:
+            client.get('/api/portfolio')
+            portfolio.append(time.perf_counter() - start)
+        else:
+            client.get(f'/api/stock/{rng.choices(symbols, weights)[0]}')
+            latencies.append(time.perf_counter() - start)
+        time.sleep(args.pause)
+    upstream = server.request_count - before
+    cache = services.stock_api.cache.stats()
+    services.close()
+
+    label = 'refresher on ' if enabled else 'refresher off'
+    print(f"{label}  /api/stock p50 {percentile(latencies, 0.5):7.2f} ms  p95 {percentile(latencies, 0.95):7.2f} ms  "
+          f"p99 {percentile(latencies, 0.99):7.2f} ms | /api/portfolio p50 {percentile(portfolio, 0.5):7.2f} ms  "
+          f"p95 {percentile(portfolio, 0.95):7.2f} ms | hit ratio {cache['hit_ratio']:.1%}, "
+          f"{upstream} upstream requests")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--symbols', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=20.0)
+    parser.add_argument('--ttl', type=float, default=6.0, help='quote cache TTL in seconds')
+    parser.add_argument('--latency', type=float, default=0.1, help='stub server seconds per request')
+    parser.add_argument('--pause', type=float, default=0.005, help='seconds between requests')
+    parser.add_argument('--portfolio-every', type=int, default=50)
+    args = parser.parse_args()
+
+    server = StubServer(latency=args.latency).start()
+    run(args, server, enabled=False)
+    run(args, server, enabled=True)
+    server.stop()
+
+
+if __name__ == '__main__':
+    main()
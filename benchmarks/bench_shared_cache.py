@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Upstream call volume for several worker processes with and without the shared cache."""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from multiprocessing import Process
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.stock_api import StockAPI
+from benchmarks.stub_server import StubServer
+from config import Config
+
+
+def worker(base_url, shared_path, symbols, rounds, offset):
+    class WorkerConfig(Config):
+        STOCK_API_BASE_URL = base_url
+        STOCK_API_RATE_LIMIT = 0
+        SHARED_CACHE_PATH = shared_path
+
+    api = StockAPI(WorkerConfig())
+    # Workers see requests in different orders, like independent web workers
+    symbols = symbols[offset:] + symbols[:offset]
+    for _ in range(rounds):
+        for symbol in symbols:
+            api.get_stock_price(symbol)
+        time.sleep(0.01)
+
+
+def run(label, server, shared_path, workers, symbols, rounds):
+    start_requests = server.request_count
+    start = time.perf_counter()
+    processes = [Process(target=worker, args=(server.base_url, shared_path, symbols, rounds,
+                                              i * len(symbols) // workers))
+                 for i in range(workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<16} {elapsed:7.3f}s  {server.request_count - start_requests:5d} upstream requests")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--symbols', type=int, default=50)
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    symbols = [f"SYM{i:04d}" for i in range(args.symbols)]
+    server = StubServer(latency=0.01).start()
+    try:
+        print(f"{args.workers} workers x {args.symbols} symbols x {args.rounds} rounds")
+        run('private caches', server, None, args.workers, symbols, args.rounds)
+        with tempfile.TemporaryDirectory() as tmp:
+            run('shared cache', server, os.path.join(tmp, 'quote_cache.db'),
+                args.workers, symbols, args.rounds)
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""Cold start time of the web app and CLI scripts, each in a fresh interpreter."""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASES = [
+    ('python -c pass', ['-c', 'pass']),
+    ('import main', ['-c', 'import main']),
+    ('create_app + first request', ['-c', 'import main; main.create_app().test_client().get("/api/watchlist")']),
+    ('import asgi', ['-c', 'import asgi']),
+    ('rebuild_ledger --verify-only', [os.path.join(ROOT, 'scripts', 'rebuild_ledger.py'), '--verify-only']),
+    ('monitor_alerts --check', [os.path.join(ROOT, 'scripts', 'monitor_alerts.py'), '--check']),
+]
+
+
+def run(argv, cwd, env):
+    start = time.perf_counter()
+    subprocess.run([sys.executable] + argv, cwd=cwd, env=env,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=7)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    env = dict(os.environ, PYTHONPATH=ROOT, DATABASE_PATH=os.path.join(workdir, 'stock_data.db'),
+               STOCK_API_BASE_URL='http://127.0.0.1:9')
+    run(CASES[2][1], workdir, env)  # create and migrate the database once
+
+    print(f"median of {args.runs} runs, existing database")
+    for label, argv in CASES:
+        times = [run(argv, workdir, env) for _ in range(args.runs)]
+        print(f"{label:<30} {statistics.median(times) * 1000:7.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
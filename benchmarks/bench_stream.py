@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Upstream cost of /api/stream as the number of connected clients grows."""
+
+import argparse
+import http.client
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import quote
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from benchmarks.stub_server import StubServer
+
+
+def client(port, symbols, stop, counts, index):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    conn.request('GET', f"/api/stream?symbols={quote(','.join(symbols))}")
+    response = conn.getresponse()
+    assert response.status == 200, response.status
+    while not stop.is_set():
+        line = response.fp.readline()
+        if not line:
+            break
+        if line.startswith(b'event: quote'):
+            counts[index] += 1
+    conn.close()
+
+
+def run(port, symbols, clients, duration):
+    stop = threading.Event()
+    counts = [0] * clients
+    threads = [threading.Thread(target=client, args=(port, symbols, stop, counts, i), daemon=True)
+               for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--symbols', type=int, default=20)
+    parser.add_argument('--clients', default='1,10,50')
+    parser.add_argument('--interval', type=float, default=1.0, help='stream poll interval in seconds')
+    parser.add_argument('--duration', type=float, default=5.0)
+    args = parser.parse_args()
+
+    server = StubServer().start()
+    os.environ['STOCK_API_BASE_URL'] = server.base_url
+    os.environ['PRICE_REFRESH_ENABLED'] = '0'  # only count the requests under test
+    os.chdir(tempfile.mkdtemp())
+
+    import main as webapp
+    from werkzeug.serving import make_server
+
+    app = webapp.create_app()
+    broadcaster = app.extensions['stockwatcher'].broadcaster
+    broadcaster.interval = args.interval
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    http_server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=http_server.serve_forever, daemon=True).start()
+    symbols = [f"SYM{i:04d}" for i in range(args.symbols)]
+
+    print(f"{args.symbols} symbols per client, {args.interval:g}s poll interval, {args.duration:g}s per run")
+    try:
+        for clients in (int(n) for n in args.clients.split(',')):
+            before = server.request_count
+            polls_before = broadcaster.polls
+            counts = run(http_server.port, symbols, clients, args.duration)
+            upstream = server.request_count - before
+            polls = broadcaster.polls - polls_before
+            print(f"{clients:4d} clients: {upstream:4d} upstream requests over {polls} polls, "
+                  f"{sum(counts) / clients:6.1f} quote events per client")
+    finally:
+        broadcaster.close()
+        http_server.shutdown()
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
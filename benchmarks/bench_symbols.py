@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Symbol validation and search: registry lookups vs validating with a live quote fetch.
+
+Writes a synthetic listing of --listing symbols, then times validate_symbol
+for listed symbols, an unlisted typo (first time and from the negative cache)
+and the previous validate-by-fetch approach against the stub server with
+--latency seconds per request, plus registry prefix searches.
+"""
+
+import argparse
+import logging
+import os
+import random
+import statistics
+import string
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.stock_api import StockAPI
+from benchmarks.stub_server import StubServer, UNKNOWN_PREFIX
+from config import Config
+
+WORDS = ['Acme', 'Global', 'Energy', 'Holdings', 'Therapeutics', 'Capital', 'Systems', 'Bancorp',
+         'Realty', 'Mining', 'Software', 'Pharma', 'Networks', 'Industries', 'Foods', 'Motors']
+
+
+def write_listing(path, count):
+    rng = random.Random(1)
+    symbols = set()
+    while len(symbols) < count:
+        symbols.add(''.join(rng.choice(string.ascii_uppercase) for _ in range(rng.randint(1, 5))))
+    with open(path, 'w') as f:
+        f.write('symbol,name,exchange\n')
+        for symbol in sorted(symbols):
+            f.write(f"{symbol},{' '.join(rng.sample(WORDS, 3))} Inc.,{rng.choice(['NASDAQ', 'NYSE'])}\n")
+    return sorted(symbols)
+
+
+def timed(func, args):
+    times = []
+    for arg in args:
+        start = time.perf_counter()
+        func(arg)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--listing', type=int, default=12000)
+    parser.add_argument('--latency', type=float, default=0.1)
+    parser.add_argument('--lookups', type=int, default=10000)
+    args = parser.parse_args()
+
+    logging.getLogger('app.stock_api').setLevel(logging.ERROR)  # the 404 warnings for typos
+    server = StubServer(latency=args.latency).start()
+    workdir = tempfile.mkdtemp()
+
+    class BenchConfig(Config):
+        STOCK_API_BASE_URL = server.base_url
+        STOCK_API_RATE_LIMIT = 0
+        SYMBOL_LIST_PATH = os.path.join(workdir, 'symbols.csv')
+
+    symbols = write_listing(BenchConfig.SYMBOL_LIST_PATH, args.listing)
+    api = StockAPI(BenchConfig())
+    start = time.perf_counter()
+    api.symbols.lookup('AAPL')
+    print(f"{args.listing} listed symbols, index built in {(time.perf_counter() - start) * 1000:.0f} ms; "
+          f"upstream latency {args.latency * 1000:.0f} ms")
+
+    sample = [random.choice(symbols) for _ in range(args.lookups)]
+    before = server.request_count
+    per_call = timed(api.validate_symbol, sample)
+    print(f"{'validate listed symbol':<34} {per_call * 1e6:10.1f} us  "
+          f"({server.request_count - before} upstream requests)")
+
+    typos = [f"{UNKNOWN_PREFIX}{i}" for i in range(20)]
+    before = server.request_count
+    first = timed(api.validate_symbol, typos)
+    repeat = timed(api.validate_symbol, typos * (args.lookups // len(typos)))
+    print(f"{'validate typo, first time':<34} {first * 1e6:10.1f} us")
+    print(f"{'validate typo, negative cache':<34} {repeat * 1e6:10.1f} us  "
+          f"({server.request_count - before} upstream requests for {len(typos)} typos)")
+
+    fresh = [f"X{i:05d}" for i in range(20)]
+    before = server.request_count
+    fetch = timed(lambda symbol: api.get_stock_price(symbol) is not None, fresh)
+    print(f"{'validate by quote fetch (before)':<34} {fetch * 1e6:10.1f} us  "
+          f"({server.request_count - before} upstream requests)")
+
+    queries = [symbol[:random.randint(1, 3)] for symbol in random.sample(symbols, 500)]
+    queries += [word[:random.randint(2, 6)].lower() for word in random.choices(WORDS, k=500)]
+    search = timed(lambda query: api.symbols.search(query, 10), queries)
+    print(f"{'search, 10 results':<34} {search * 1e6:10.1f} us")
+
+    api.http.close()
+    server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Hot/cold tiering of stock_prices: archive cost, storage size and history reads.
+
+Fills a year of ticks, times DataCleanup moving all but the last 30 days to
+Parquet, compares the database size before and after (vacuumed) with the
+cold storage size, and times get_stock_history ranges that hit only the hot
+table, cross into cold storage, and lie entirely in it.
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.cold_storage import ColdStore
+from app.database import Database
+from utils.data_cleanup import DataCleanup
+
+DAY = 86400
+
+
+def fill(db_path, rows, symbols, days):
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA synchronous=OFF')
+    now = int(time.time())
+    step = days * DAY / rows
+
+    def generate():
+        for i in range(rows):
+            yield (symbols[i % len(symbols)], 100 + random.random(), 'USD', now - days * DAY + int(i * step))
+
+    conn.executemany('INSERT INTO stock_prices (symbol, price, currency, timestamp) VALUES (?, ?, ?, ?)',
+                     generate())
+    conn.commit()
+    conn.close()
+    return now
+
+
+def size_mb(path):
+    total = 0
+    for directory, _, filenames in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(directory, name)) for name in filenames)
+    return total / 1e6
+
+
+def time_history(db, symbols, ranges, queries):
+    results = []
+    for label, start, end in ranges:
+        times = []
+        for _ in range(queries):
+            symbol = random.choice(symbols)
+            began = time.perf_counter()
+            rows = db.get_stock_history(symbol, 1000, start, end, 'raw')
+            times.append(time.perf_counter() - began)
+        results.append((label, statistics.median(times) * 1000, len(rows)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=5_000_000)
+    parser.add_argument('--symbols', type=int, default=100)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--queries', type=int, default=50)
+    args = parser.parse_args()
+
+    symbols = [f"SYM{i:04d}" for i in range(args.symbols)]
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'stock_data.db')
+        cold_path = os.path.join(tmp, 'cold_storage')
+        db = Database(db_path, cold_store=ColdStore(cold_path))
+        now = fill(db_path, args.rows, symbols, args.days)
+        ranges = [
+            ('hot (last 10 days)', now - 10 * DAY, now),
+            ('hot + cold (25-35 days ago)', now - 35 * DAY, now - 25 * DAY),
+            ('cold (200-210 days ago)', now - 210 * DAY, now - 200 * DAY),
+        ]
+        cleanup = DataCleanup(db_path, cold_path)
+        cleanup.optimize_database()
+        print(f"{args.rows:,} ticks over {args.days} days for {args.symbols} symbols, "
+              f"database {os.path.getsize(db_path) / 1e6:.0f} MB")
+        for label, ms, count in time_history(db, symbols, ranges, args.queries):
+            print(f"  before  {label:<28} {ms:8.2f} ms/query  {count} rows")
+
+        began = time.perf_counter()
+        moved = cleanup.cleanup_old_data(30)
+        elapsed = time.perf_counter() - began
+        cleanup.optimize_database()
+        print(f"archived {moved:,} ticks in {elapsed:.1f}s: database {os.path.getsize(db_path) / 1e6:.0f} MB, "
+              f"cold storage {size_mb(cold_path):.0f} MB")
+        for label, ms, count in time_history(db, symbols, ranges, args.queries):
+            print(f"  after   {label:<28} {ms:8.2f} ms/query  {count} rows")
+        db.connections.close_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Watchlist reads from the versioned snapshot vs the full query, and bulk vs single edits.
+
+Times Database.get_watchlist while nothing changed (a version check) and
+right after one edit (re-reads the changed symbol), against the full
+ORDER BY created_at query every call used to run; then adds `--edits`
+symbols one request at a time and with one /api/watchlist/bulk request.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from config import Config
+
+
+def per_call(func, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        func()
+    return (time.perf_counter() - start) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--symbols', type=int, default=500)
+    parser.add_argument('--calls', type=int, default=5000)
+    parser.add_argument('--edits', type=int, default=200)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+
+    class BenchConfig(Config):
+        DATABASE_PATH = os.path.join(workdir, 'stock_data.db')
+        PRICE_REFRESH_ENABLED = False
+
+    import main as webapp
+    app = webapp.create_app(BenchConfig)
+    client = app.test_client()
+    db = app.extensions['stockwatcher'].db
+    db.edit_watchlist(add=[(f"SYM{i:04d}", 100.0 + i) for i in range(args.symbols)])
+
+    def full_query():
+        with db.connections.connection() as conn:
+            return conn.execute(
+                'SELECT symbol, target_price, alert_enabled FROM watchlist ORDER BY created_at DESC'
+            ).fetchall()
+
+    assert [row[0] for row in full_query()] and len(db.get_watchlist()) == args.symbols
+    print(f"{args.symbols} watchlist symbols")
+    print(f"{'full query':<34} {per_call(full_query, args.calls) * 1e6:9.1f} us")
+    print(f"{'snapshot, unchanged':<34} {per_call(db.get_watchlist, args.calls) * 1e6:9.1f} us")
+    after_edit = 0.0
+    for i in range(args.calls // 10):
+        db.update_alert_status('SYM0000', i % 2 == 0)
+        start = time.perf_counter()
+        db.get_watchlist()
+        after_edit += time.perf_counter() - start
+    print(f"{'snapshot, after one edit':<34} {after_edit / (args.calls // 10) * 1e6:9.1f} us")
+    print(f"{'GET /api/watchlist':<34} {per_call(lambda: client.get('/api/watchlist'), args.calls // 10) * 1e6:9.1f} us")
+
+    symbols = [f"NEW{i:04d}" for i in range(args.edits)]
+    start = time.perf_counter()
+    for symbol in symbols:
+        client.post('/api/watchlist', json={'symbol': symbol, 'target_price': 10.0})
+    single = time.perf_counter() - start
+    client.post('/api/watchlist/bulk', json={'remove': symbols})
+    start = time.perf_counter()
+    response = client.post('/api/watchlist/bulk', json={'add': [{'symbol': s, 'target_price': 10.0} for s in symbols]})
+    bulk = time.perf_counter() - start
+    assert len(response.get_json()['added']) == args.edits
+    print(f"{f'add {args.edits}, one request each':<34} {single * 1000:9.1f} ms")
+    print(f"{f'add {args.edits}, one bulk request':<34} {bulk * 1000:9.1f} ms")
+    app.extensions['stockwatcher'].close()
+
+
+if __name__ == '__main__':
+    main()
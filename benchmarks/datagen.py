@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Synthetic StockWatcher database at a realistic scale.
+
+Fills stock_prices with a random walk per symbol, one tick every
+`interval` seconds up to now (with the matching price_bars rollups), and
+adds watchlist entries, portfolio positions (through Portfolio, so
+transactions, lots and holdings agree) and alerts. The same scale and seed
+always produce the same prices and rows; only the end time (now by
+default) shifts the timestamps.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import rollups
+from app.alert_engine import CONDITIONS
+from app.connection import ConnectionManager
+from app.database import Database
+from app.portfolio import Portfolio
+
+SCALES = {
+    'small': dict(symbols=50, days=14, interval=300, watchlist=20, positions=50, alerts=100),
+    'medium': dict(symbols=200, days=60, interval=300, watchlist=100, positions=300, alerts=1000),
+    'large': dict(symbols=500, days=180, interval=300, watchlist=500, positions=2000, alerts=10000),
+}
+
+
+def symbol_names(count):
+    return [f"SYM{i:04d}" for i in range(count)]
+
+
+def generate(db_path, symbols=50, days=14, interval=300, watchlist=20, positions=50, alerts=100,
+             seed=42, end=None, chunk_size=50000):
+    """Create the database at `db_path` (which must not exist); returns row counts and the tick time range."""
+    rng = random.Random(seed)
+    names = symbol_names(symbols)
+    prices = {symbol: rng.uniform(10, 500) for symbol in names}
+    end = int(end if end is not None else time.time())
+    start = end - days * 86400
+
+    connections = ConnectionManager(db_path)
+    connections.ensure_schema()
+    ticks = 0
+    with connections.transaction() as conn:
+        chunk = []
+        for ts in range(start, end, interval):
+            for symbol in names:
+                price = prices[symbol] = max(0.5, prices[symbol] * (1 + rng.gauss(0, 0.002)))
+                chunk.append((symbol, round(price, 2), 'USD', ts))
+            if len(chunk) >= chunk_size:
+                conn.executemany('INSERT INTO stock_prices (symbol, price, currency, timestamp) VALUES (?, ?, ?, ?)',
+                                 chunk)
+                rollups.apply_ticks(conn, chunk)
+                ticks += len(chunk)
+                chunk = []
+        if chunk:
+            conn.executemany('INSERT INTO stock_prices (symbol, price, currency, timestamp) VALUES (?, ?, ?, ?)',
+                             chunk)
+            rollups.apply_ticks(conn, chunk)
+            ticks += len(chunk)
+
+    db = Database(connections=connections)
+    for symbol in rng.sample(names, min(watchlist, symbols)):
+        db.add_to_watchlist(symbol, round(prices[symbol] * rng.uniform(0.9, 1.1), 2))
+    portfolio = Portfolio(connections=connections)
+    for _ in range(positions):
+        symbol = rng.choice(names)
+        portfolio.add_position(symbol, rng.randint(1, 200), round(prices[symbol] * rng.uniform(0.7, 1.2), 2))
+    for _ in range(alerts):
+        symbol = rng.choice(names)
+        condition = rng.choice(CONDITIONS)
+        threshold = rng.uniform(1, 10) if condition == 'percent_move' else prices[symbol] * rng.uniform(0.8, 1.2)
+        db.add_alert(symbol, condition, round(threshold, 2))
+
+    with connections.connection() as conn:
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')  # a single self-contained file, safe to copy
+    connections.close_all()
+    return {'symbols': symbols, 'ticks': ticks, 'watchlist': min(watchlist, symbols),
+            'positions': positions, 'alerts': alerts, 'start': start, 'end': end}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('path', help='database file to create')
+    parser.add_argument('--scale', choices=SCALES, default='small')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    if os.path.exists(args.path):
+        parser.error(f"{args.path} already exists")
+    began = time.perf_counter()
+    counts = generate(args.path, seed=args.seed, **SCALES[args.scale])
+    print(f"{args.path}: {counts['ticks']:,} ticks for {counts['symbols']} symbols, {counts['watchlist']} watchlist "
+          f"entries, {counts['positions']} positions, {counts['alerts']} alerts "
+          f"({os.path.getsize(args.path) / 1e6:.0f} MB, {time.perf_counter() - began:.1f}s)")
+
+
+if __name__ == '__main__':
+    main()
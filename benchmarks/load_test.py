@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""Sustained concurrent load on the Flask dev server vs the ASGI app with a slow upstream.
+
+Each request asks for symbols nobody has fetched yet, so every request
+waits on the stub upstream (``--latency`` seconds) instead of the cache.
+Both servers run in a subprocess with the upstream rate limit disabled.
+"""
+
+import argparse
+import asyncio
+import itertools
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import aiohttp
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from benchmarks.stub_server import StubServer
+
+SERVERS = {
+    'flask': "import main; main.create_app().run(host='127.0.0.1', port={port}, threaded=True)",
+    'asgi': "import asgi, uvicorn; uvicorn.run(asgi.app, host='127.0.0.1', port={port}, "
+            "log_level='warning', access_log=False)",
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(mode, upstream):
+    port = free_port()
+    env = dict(os.environ, STOCK_API_BASE_URL=upstream, STOCK_API_RATE_LIMIT='0', PYTHONPATH=ROOT)
+    process = subprocess.Popen([sys.executable, '-c', SERVERS[mode].format(port=port)],
+                               cwd=tempfile.mkdtemp(), env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/api/watchlist', timeout=1).close()
+            return process, port
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"{mode} server did not start")
+
+
+def thread_count(pid):
+    with open(f'/proc/{pid}/status') as status:
+        for line in status:
+            if line.startswith('Threads:'):
+                return int(line.split()[1])
+    return 0
+
+
+async def load(port, route, concurrency, duration, pid):
+    counter = itertools.count()
+    latencies = []
+    errors = 0
+    peak_threads = 0
+    deadline = time.monotonic() + duration
+
+    def path():
+        n = next(counter)
+        if route == 'compare':
+            return f"/api/compare?symbols={','.join(f'L{n}X{i}' for i in range(3))}"
+        return f"/api/stock/L{n}"
+
+    async def worker(session):
+        nonlocal errors
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                async with session.get(f'http://127.0.0.1:{port}{path()}') as response:
+                    await response.read()
+                    if response.status != 200:
+                        errors += 1
+                        continue
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    async def sample_threads():
+        nonlocal peak_threads
+        while time.monotonic() < deadline:
+            peak_threads = max(peak_threads, thread_count(pid))
+            await asyncio.sleep(0.2)
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=60)) as session:
+        await asyncio.gather(sample_threads(), *(worker(session) for _ in range(concurrency)))
+    return latencies, errors, peak_threads
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--servers', default='flask,asgi')
+    parser.add_argument('--routes', default='stock,compare')
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--latency', type=float, default=0.25, help='seconds added to each upstream response')
+    args = parser.parse_args()
+
+    upstream = StubServer(latency=args.latency).start()
+    print(f"{args.concurrency} concurrent clients, {args.duration:g}s per run, "
+          f"{args.latency * 1000:.0f}ms upstream latency, every request a cache miss")
+    try:
+        for mode in args.servers.split(','):
+            process, port = start_server(mode, upstream.base_url)
+            try:
+                for route in args.routes.split(','):
+                    latencies, errors, threads = asyncio.run(
+                        load(port, route, args.concurrency, args.duration, process.pid))
+                    latencies.sort()
+                    p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0
+                    p99 = latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0
+                    print(f"{mode:<6} {route:<8} {len(latencies) / args.duration:7.1f} req/s  "
+                          f"p50 {p50:6.0f}ms  p99 {p99:6.0f}ms  {errors:4d} errors  "
+                          f"{threads:4d} server threads at peak")
+            finally:
+                process.terminate()
+                process.wait()
+    finally:
+        upstream.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""Local SMTP sink for exercising alert delivery without a real mail server.
+
+Speaks just enough SMTP for smtplib (EHLO/HELO, MAIL, RCPT, DATA, NOOP,
+RSET, QUIT; no STARTTLS or AUTH, so run the app with SMTP_USE_TLS=0 and no
+EMAIL_PASS). `connect_latency` stands in for the TLS handshake and login a
+real server costs per connection, and `fail_rate` rejects that fraction of
+messages with a temporary 451 error. ``python -m aiosmtpd -n`` works as a
+drop-in alternative when it is installed.
+"""
+
+import random
+import socketserver
+import threading
+import time
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def _reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        if server.connect_latency:
+            time.sleep(server.connect_latency)
+        self._reply('220 stockwatcher-sink ESMTP')
+        recipients = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip()
+            verb = command[:4].upper()
+            if verb == 'EHLO':
+                self._reply('250-stockwatcher-sink')
+                self._reply('250 8BITMIME')
+            elif verb in ('HELO', 'NOOP', 'RSET', 'MAIL'):
+                if verb == 'RSET':
+                    recipients = []
+                self._reply('250 OK')
+            elif verb == 'RCPT':
+                recipients.append(command.split(':', 1)[-1].strip(' <>'))
+                self._reply('250 OK')
+            elif verb == 'DATA':
+                self._reply('354 End data with <CR><LF>.<CR><LF>')
+                lines = []
+                while True:
+                    data = self.rfile.readline()
+                    if not data or data in (b'.\r\n', b'.\n'):
+                        break
+                    lines.append(data)
+                if server.fail_rate and random.random() < server.fail_rate:
+                    self._reply('451 Temporary failure, try again later')
+                else:
+                    with server.lock:
+                        server.messages.append((recipients, b''.join(lines).decode(errors='replace')))
+                    self._reply('250 Queued')
+                recipients = []
+            elif verb == 'QUIT':
+                self._reply('221 Bye')
+                return
+            else:
+                self._reply('502 Command not implemented')
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port=0, connect_latency=0.0, fail_rate=0.0):
+        super().__init__(('127.0.0.1', port), SMTPHandler)
+        self.connect_latency = connect_latency
+        self.fail_rate = fail_rate
+        self.connections = 0
+        self.messages = []
+        self.lock = threading.Lock()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run the local SMTP sink')
+    parser.add_argument('--port', type=int, default=8025)
+    parser.add_argument('--connect-latency', type=float, default=0.0, help='seconds added to each connection')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='fraction of messages rejected with 451')
+    args = parser.parse_args()
+
+    sink = SMTPSink(args.port, args.connect_latency, args.fail_rate)
+    print(f"SMTP sink listening on 127.0.0.1:{sink.port}")
+    try:
+        sink.serve_forever()
+    except KeyboardInterrupt:
+        sink.server_close()
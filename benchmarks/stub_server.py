@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Local stand-in for the Yahoo Finance endpoints used by StockAPI.
+
+Serves ``/v8/finance/chart/<symbol>`` and ``/v7/finance/quote?symbols=...``
+with deterministic prices, optional per-request latency and an optional
+error rate, so benchmarks never touch the real upstream. Symbols starting
+with ``UNKNOWN_PREFIX`` do not exist: the chart endpoint answers 404 and the
+multi-quote endpoint leaves them out, as Yahoo does.
+"""
+
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+UNKNOWN_PREFIX = 'NOSUCH'
+
+
+def _price_for(symbol):
+    return round(10 + (zlib.crc32(symbol.encode()) % 99000) / 100, 2)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.request_count += 1
+        if server.latency:
+            time.sleep(server.latency)
+        if server.error_rate and random.random() < server.error_rate:
+            self._send_json(random.choice((429, 500, 503)), {'error': 'injected'})
+            return
+
+        url = urlparse(self.path)
+        if url.path.startswith('/v8/finance/chart/'):
+            symbol = url.path.rsplit('/', 1)[-1].upper()
+            if symbol.startswith(UNKNOWN_PREFIX):
+                self._send_json(404, {'chart': {'result': None, 'error': {
+                    'code': 'Not Found', 'description': 'No data found, symbol may be delisted'}}})
+                return
+            price = _price_for(symbol)
+            self._send_json(200, {'chart': {'result': [{'meta': {
+                'symbol': symbol,
+                'regularMarketPrice': price,
+                'currency': 'USD',
+                'marketState': 'REGULAR',
+                'previousClose': round(price * 0.99, 2)
+            }}], 'error': None}})
+        elif url.path == '/v7/finance/quote' and server.batch_enabled:
+            symbols = parse_qs(url.query).get('symbols', [''])[0].split(',')
+            result = []
+            for symbol in filter(None, symbols):
+                if symbol.upper().startswith(UNKNOWN_PREFIX):
+                    continue
+                price = _price_for(symbol.upper())
+                result.append({
+                    'symbol': symbol.upper(),
+                    'regularMarketPrice': price,
+                    'currency': 'USD',
+                    'marketState': 'REGULAR',
+                    'regularMarketPreviousClose': round(price * 0.99, 2)
+                })
+            self._send_json(200, {'quoteResponse': {'result': result, 'error': None}})
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=0.0, error_rate=0.0, batch_enabled=True):
+        super().__init__(('127.0.0.1', port), StubHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.batch_enabled = batch_enabled
+        self.request_count = 0
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run the local Yahoo stub server')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds added to each response')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests failing with 429/5xx')
+    parser.add_argument('--no-batch', action='store_true', help='disable the multi-quote endpoint')
+    args = parser.parse_args()
+
+    server = StubServer(args.port, args.latency, args.error_rate, not args.no_batch)
+    print(f"Stub server listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
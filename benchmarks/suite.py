@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""Reproducible benchmark suite: app scenarios on generated data, results as JSON.
+
+Generates a database with benchmarks/datagen.py (or reuses one from
+--data-dir), starts the Yahoo stub server with the given latency and error
+rate, and runs each scenario in-process through the Flask test client
+against a fresh copy of that database. Every measurement records latency
+percentiles and throughput; with --output the run is written as JSON, and
+--compare reports the change against an earlier run's JSON, exiting
+non-zero when any median got slower than --threshold.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from benchmarks import datagen
+from benchmarks.stub_server import StubServer
+from config import Config
+
+
+def summarize(durations, **extra):
+    durations = sorted(durations)
+    total = sum(durations)
+
+    def percentile(p):
+        return durations[min(len(durations) - 1, int(p * len(durations)))] * 1000
+
+    result = {
+        'iterations': len(durations),
+        'p50_ms': round(percentile(0.5), 4),
+        'p95_ms': round(percentile(0.95), 4),
+        'p99_ms': round(percentile(0.99), 4),
+        'mean_ms': round(total / len(durations) * 1000, 4),
+        'ops_per_sec': round(len(durations) / total, 2) if total else None
+    }
+    result.update(extra)
+    return result
+
+
+def measure(func, iterations, warmup=0):
+    """Time `func(i)` for i in range(iterations) after `warmup` untimed calls."""
+    for i in range(warmup):
+        func(i)
+    durations = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        func(i)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+class Run:
+    """One scenario's app: a fresh copy of the generated database and its own services."""
+
+    def __init__(self, suite, name):
+        self.suite = suite
+        self.workdir = os.path.join(suite.workdir, name)
+        os.makedirs(self.workdir)
+        self.db_path = os.path.join(self.workdir, 'stock_data.db')
+        shutil.copyfile(suite.data_path, self.db_path)
+
+        class SuiteConfig(Config):
+            DATABASE_PATH = self.db_path
+            STOCK_API_BASE_URL = suite.server.base_url
+            STOCK_API_RATE_LIMIT = 0
+            PRICE_REFRESH_ENABLED = False
+            SHARED_CACHE_PATH = None
+            SYMBOL_LIST_PATH = os.path.join(self.workdir, 'symbols.csv')
+            COLD_STORAGE_PATH = os.path.join(self.workdir, 'cold_storage')
+
+        import main as webapp
+        self.config = SuiteConfig
+        self.app = webapp.create_app(SuiteConfig)
+        self.client = self.app.test_client()
+        self.services = self.app.extensions['stockwatcher']
+        self.errors = 0
+
+    def get(self, path):
+        response = self.client.get(path)
+        if response.status_code >= 400:
+            self.errors += 1
+        return response
+
+    def upstream(self):
+        return self.suite.server.request_count
+
+    def close(self):
+        self.services.close()
+        self.services.connections.close_all()
+
+
+def quote_fetch(run, n):
+    symbols = run.suite.symbols
+    before = run.upstream()
+    cold = measure(lambda i: run.get(f'/api/stock/NEW{i:05d}'), n)
+    cold_upstream = run.upstream() - before
+    warm = measure(lambda i: run.get(f'/api/stock/{symbols[i % 10]}'), n, warmup=10)
+    return {
+        'cold': summarize(cold, upstream_requests=cold_upstream),
+        'warm': summarize(warm)
+    }
+
+
+def compare(run, n):
+    def batch(i):
+        return ','.join(f'CMP{i:04d}X{j}' for j in range(10))
+
+    symbols = ','.join(run.suite.symbols[:10])
+    before = run.upstream()
+    cold = measure(lambda i: run.get(f'/api/compare?symbols={batch(i)}'), n)
+    cold_upstream = run.upstream() - before
+    warm = measure(lambda i: run.get(f'/api/compare?symbols={symbols}'), n, warmup=1)
+    return {
+        'cold_10_symbols': summarize(cold, upstream_requests=cold_upstream),
+        'warm_10_symbols': summarize(warm)
+    }
+
+
+def history(run, n):
+    symbols = run.suite.symbols
+    month_ago = run.suite.data['end'] - 30 * 86400
+    raw = measure(lambda i: run.get(f'/api/history/{symbols[i % len(symbols)]}?limit=100'), n)
+    bars = measure(lambda i: run.get(f'/api/history/{symbols[i % len(symbols)]}?start={month_ago}&limit=500'), n)
+    return {
+        'raw_100': summarize(raw),
+        'bars_30_days': summarize(bars)
+    }
+
+
+def portfolio_summary(run, n):
+    cache = run.services.stock_api.cache
+    cold = measure(lambda i: (cache.clear(), run.get('/api/portfolio')), max(n // 10, 3))
+    warm = measure(lambda i: run.get('/api/portfolio'), n, warmup=1)
+    return {
+        'cold': summarize(cold),
+        'warm': summarize(warm)
+    }
+
+
+def alert_check(run, n):
+    cache = run.services.stock_api.cache
+    cold = measure(lambda i: (cache.clear(), run.get('/api/alerts/check')), max(n // 10, 3), warmup=1)
+    warm = measure(lambda i: run.get('/api/alerts/check'), n, warmup=1)
+    return {
+        'cold': summarize(cold),
+        'warm': summarize(warm)
+    }
+
+
+def backup(run, n):
+    from app import backup as backups
+
+    copies = measure(lambda i: backups.backup_database(run.db_path, os.path.join(run.workdir, f'backup{i}.db')),
+                     max(n // 20, 3))
+    exports = measure(lambda i: backups.export_ndjson(run.db_path, os.path.join(run.workdir, f'export{i}.ndjson.gz')),
+                      max(n // 50, 1))
+    return {
+        'online_backup': summarize(copies, mb=round(os.path.getsize(run.db_path) / 1e6, 1)),
+        'ndjson_export_full': summarize(exports)
+    }
+
+
+def cleanup(run, n):
+    from app import cold_storage
+    from utils.data_cleanup import DataCleanup
+
+    cleaner = DataCleanup(run.db_path, run.config.COLD_STORAGE_PATH)
+    archive = cold_storage.available()
+    moved = []
+    durations = measure(lambda i: moved.append(cleaner.cleanup_old_data(7, archive=archive)), 1)
+    return {
+        'archive_older_than_7_days' if archive else 'delete_older_than_7_days':
+            summarize(durations, ticks=moved[0])
+    }
+
+
+SCENARIOS = {
+    'quote_fetch': quote_fetch,
+    'compare': compare,
+    'history': history,
+    'portfolio_summary': portfolio_summary,
+    'alert_check': alert_check,
+    'backup': backup,
+    'cleanup': cleanup,
+}
+
+
+class Suite:
+    def __init__(self, args):
+        self.args = args
+        self.workdir = tempfile.mkdtemp(prefix='stockwatcher-bench-')
+        self.server = None
+        self.data_path = None
+        self.data = None
+        self.symbols = None
+
+    def prepare(self):
+        args = self.args
+        scale = datagen.SCALES[args.scale]
+        self.symbols = datagen.symbol_names(scale['symbols'])
+        data_dir = args.data_dir or self.workdir
+        os.makedirs(data_dir, exist_ok=True)
+        self.data_path = os.path.join(data_dir, f'{args.scale}-seed{args.seed}.db')
+        meta_path = self.data_path + '.json'
+        if not os.path.exists(meta_path):
+            if os.path.exists(self.data_path):
+                os.remove(self.data_path)
+            print(f"Generating {args.scale} data set...")
+            self.data = datagen.generate(self.data_path, seed=args.seed, **scale)
+            with open(meta_path, 'w') as f:
+                json.dump(self.data, f)
+        else:
+            with open(meta_path) as f:
+                self.data = json.load(f)
+        self.server = StubServer(latency=args.latency, error_rate=args.error_rate).start()
+
+    def run(self, names):
+        results = {}
+        for name in names:
+            run = Run(self, name)
+            try:
+                start = time.perf_counter()
+                measurements = SCENARIOS[name](run, self.args.iterations)
+                elapsed = time.perf_counter() - start
+            finally:
+                run.close()
+            for label, result in measurements.items():
+                if run.errors:
+                    result['http_errors'] = run.errors
+                results[f'{name}.{label}'] = result
+                print(f"{name + '.' + label:<42} p50 {result['p50_ms']:10.3f} ms  p95 {result['p95_ms']:10.3f} ms"
+                      f"  {result['ops_per_sec'] or 0:10.1f} ops/s")
+            print(f"{'':<42} ({elapsed:.1f}s)")
+        return results
+
+    def close(self):
+        if self.server is not None:
+            self.server.stop()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_runs(baseline, current, threshold):
+    """Print median changes against `baseline`; returns the measurements that regressed."""
+    regressions = []
+    print(f"\nCompared with {baseline['meta'].get('revision')} ({baseline['meta'].get('timestamp')}):")
+    for name, result in current['results'].items():
+        before = baseline['results'].get(name)
+        if not before or not before.get('p50_ms'):
+            print(f"  {name:<42} new")
+            continue
+        change = result['p50_ms'] / before['p50_ms'] - 1
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print(f"  {name:<42} {before['p50_ms']:10.3f} -> {result['p50_ms']:10.3f} ms  {change:+7.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scale', choices=datagen.SCALES, default='small')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--latency', type=float, default=0.05, help='stub server seconds per request')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of stub requests failing')
+    parser.add_argument('--iterations', type=int, default=100, help='timed calls per measurement')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='comma-separated subset to run')
+    parser.add_argument('--data-dir', help='keep generated databases here and reuse them across runs')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.15, help='median slowdown counted as a regression')
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)} (choose from {', '.join(SCENARIOS)})")
+
+    suite = Suite(args)
+    try:
+        suite.prepare()
+        results = suite.run(names)
+    finally:
+        suite.close()
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'scale': args.scale,
+            'seed': args.seed,
+            'latency': args.latency,
+            'error_rate': args.error_rate,
+            'iterations': args.iterations,
+            'data': suite.data
+        },
+        'results': results
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare_runs(baseline, report, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,15 +3,81 @@ import os
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-key-stockwatcher-2025'
     DATABASE_PATH = os.environ.get('DATABASE_PATH') or 'stock_data.db'
+    # Parquet archive of ticks moved out of stock_prices by DataCleanup (needs pyarrow)
+    COLD_STORAGE_PATH = os.environ.get('COLD_STORAGE_PATH') or 'cold_storage'
+    STOCK_API_BASE_URL = os.environ.get('STOCK_API_BASE_URL') or 'https://query1.finance.yahoo.com'
     STOCK_API_TIMEOUT = 10
-    PRICE_UPDATE_INTERVAL = 300  # 5 minutes
+    STOCK_API_RATE_LIMIT = float(os.environ.get('STOCK_API_RATE_LIMIT') or 10)  # requests/second, 0 disables
+    STOCK_API_RATE_BURST = 10
+    STOCK_API_MAX_WORKERS = 8
+    STOCK_API_BATCH_SIZE = 50  # symbols per multi-quote request, 1 disables batching
+    STOCK_API_POOL_SIZE = 10  # keep-alive connections per host
+    STOCK_API_MAX_RETRIES = 3  # retries on 429/5xx, timeouts and connection errors
+    STOCK_API_BACKOFF_BASE = 0.25  # seconds, doubled per attempt with full jitter
+    STOCK_API_BACKOFF_MAX = 4.0
+    STOCK_API_BREAKER_THRESHOLD = 5  # consecutive failures before the circuit opens
+    STOCK_API_BREAKER_RESET = 30  # seconds before a trial request is allowed
+    QUOTE_CACHE_SIZE = 2048  # symbols kept in memory, least recently used evicted
+    QUOTE_CACHE_TTL = 60  # seconds a quote is considered fresh
+    QUOTE_CACHE_STALE_TTL = 120  # extra seconds a stale quote is served while refreshing
+    INDICATOR_CACHE_SIZE = 64  # /api/indicators series (symbol + parameters) kept, least recently used evicted
+    # SQLite file shared by all processes on the host, unset keeps the cache per-process
+    SHARED_CACHE_PATH = os.environ.get('SHARED_CACHE_PATH')
+    # Write-behind buffering of stock_prices inserts in the web process
+    TICK_WRITE_BEHIND = True
+    TICK_BATCH_SIZE = 500  # rows per executemany transaction
+    TICK_FLUSH_INTERVAL = 1.0  # seconds a tick may wait in the queue
+    # Lot matching for portfolio sells: 'fifo' or 'average' (average cost)
+    COST_BASIS_METHOD = os.environ.get('COST_BASIS_METHOD') or 'fifo'
+    # Alert monitor daemon (scripts/monitor_alerts.py)
+    MONITOR_CONCURRENCY = 8  # quote batches in flight
+    MONITOR_MIN_INTERVAL = 5  # seconds between polls of a symbol sitting on a threshold
+    MONITOR_MAX_INTERVAL = 25  # seconds between polls far from any threshold, headroom under a 30s freshness target
+    MONITOR_NEAR_RANGE = 0.10  # relative distance beyond which a symbol gets the max interval
+    MONITOR_RELOAD_INTERVAL = 60  # seconds between alert/watchlist reloads from the database
+    MONITOR_STATUS_PATH = os.environ.get('MONITOR_STATUS_PATH') or 'monitor_status.json'
+    # Symbol registry (app/symbols.py): listing written by scripts/update_symbols.py
+    SYMBOL_LIST_PATH = os.environ.get('SYMBOL_LIST_PATH') or 'symbols.csv'
+    SYMBOL_NEGATIVE_TTL = 3600  # seconds a symbol the provider did not know stays invalid
+    SYMBOL_SEARCH_MAX = 50  # results per /api/symbols/search request
+    QUOTES_MAX_SYMBOLS = 200  # symbols per /api/quotes request
+    WATCHLIST_BULK_MAX = 500  # edits per /api/watchlist/bulk request
+    WATCHLIST_CHANGES_KEEP = 1000  # newest watchlist_changes rows kept for change feeds
+    ALERT_CHANGES_KEEP = 1000  # newest alert_changes rows kept for other processes to catch up from
+    # Live quote stream (/api/stream), one shared poller per process
+    STREAM_INTERVAL = 15  # seconds between polls of the subscribed symbols
+    STREAM_HEARTBEAT = 15  # seconds between keep-alive comments on an idle stream
+    STREAM_RETRY_MS = 5000  # reconnect delay suggested to EventSource clients
+    STREAM_MAX_SYMBOLS = 200
+    # ASGI serving mode (asgi.py)
+    ASGI_UPSTREAM_CONNECTIONS = 100  # concurrent upstream requests from async routes
+    ASGI_DB_THREADS = 8  # thread pool for database work in async routes
+    ASGI_WSGI_THREADS = 32  # threads running the remaining Flask routes, one per open /api/stream
+    # Sampling profiler endpoint (/debug/profile), off unless PROFILING_ENABLED=1
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED') == '1'
+    PROFILING_MAX_SECONDS = 60
+    PRICE_UPDATE_INTERVAL = 300  # 5 minutes, longest a tracked symbol goes without a background refresh
+    # Background price refresher (app/refresher.py) in the web process, PRICE_REFRESH_ENABLED=0 turns it off
+    PRICE_REFRESH_ENABLED = (os.environ.get('PRICE_REFRESH_ENABLED') or '1') != '0'
+    PRICE_REFRESH_TICK = 5  # seconds between scheduling passes
+    PRICE_REFRESH_RATE_SHARE = 0.5  # fraction of the upstream rate limit the refresher may use
+    PRICE_REFRESH_RELOAD_INTERVAL = 60  # seconds between reloads of the tracked symbols
     MAX_HISTORY_RECORDS = 1000
     
     # Alert settings
     SMTP_SERVER = os.environ.get('SMTP_SERVER') or 'smtp.gmail.com'
-    SMTP_PORT = 587
+    SMTP_PORT = int(os.environ.get('SMTP_PORT') or 587)
+    SMTP_USE_TLS = (os.environ.get('SMTP_USE_TLS') or '1') != '0'
+    SMTP_IDLE_TIMEOUT = 60  # seconds an idle SMTP connection is kept open for reuse
     EMAIL_USER = os.environ.get('EMAIL_USER')
     EMAIL_PASS = os.environ.get('EMAIL_PASS')
+    ALERT_RECIPIENT = os.environ.get('ALERT_RECIPIENT') or EMAIL_USER
+    # Queued alert emails (app/notifications.py)
+    NOTIFY_DIGEST_WINDOW = 30  # seconds alerts to one recipient are collected into a digest
+    NOTIFY_DIGEST_MAX = 50  # alerts per digest email
+    NOTIFY_MAX_ATTEMPTS = 5  # delivery attempts before a notification is marked failed
+    NOTIFY_BACKOFF_BASE = 5  # seconds, doubled per attempt with full jitter
+    NOTIFY_BACKOFF_MAX = 300
     
     # Default watchlist symbols
     DEFAULT_SYMBOLS = ['AAPL', 'GOOGL', 'MSFT', 'TSLA']
\ No newline at end of file
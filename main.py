@@ -1,101 +1,298 @@
 #!/usr/bin/env python3
 
-from flask import Flask, render_template, request, jsonify
-from app.stock_api import StockAPI
-from app.database import Database
-from app.alerts import AlertSystem
-from app.portfolio import Portfolio
+from flask import Blueprint, Flask, Response, current_app, g, render_template, request, jsonify
+from werkzeug.local import LocalProxy
+from app.services import Services
+from app.alert_engine import CONDITIONS, DEFAULT_BAND_PCT, DEFAULT_COOLDOWN
+from app.ledger import InsufficientSharesError, InvalidTradeError
+from app.rollups import RESOLUTIONS
+from app import metrics, quote_encoding
+from app.profiler import SamplingProfiler
 from config import Config
+import json
+import time
 import traceback
+from datetime import datetime, timezone
 
-app = Flask(__name__)
-app.config.from_object(Config)
-stock_api = StockAPI()
-db = Database()
-alert_system = AlertSystem()
-portfolio = Portfolio()
+api = Blueprint('stockwatcher', __name__)
+# Components of the app handling the current request, built on first use
+services = LocalProxy(lambda: current_app.extensions['stockwatcher'])
 
-@app.route('/')
+def create_app(config=None, services=None):
+    app = Flask(__name__)
+    app.config.from_object(config or Config)
+    app.json.sort_keys = False  # keep /api/compare results in request order
+    app.extensions['stockwatcher'] = services or Services(config)
+    app.register_blueprint(api)
+    return app
+
+@api.before_app_request
+def start_timer():
+    g.request_started = time.perf_counter()
+
+@api.before_app_request
+def start_refresher():
+    services.start_refresher()
+
+@api.after_app_request
+def record_latency(response):
+    # Labelled by URL rule, not path, so series stay bounded; /api/stream counts until headers are sent
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    metrics.HTTP_REQUEST_SECONDS.labels(request.method, route, str(response.status_code)).observe(
+        time.perf_counter() - g.request_started)
+    return response
+
+@api.route('/metrics')
+def get_metrics():
+    body = metrics.REGISTRY.render(services.collect_metrics())
+    return Response(body, content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@api.route('/debug/profile')
+def get_profile():
+    # Samples every thread for `seconds`, returning collapsed stacks for a flame graph
+    if not services.config.PROFILING_ENABLED:
+        return jsonify({'error': 'Not found'}), 404
+    try:
+        seconds = min(float(request.args.get('seconds', 10)), services.config.PROFILING_MAX_SECONDS)
+        interval = max(float(request.args.get('interval', 0.005)), 0.001)
+    except ValueError:
+        return jsonify({'error': 'Invalid seconds or interval'}), 400
+    profiler = SamplingProfiler(interval).start()
+    time.sleep(seconds)
+    profiler.stop()
+    return Response(profiler.collapsed(), mimetype='text/plain')
+
+@api.route('/')
 def index():
     return render_template('index.html')
 
-@app.route('/api/stock/<symbol>')
+@api.route('/api/stock/<symbol>')
 def get_stock(symbol):
     try:
-        if not stock_api.validate_symbol(symbol):
+        if not services.stock_api.validate_symbol(symbol):
             return jsonify({'error': 'Invalid stock symbol'}), 400
             
-        data = stock_api.get_stock_price(symbol)
+        data = services.stock_api.get_stock_price(symbol)
         if data:
-            db.save_stock_price(data['symbol'], data['price'], data['currency'])
+            services.db.save_stock_price(data['symbol'], data['price'], data['currency'])
             return jsonify(data)
         return jsonify({'error': 'Stock data unavailable'}), 404
     except Exception as e:
-        app.logger.error(f"Error in get_stock: {traceback.format_exc()}")
+        current_app.logger.error(f"Error in get_stock: {traceback.format_exc()}")
         return jsonify({'error': 'Internal server error'}), 500
 
-@app.route('/api/history/<symbol>')
+def _parse_time(value):
+    # Accepts epoch seconds or an ISO 8601 date/datetime (naive values are UTC)
+    if value is None or value == '':
+        return None
+    if value.isdigit():
+        return int(value)
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+def _iso(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+@api.route('/api/history/<symbol>')
 def get_stock_history(symbol):
-    history = db.get_stock_history(symbol.upper())
-    if history:
+    try:
+        start = _parse_time(request.args.get('start'))
+        end = _parse_time(request.args.get('end'))
+        limit = int(request.args.get('limit', 100))
+        if limit < 1:
+            raise ValueError(limit)
+    except ValueError:
+        return jsonify({'error': 'Invalid start, end or limit'}), 400
+    resolution = request.args.get('resolution')
+    if resolution not in (None, 'auto', 'raw') + tuple(RESOLUTIONS):
+        return jsonify({'error': f"Resolution must be one of auto, raw, {', '.join(RESOLUTIONS)}"}), 400
+
+    resolution = services.db.history_resolution(limit, start, end, resolution)
+    history = services.db.get_stock_history(symbol.upper(), limit, start, end, resolution)
+    if not history:
+        return jsonify({'error': 'No history found'}), 404
+
+    if resolution == 'raw':
         return jsonify({
             'symbol': symbol.upper(),
-            'history': [{'price': price, 'timestamp': timestamp} for price, timestamp in history]
+            'history': [{'price': price, 'timestamp': _iso(timestamp)} for price, timestamp in history]
         })
-    return jsonify({'error': 'No history found'}), 404
+    return jsonify({
+        'symbol': symbol.upper(),
+        'resolution': resolution,
+        'bars': [{
+            'timestamp': _iso(bucket),
+            'open': open_price,
+            'high': high,
+            'low': low,
+            'close': close,
+            'ticks': ticks
+        } for bucket, open_price, high, low, close, ticks in history]
+    })
+
+@api.route('/api/indicators/<symbol>')
+def get_indicators(symbol):
+    try:
+        limit = int(request.args.get('limit', 100))
+        window = int(request.args.get('window', 20))
+        ema_span = int(request.args.get('ema_span', 20))
+        rsi_period = int(request.args.get('rsi_period', 14))
+        if min(limit, window, ema_span, rsi_period) < 1 or max(window, ema_span, rsi_period) > 1000:
+            raise ValueError
+    except ValueError:
+        return jsonify({'error': 'limit, window, ema_span and rsi_period must be integers between 1 and 1000'}), 400
+
+    limit = min(limit, services.config.MAX_HISTORY_RECORDS)
+    data = services.indicators.get(symbol.upper(), limit, window, ema_span, rsi_period)
+    if data is None:
+        return jsonify({'error': 'No history found'}), 404
+    return jsonify({'symbol': symbol.upper(), **data})
 
-@app.route('/api/watchlist', methods=['GET'])
+@api.route('/api/watchlist', methods=['GET'])
 def get_watchlist():
-    watchlist = db.get_watchlist()
+    watchlist = services.db.get_watchlist()
     return jsonify([{
         'symbol': symbol,
         'target_price': target_price,
         'alert_enabled': bool(alert_enabled)
     } for symbol, target_price, alert_enabled in watchlist])
 
-@app.route('/api/watchlist', methods=['POST'])
+@api.route('/api/watchlist', methods=['POST'])
 def add_to_watchlist():
-    data = request.get_json()
+    data = request.get_json() or {}
     symbol = data.get('symbol', '').upper()
     target_price = data.get('target_price')
     
     if not symbol:
         return jsonify({'error': 'Symbol required'}), 400
+    if target_price is not None:
+        try:
+            target_price = float(target_price)
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Invalid number format'}), 400
     
-    if db.add_to_watchlist(symbol, target_price):
+    if services.db.add_to_watchlist(symbol, target_price):
         return jsonify({'message': f'{symbol} added to watchlist'})
     else:
         return jsonify({'error': 'Symbol already in watchlist'}), 400
 
-@app.route('/api/watchlist/<symbol>', methods=['DELETE'])
+@api.route('/api/watchlist/bulk', methods=['POST'])
+def bulk_edit_watchlist():
+    # {"add": [symbol or {symbol, target_price}], "remove": [symbol], "update": [{symbol, alert_enabled}]}
+    data = request.get_json() or {}
+    try:
+        if not all(isinstance(data.get(key, []), list) for key in ('add', 'remove', 'update')):
+            raise TypeError
+        add = [(item, None) if isinstance(item, str) else (item['symbol'], item.get('target_price'))
+               for item in data.get('add', [])]
+        add = [(symbol.strip().upper(), None if price is None else float(price)) for symbol, price in add]
+        remove = [symbol.strip().upper() for symbol in data.get('remove', [])]
+        update = [(item['symbol'].strip().upper(), item['alert_enabled']) for item in data.get('update', [])]
+        if not all(isinstance(enabled, bool) for _, enabled in update):
+            raise TypeError
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return jsonify({'error': 'Invalid bulk edit'}), 400
+
+    symbols = [symbol for symbol, _ in add] + remove + [symbol for symbol, _ in update]
+    if not symbols or not all(symbols):
+        return jsonify({'error': 'Symbol required'}), 400
+    if len(symbols) > services.config.WATCHLIST_BULK_MAX:
+        return jsonify({'error': f'At most {services.config.WATCHLIST_BULK_MAX} edits per request'}), 400
+    return jsonify(services.db.edit_watchlist(add, remove, update))
+
+@api.route('/api/watchlist/changes')
+def get_watchlist_changes():
+    try:
+        since = int(request.args.get('since', 0))
+    except ValueError:
+        return jsonify({'error': 'Invalid since'}), 400
+    version, changes = services.db.get_watchlist_changes(since)
+    if changes is None:
+        # Too far behind the kept log: reload GET /api/watchlist and continue from `version`
+        return jsonify({'version': version, 'reset': True, 'changes': []})
+    return jsonify({
+        'version': version,
+        'reset': False,
+        'changes': [{
+            'version': change_version,
+            'symbol': symbol,
+            'change': change,
+            'changed_at': _iso(changed_at)
+        } for change_version, symbol, change, changed_at in changes]
+    })
+
+@api.route('/api/watchlist/<symbol>', methods=['DELETE'])
 def remove_from_watchlist(symbol):
-    if db.remove_from_watchlist(symbol.upper()):
+    if services.db.remove_from_watchlist(symbol.upper()):
         return jsonify({'message': f'{symbol.upper()} removed from watchlist'})
     else:
         return jsonify({'error': 'Symbol not found in watchlist'}), 404
 
-@app.route('/api/alerts/check')
+@api.route('/api/alerts/check')
 def check_alerts():
     try:
-        alerts = alert_system.check_price_alerts(db, stock_api)
+        alerts = services.alert_system.check_price_alerts(services.db, services.stock_api)
         return jsonify({
             'alerts_count': len(alerts),
             'alerts': alerts
         })
     except Exception as e:
-        app.logger.error(f"Error checking alerts: {traceback.format_exc()}")
+        current_app.logger.error(f"Error checking alerts: {traceback.format_exc()}")
         return jsonify({'error': 'Failed to check alerts'}), 500
 
-@app.route('/api/portfolio', methods=['GET'])
+@api.route('/api/alerts', methods=['GET'])
+def list_alerts():
+    symbol = request.args.get('symbol', '').upper() or None
+    return jsonify([{
+        'id': alert_id,
+        'symbol': symbol,
+        'condition': condition,
+        'threshold': threshold,
+        'band_pct': band_pct,
+        'cooldown': cooldown,
+        'enabled': bool(enabled),
+        'last_triggered': last_triggered
+    } for alert_id, symbol, condition, threshold, band_pct, cooldown, enabled, last_triggered
+        in services.db.get_alerts(symbol)])
+
+@api.route('/api/alerts', methods=['POST'])
+def create_alert():
+    data = request.get_json() or {}
+    symbol = data.get('symbol', '').upper()
+    condition = data.get('condition', 'above')
+    
+    if not symbol or data.get('threshold') is None:
+        return jsonify({'error': 'Symbol and threshold required'}), 400
+    if condition not in CONDITIONS:
+        return jsonify({'error': f"Condition must be one of {', '.join(CONDITIONS)}"}), 400
+    try:
+        threshold = float(data['threshold'])
+        band_pct = float(data.get('band_pct', DEFAULT_BAND_PCT))
+        cooldown = int(data.get('cooldown', DEFAULT_COOLDOWN))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid number format'}), 400
+    
+    alert_id = services.db.add_alert(symbol, condition, threshold, band_pct, cooldown)
+    return jsonify({'message': f'Alert created for {symbol}', 'alert_id': alert_id})
+
+@api.route('/api/alerts/<int:alert_id>', methods=['DELETE'])
+def delete_alert(alert_id):
+    if services.db.remove_alert(alert_id):
+        return jsonify({'message': f'Alert {alert_id} removed'})
+    return jsonify({'error': 'Alert not found'}), 404
+
+@api.route('/api/portfolio', methods=['GET'])
 def get_portfolio():
     try:
-        portfolio_data = portfolio.get_portfolio_summary(stock_api)
+        portfolio_data = services.portfolio.get_portfolio_summary(services.stock_api)
         return jsonify(portfolio_data)
     except Exception as e:
-        app.logger.error(f"Error getting portfolio: {traceback.format_exc()}")
+        current_app.logger.error(f"Error getting portfolio: {traceback.format_exc()}")
         return jsonify({'error': 'Failed to get portfolio data'}), 500
 
-@app.route('/api/portfolio', methods=['POST'])
+@api.route('/api/portfolio', methods=['POST'])
 def add_portfolio_position():
     try:
         data = request.get_json()
@@ -107,21 +304,47 @@ def add_portfolio_position():
         if not symbol or not shares or not price:
             return jsonify({'error': 'Symbol, shares, and price are required'}), 400
         
-        if not stock_api.validate_symbol(symbol):
+        if not services.stock_api.validate_symbol(symbol):
             return jsonify({'error': 'Invalid stock symbol'}), 400
             
-        position_id = portfolio.add_position(symbol, float(shares), float(price), notes)
+        position_id = services.portfolio.add_position(symbol, float(shares), float(price), notes)
         return jsonify({
             'message': f'Added {shares} shares of {symbol}',
             'position_id': position_id
         })
+    except InvalidTradeError as e:
+        return jsonify({'error': str(e)}), 400
     except ValueError:
         return jsonify({'error': 'Invalid number format'}), 400
     except Exception as e:
-        app.logger.error(f"Error adding portfolio position: {traceback.format_exc()}")
+        current_app.logger.error(f"Error adding portfolio position: {traceback.format_exc()}")
         return jsonify({'error': 'Failed to add position'}), 500
 
-@app.route('/api/compare')
+@api.route('/api/portfolio/sell', methods=['POST'])
+def sell_portfolio_position():
+    try:
+        data = request.get_json()
+        symbol = data.get('symbol', '').upper()
+        shares = data.get('shares')
+        price = data.get('price')
+        
+        if not symbol or not shares or not price:
+            return jsonify({'error': 'Symbol, shares, and price are required'}), 400
+        
+        realized_pnl = services.portfolio.sell_position(symbol, float(shares), float(price))
+        return jsonify({
+            'message': f'Sold {shares} shares of {symbol}',
+            'realized_pnl': realized_pnl
+        })
+    except (InsufficientSharesError, InvalidTradeError) as e:
+        return jsonify({'error': str(e)}), 400
+    except ValueError:
+        return jsonify({'error': 'Invalid number format'}), 400
+    except Exception as e:
+        current_app.logger.error(f"Error selling portfolio position: {traceback.format_exc()}")
+        return jsonify({'error': 'Failed to sell position'}), 500
+
+@api.route('/api/compare')
 def compare_stocks():
     try:
         symbols = request.args.get('symbols', '').split(',')
@@ -130,19 +353,104 @@ def compare_stocks():
         if len(symbols) < 2:
             return jsonify({'error': 'At least 2 symbols required'}), 400
         
-        comparison_data = stock_api.get_multiple_prices(symbols)
+        if request.args.get('include_errors') == '1':
+            # Opt-in: also the reason each symbol missing from `quotes` could not be quoted
+            quotes, errors = services.stock_api.fetch_quotes(symbols)
+            return jsonify({'quotes': quotes, 'errors': errors})
+        comparison_data = services.stock_api.get_multiple_prices(symbols)
         return jsonify(comparison_data)
     except Exception as e:
-        app.logger.error(f"Error comparing stocks: {traceback.format_exc()}")
+        current_app.logger.error(f"Error comparing stocks: {traceback.format_exc()}")
         return jsonify({'error': 'Failed to compare stocks'}), 500
 
-@app.errorhandler(404)
+@api.route('/api/quotes')
+def get_quotes():
+    symbols = request.args.get('symbols', '').split(',')
+    symbols = list(dict.fromkeys(s.strip().upper() for s in symbols if s.strip()))
+    if not symbols:
+        return jsonify({'error': 'At least 1 symbol required'}), 400
+    if len(symbols) > services.config.QUOTES_MAX_SYMBOLS:
+        return jsonify({'error': f'At most {services.config.QUOTES_MAX_SYMBOLS} symbols per request'}), 400
+
+    fmt = request.args.get('format')
+    if fmt is None:
+        fmt = 'msgpack' if request.accept_mimetypes.best in ('application/x-msgpack', 'application/msgpack') else 'json'
+    if fmt not in quote_encoding.FORMATS:
+        return jsonify({'error': f"Format must be one of {', '.join(quote_encoding.FORMATS)}"}), 400
+    if not quote_encoding.available(fmt):
+        return jsonify({'error': 'msgpack is not installed on this server'}), 406
+
+    try:
+        # Fresh cached quotes cost nothing upstream; only expired ones are fetched
+        quotes, errors = services.stock_api.fetch_quotes(symbols, allow_stale=True)
+        tag = quote_encoding.etag(quotes, errors)
+        max_age = 0 if errors else services.stock_api.freshness(quotes)
+        cache_control = f'max-age={max_age}' if max_age else 'no-cache'
+
+        if request.if_none_match.contains_weak(tag):
+            response = Response(status=304)
+        else:
+            compress = 'gzip' in request.accept_encodings
+            body, gzipped = services.encoded_quotes.get(tag, fmt, compress, quotes, errors)
+            response = Response(body, mimetype=quote_encoding.MIMETYPES[fmt])
+            if gzipped:
+                response.headers['Content-Encoding'] = 'gzip'
+        response.set_etag(tag, weak=True)
+        response.headers['Cache-Control'] = cache_control
+        response.headers['Vary'] = 'Accept, Accept-Encoding'
+        return response
+    except Exception as e:
+        current_app.logger.error(f"Error fetching quotes: {traceback.format_exc()}")
+        return jsonify({'error': 'Failed to fetch quotes'}), 500
+
+@api.route('/api/symbols/search')
+def search_symbols():
+    query = request.args.get('q', '').strip()
+    try:
+        limit = min(int(request.args.get('limit', 10)), services.config.SYMBOL_SEARCH_MAX)
+    except ValueError:
+        return jsonify({'error': 'Invalid limit'}), 400
+    if not query:
+        return jsonify({'error': 'Query parameter q is required'}), 400
+    return jsonify({'query': query, 'results': services.stock_api.symbols.search(query, limit)})
+
+@api.route('/api/stream')
+def stream_quotes():
+    # Server-Sent Events: one 'quote' event per changed quote for the requested symbols
+    symbols = request.args.get('symbols', '').split(',')
+    symbols = list(dict.fromkeys(s.strip().upper() for s in symbols if s.strip()))
+    if not symbols:
+        return jsonify({'error': 'At least 1 symbol required'}), 400
+    if len(symbols) > services.config.STREAM_MAX_SYMBOLS:
+        return jsonify({'error': f'At most {services.config.STREAM_MAX_SYMBOLS} symbols per stream'}), 400
+
+    # The generator runs after the request context (and with it `services`) is gone
+    broadcaster = services.broadcaster
+    config = services.config
+    subscription = broadcaster.subscribe(symbols)
+
+    def events():
+        try:
+            yield f"retry: {config.STREAM_RETRY_MS}\n\n"
+            while not subscription.closed:
+                quotes = subscription.get(timeout=config.STREAM_HEARTBEAT)
+                if not quotes:
+                    yield ": keep-alive\n\n"  # also how a closed connection is noticed
+                for quote in quotes:
+                    yield f"event: quote\ndata: {json.dumps(quote)}\n\n"
+        finally:
+            broadcaster.unsubscribe(subscription)
+
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@api.app_errorhandler(404)
 def not_found(error):
     return jsonify({'error': 'Not found'}), 404
 
-@app.errorhandler(500)
+@api.app_errorhandler(500)
 def internal_error(error):
     return jsonify({'error': 'Internal server error'}), 500
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    create_app().run(debug=True)
\ No newline at end of file
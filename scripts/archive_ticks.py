@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import argparse
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.data_cleanup import DataCleanup
+from config import Config
+
+def main():
+    parser = argparse.ArgumentParser(description='Move aged price ticks to Parquet cold storage and prune old data')
+    parser.add_argument('--db', default=Config.DATABASE_PATH, help='database file')
+    parser.add_argument('--cold-dir', default=Config.COLD_STORAGE_PATH, help='cold storage directory')
+    parser.add_argument('--days', type=int, default=30, help='days of ticks kept in the database')
+    parser.add_argument('--no-archive', action='store_true', help='delete aged ticks instead of archiving them')
+    parser.add_argument('--vacuum', action='store_true', help='VACUUM and ANALYZE the database afterwards')
+    args = parser.parse_args()
+
+    cleanup = DataCleanup(args.db, args.cold_dir)
+    print("StockWatcher tick archive")
+    print("=" * 40)
+
+    try:
+        moved = cleanup.cleanup_old_data(args.days, archive=not args.no_archive)
+    except RuntimeError as e:
+        print(e)
+        sys.exit(1)
+    action = 'Deleted' if args.no_archive else f'Archived to {args.cold_dir}:'
+    print(f"{action} {moved} ticks older than {args.days} days")
+
+    if args.vacuum:
+        cleanup.optimize_database()
+
+    stats = cleanup.get_database_stats()
+    print(f"Database: {stats['stock_prices_count']} ticks, {stats['file_size_mb']:.1f} MB")
+    print(f"Cold storage: {stats['cold_storage_mb']:.1f} MB")
+
+if __name__ == "__main__":
+    main()
@@ -2,102 +2,89 @@
 
 import sys
 import os
-import shutil
-import sqlite3
+import argparse
 import json
 from datetime import datetime
 
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.database import Database
+from app import backup
+from config import Config
 
-def backup_database(backup_dir='backups'):
+STATE_FILE = 'export_state.json'
+
+def backup_database(db_path, backup_dir='backups', pages=1024, pause=0.0):
     os.makedirs(backup_dir, exist_ok=True)
-    
+
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     backup_filename = f'stock_data_backup_{timestamp}.db'
     backup_path = os.path.join(backup_dir, backup_filename)
-    
+
+    if not os.path.exists(db_path):
+        print("No database file found to backup")
+        return None
     try:
-        if os.path.exists('stock_data.db'):
-            shutil.copy2('stock_data.db', backup_path)
-            print(f"Database backed up to: {backup_path}")
-            return backup_path
-        else:
-            print("No database file found to backup")
-            return None
+        page_count = backup.backup_database(db_path, backup_path, pages=pages, pause=pause)
+        print(f"Database backed up to: {backup_path} ({page_count} pages)")
+        return backup_path
     except Exception as e:
         print(f"Backup failed: {e}")
         return None
 
-def export_data_to_json(backup_dir='backups'):
+def load_export_state(backup_dir):
+    try:
+        with open(os.path.join(backup_dir, STATE_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def save_export_state(backup_dir, state):
+    path = os.path.join(backup_dir, STATE_FILE)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+def export_data(db_path, backup_dir='backups', compress=True, full=False):
+    # Rows added since the last export (everything with `full`), streamed as NDJSON
     os.makedirs(backup_dir, exist_ok=True)
-    
+
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    export_filename = f'stock_data_export_{timestamp}.json'
+    export_filename = f'stock_data_export_{timestamp}.ndjson' + ('.gz' if compress else '')
     export_path = os.path.join(backup_dir, export_filename)
-    
+
+    if not os.path.exists(db_path):
+        print("No database file found to export")
+        return None
     try:
-        db = Database()
-        conn = sqlite3.connect(db.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        export_data = {}
-        
-        # Export watchlist
-        cursor.execute('SELECT * FROM watchlist')
-        watchlist_data = [dict(row) for row in cursor.fetchall()]
-        export_data['watchlist'] = watchlist_data
-        
-        # Export recent stock prices (last 1000 records)
-        cursor.execute('SELECT * FROM stock_prices ORDER BY timestamp DESC LIMIT 1000')
-        prices_data = [dict(row) for row in cursor.fetchall()]
-        export_data['stock_prices'] = prices_data
-        
-        # Export portfolio if exists
-        try:
-            cursor.execute('SELECT * FROM portfolio')
-            portfolio_data = [dict(row) for row in cursor.fetchall()]
-            export_data['portfolio'] = portfolio_data
-        except:
-            export_data['portfolio'] = []
-        
-        # Export transactions if exists  
-        try:
-            cursor.execute('SELECT * FROM transactions ORDER BY transaction_date DESC LIMIT 500')
-            transactions_data = [dict(row) for row in cursor.fetchall()]
-            export_data['transactions'] = transactions_data
-        except:
-            export_data['transactions'] = []
-        
-        conn.close()
-        
-        with open(export_path, 'w') as f:
-            json.dump(export_data, f, indent=2, default=str)
-        
-        print(f"Data exported to JSON: {export_path}")
+        state = {} if full else load_export_state(backup_dir)
+        state, counts = backup.export_ndjson(db_path, export_path, state)
+        save_export_state(backup_dir, state)
+
+        print(f"Data exported to: {export_path}")
+        for table, count in counts.items():
+            print(f"  {table:<14} {count:>10} rows")
         return export_path
-        
+
     except Exception as e:
         print(f"Export failed: {e}")
         return None
 
 def cleanup_old_backups(backup_dir='backups', keep_count=5):
+    # Database backups only: each incremental export holds rows no other file has
     if not os.path.exists(backup_dir):
         return
-    
+
     # Get all backup files
     backup_files = []
     for filename in os.listdir(backup_dir):
         if filename.startswith('stock_data_backup_') and filename.endswith('.db'):
             filepath = os.path.join(backup_dir, filename)
             backup_files.append((filepath, os.path.getmtime(filepath)))
-    
+
     # Sort by modification time (newest first)
     backup_files.sort(key=lambda x: x[1], reverse=True)
-    
+
     # Remove old backups
     if len(backup_files) > keep_count:
         for filepath, _ in backup_files[keep_count:]:
@@ -108,19 +95,31 @@ def cleanup_old_backups(backup_dir='backups', keep_count=5):
                 print(f"Failed to remove {filepath}: {e}")
 
 def main():
+    parser = argparse.ArgumentParser(description='Back up the database and export new rows as NDJSON')
+    parser.add_argument('--db', default=Config.DATABASE_PATH, help='database file')
+    parser.add_argument('--dir', default='backups', help='backup directory')
+    parser.add_argument('--no-backup', action='store_true', help='skip the database backup')
+    parser.add_argument('--no-export', action='store_true', help='skip the NDJSON export')
+    parser.add_argument('--full', action='store_true',
+                        help='export every row instead of only rows added since the last export')
+    parser.add_argument('--no-compress', action='store_true', help='write plain .ndjson instead of .ndjson.gz')
+    parser.add_argument('--pages', type=int, default=1024, help='database pages copied per backup step')
+    parser.add_argument('--pause', type=float, default=0.0, help='seconds to sleep between backup steps')
+    parser.add_argument('--keep', type=int, default=5, help='database backups to keep')
+    args = parser.parse_args()
+
     print("StockWatcher Data Backup Tool")
     print("=" * 40)
-    
-    # Create database backup
-    backup_path = backup_database()
-    
-    # Export data to JSON
-    json_path = export_data_to_json()
-    
-    # Cleanup old backups
-    cleanup_old_backups()
-    
+
+    if not args.no_backup:
+        backup_database(args.db, args.dir, args.pages, args.pause)
+
+    if not args.no_export:
+        export_data(args.db, args.dir, compress=not args.no_compress, full=args.full)
+
+    cleanup_old_backups(args.dir, args.keep)
+
     print("\nBackup completed!")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -2,56 +2,77 @@
 
 import sys
 import os
+import argparse
+import asyncio
+import json
+import logging
 import time
-import schedule
-from datetime import datetime
 
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.stock_api import StockAPI
-from app.database import Database
-from app.alerts import AlertSystem
-
-def check_and_send_alerts():
-    print(f"[{datetime.now()}] Checking price alerts...")
-    
-    stock_api = StockAPI()
-    db = Database()
-    alert_system = AlertSystem()
-    
+from config import Config
+
+def check_status(path, max_age):
+    # Exit code for health checks: 0 when the monitor is running and fresh
     try:
-        alerts = alert_system.check_price_alerts(db, stock_api)
-        
-        if alerts:
-            print(f"Found {len(alerts)} alerts to process")
-            
-            for alert in alerts:
-                print(f"Alert: {alert['symbol']} at ${alert['current_price']:.2f}")
-                alert_system.send_email_alert(alert)
-        else:
-            print("No alerts triggered")
-            
-    except Exception as e:
-        print(f"Error checking alerts: {e}")
+        with open(path) as f:
+            status = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"No readable status file at {path}: {e}")
+        return 1
+
+    age = time.time() - status['updated_at']
+    print(json.dumps(status, indent=2))
+    if not status['healthy'] or age > max_age:
+        print(f"Unhealthy: state={status['state']}, status written {age:.0f}s ago")
+        return 1
+    return 0
 
 def main():
+    parser = argparse.ArgumentParser(description='StockWatcher alert monitor daemon')
+    parser.add_argument('--db', default=Config.DATABASE_PATH)
+    parser.add_argument('--concurrency', type=int, default=Config.MONITOR_CONCURRENCY,
+                        help='quote batches fetched at the same time')
+    parser.add_argument('--min-interval', type=float, default=Config.MONITOR_MIN_INTERVAL,
+                        help='poll interval for symbols at a threshold (seconds)')
+    parser.add_argument('--max-interval', type=float, default=Config.MONITOR_MAX_INTERVAL,
+                        help='poll interval for symbols far from any threshold (seconds)')
+    parser.add_argument('--status-file', default=Config.MONITOR_STATUS_PATH)
+    parser.add_argument('--check', action='store_true',
+                        help='print the status file of a running monitor and exit non-zero if unhealthy')
+    args = parser.parse_args()
+
+    if args.check:
+        sys.exit(check_status(args.status_file, max_age=10))
+
+    # Imported here so `--check` health probes start without loading the app
+    from app.alerts import AlertSystem
+    from app.monitor import AlertMonitor
+    from app.services import Services
+
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s %(message)s')
+
+    class MonitorConfig(Config):
+        DATABASE_PATH = args.db
+        TICK_WRITE_BEHIND = False
+        MONITOR_CONCURRENCY = args.concurrency
+        MONITOR_MIN_INTERVAL = args.min_interval
+        MONITOR_MAX_INTERVAL = args.max_interval
+
+    services = Services(MonitorConfig())
+    notifier = services.notifier.start()
+    monitor = AlertMonitor(services.stock_api, services.db, AlertSystem(), services.config,
+                           args.status_file, notifier)
+
     print("Starting StockWatcher Alert Monitor...")
-    print("Checking for alerts every 5 minutes")
-    
-    # Schedule alert checks every 5 minutes
-    schedule.every(5).minutes.do(check_and_send_alerts)
-    
-    # Run initial check
-    check_and_send_alerts()
-    
-    # Keep the script running
+    print(f"Polling every {args.min_interval:g}-{args.max_interval:g}s, "
+          f"{args.concurrency} batches at a time; status in {args.status_file}")
     try:
-        while True:
-            schedule.run_pending()
-            time.sleep(60)  # Check every minute
-    except KeyboardInterrupt:
-        print("\nAlert monitor stopped")
+        asyncio.run(monitor.run())
+    finally:
+        services.close()
+    print("Alert monitor stopped")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import argparse
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.portfolio import Portfolio
+from config import Config
+
+def main():
+    parser = argparse.ArgumentParser(description='Verify or rebuild portfolio lots and holdings from transactions')
+    parser.add_argument('--db', default=Config.DATABASE_PATH, help='database file')
+    parser.add_argument('--verify-only', action='store_true', help='report discrepancies without rebuilding')
+    args = parser.parse_args()
+    
+    portfolio = Portfolio(args.db)
+    print(f"StockWatcher ledger check ({portfolio.cost_basis_method} cost basis)")
+    print("=" * 40)
+    
+    if args.verify_only:
+        problems = portfolio.verify_ledger()
+    else:
+        problems = portfolio.rebuild_ledger()
+    
+    for problem in problems:
+        print(f"  {problem}")
+    
+    skipped = portfolio.skipped_transactions()
+    if skipped:
+        print(f"Ignoring {len(skipped)} invalid transactions:")
+        for transaction in skipped:
+            print(f"  {transaction}")
+    
+    if not problems:
+        print("Holdings match the transaction history")
+    elif args.verify_only:
+        print(f"\n{len(problems)} discrepancies found; run without --verify-only to rebuild")
+        sys.exit(1)
+    else:
+        remaining = portfolio.verify_ledger()
+        if remaining:
+            print(f"\nRebuild left {len(remaining)} discrepancies")
+            sys.exit(1)
+        print(f"\nRebuilt ledger, fixed {len(problems)} discrepancies")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import argparse
+import csv
+import io
+
+import requests
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+
+# NASDAQ Trader symbol directory: Nasdaq-listed and other US-listed (NYSE, NYSE American, NYSE Arca, Cboe) securities
+NASDAQ_LISTED_URL = 'https://www.nasdaqtrader.com/dynamic/SymDir/nasdaqlisted.txt'
+OTHER_LISTED_URL = 'https://www.nasdaqtrader.com/dynamic/SymDir/otherlisted.txt'
+EXCHANGES = {'A': 'NYSE American', 'N': 'NYSE', 'P': 'NYSE Arca', 'Z': 'Cboe BZX', 'V': 'IEX'}
+
+def read_directory(text):
+    # Pipe-delimited with a header row and a trailing "File Creation Time" line
+    lines = [line for line in text.splitlines() if line and not line.startswith('File Creation Time')]
+    return csv.DictReader(io.StringIO('\n'.join(lines)), delimiter='|')
+
+def fetch_listing(timeout=30):
+    listing = {}
+    response = requests.get(NASDAQ_LISTED_URL, timeout=timeout)
+    response.raise_for_status()
+    for row in read_directory(response.text):
+        if row['Test Issue'] != 'Y':
+            listing[row['Symbol']] = (row['Security Name'], 'NASDAQ')
+
+    response = requests.get(OTHER_LISTED_URL, timeout=timeout)
+    response.raise_for_status()
+    for row in read_directory(response.text):
+        # Share classes use Yahoo's dash form (BRK.B -> BRK-B); preferreds ($) are skipped
+        symbol = row['ACT Symbol']
+        if row['Test Issue'] != 'Y' and '$' not in symbol:
+            listing[symbol.replace('.', '-')] = (row['Security Name'], EXCHANGES.get(row['Exchange'], row['Exchange']))
+    return listing
+
+def write_listing(path, listing):
+    with open(path + '.tmp', 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['symbol', 'name', 'exchange'])
+        for symbol in sorted(listing):
+            writer.writerow([symbol, *listing[symbol]])
+    os.replace(path + '.tmp', path)
+
+def main():
+    parser = argparse.ArgumentParser(description='Download the US symbol listing used to validate and search symbols')
+    parser.add_argument('--output', default=Config.SYMBOL_LIST_PATH, help='listing file to write')
+    args = parser.parse_args()
+
+    try:
+        listing = fetch_listing()
+    except requests.exceptions.RequestException as e:
+        print(f"Failed to download the symbol directory: {e}")
+        sys.exit(1)
+
+    write_listing(args.output, listing)
+    print(f"Wrote {len(listing)} symbols to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,11 @@ class StockDashboard {
     constructor() {
         this.currentSymbol = '';
         this.refreshInterval = null;
+        this.stream = null;
+        this.streamSymbols = '';
+        this.watchlistSymbols = [];
+        this.portfolioData = null;
+        this.quotes = {};
         this.init();
     }
     
@@ -12,6 +17,9 @@ class StockDashboard {
     }
     
     setupAutoRefresh() {
+        // Live prices arrive over /api/stream; poll only where EventSource is missing
+        if (window.EventSource) return;
+        
         // Refresh data every 5 minutes
         this.refreshInterval = setInterval(() => {
             this.loadWatchlist();
@@ -19,6 +27,70 @@ class StockDashboard {
         }, 300000);
     }
     
+    updateStream() {
+        if (!window.EventSource) return;
+        
+        const symbols = new Set(this.watchlistSymbols);
+        if (this.portfolioData && this.portfolioData.positions) {
+            this.portfolioData.positions.forEach(position => symbols.add(position.symbol));
+        }
+        if (this.currentSymbol) symbols.add(this.currentSymbol);
+        
+        // One stream per page; reopen only when the set of symbols changes
+        const key = [...symbols].sort().join(',');
+        if (key === this.streamSymbols) return;
+        this.streamSymbols = key;
+        if (this.stream) {
+            this.stream.close();
+            this.stream = null;
+        }
+        if (!key) return;
+        
+        this.stream = new EventSource(`/api/stream?symbols=${encodeURIComponent(key)}`);
+        this.stream.addEventListener('quote', event => this.onQuote(JSON.parse(event.data)));
+        this.stream.onerror = () => console.warn('Quote stream interrupted, reconnecting');
+    }
+    
+    onQuote(quote) {
+        this.quotes[quote.symbol] = quote;
+        
+        document.querySelectorAll(`.live-price[data-symbol="${quote.symbol}"]`).forEach(el => {
+            el.textContent = `$${quote.price.toFixed(2)}`;
+        });
+        
+        const stockInfo = document.querySelector(`#result .stock-info[data-symbol="${quote.symbol}"]`);
+        if (stockInfo) {
+            this.displayStockInfo(quote, document.getElementById('result'));
+        }
+        
+        if (this.portfolioData && this.portfolioData.positions) {
+            const position = this.portfolioData.positions.find(p => p.symbol === quote.symbol);
+            if (position) {
+                this.applyQuote(position, quote.price);
+                this.displayPortfolio(this.portfolioData);
+            }
+        }
+    }
+    
+    applyQuote(position, price) {
+        // Same arithmetic as Portfolio.get_portfolio_summary, for one position
+        const summary = this.portfolioData.summary;
+        const oldValue = position.position_value;
+        position.current_price = price;
+        position.position_value = position.shares * price;
+        position.profit_loss = position.position_value - position.invested_value;
+        position.profit_loss_pct = position.invested_value ?
+            position.profit_loss / position.invested_value * 100 : 0;
+        position.price_source = 'live';
+        
+        if (summary) {
+            summary.total_current_value += position.position_value - oldValue;
+            summary.total_profit_loss = summary.total_current_value - summary.total_invested;
+            summary.total_profit_loss_pct = summary.total_invested ?
+                summary.total_profit_loss / summary.total_invested * 100 : 0;
+        }
+    }
+    
     searchStock() {
         const symbol = document.getElementById('stockInput').value.toUpperCase().trim();
         if (!symbol) {
@@ -42,6 +114,7 @@ class StockDashboard {
                     resultDiv.innerHTML = `<p class="error">${data.error}</p>`;
                 } else {
                     this.displayStockInfo(data, resultDiv);
+                    this.updateStream();
                     document.getElementById('historyBtn').style.display = 'inline-block';
                     document.getElementById('watchlistBtn').style.display = 'inline-block';
                     document.getElementById('portfolioBtn').style.display = 'inline-block';
@@ -60,7 +133,7 @@ class StockDashboard {
             (data.price > data.previous_close ? 'positive' : 'negative') : '';
         
         container.innerHTML = `
-            <div class="stock-info">
+            <div class="stock-info" data-symbol="${data.symbol}">
                 <h2>${data.symbol}</h2>
                 <p class="price ${changeClass}">$${data.price.toFixed(2)} ${changeIndicator}</p>
                 <p class="currency">${data.currency}</p>
@@ -112,6 +185,8 @@ class StockDashboard {
             .then(response => response.json())
             .then(data => {
                 const watchlistDiv = document.getElementById('watchlist');
+                this.watchlistSymbols = data.map(item => item.symbol);
+                this.updateStream();
                 if (data.length === 0) {
                     watchlistDiv.innerHTML = '<p class="empty-watchlist">No stocks in watchlist</p>';
                     return;
@@ -119,9 +194,11 @@ class StockDashboard {
                 
                 let watchlistHTML = '';
                 data.forEach(item => {
+                    const quote = this.quotes[item.symbol];
                     watchlistHTML += `
                         <div class="watchlist-item">
                             <span class="symbol" onclick="dashboard.quickSearch('${item.symbol}')">${item.symbol}</span>
+                            <span class="live-price" data-symbol="${item.symbol}">${quote ? '$' + quote.price.toFixed(2) : '--'}</span>
                             <span class="target-price">${item.target_price ? '$' + item.target_price.toFixed(2) : 'No target'}</span>
                             <span class="alert-status ${item.alert_enabled ? 'enabled' : 'disabled'}">
                                 ${item.alert_enabled ? 'Alert ON' : 'Alert OFF'}
@@ -142,7 +219,9 @@ class StockDashboard {
         fetch('/api/portfolio')
             .then(response => response.json())
             .then(data => {
+                this.portfolioData = data;
                 this.displayPortfolio(data);
+                this.updateStream();
             })
             .catch(error => {
                 console.error('Portfolio error:', error);
@@ -190,6 +269,8 @@ class StockDashboard {
             portfolioHTML += '<div class="portfolio-positions">';
             data.positions.forEach(position => {
                 const profitClass = position.profit_loss >= 0 ? 'positive' : 'negative';
+                const priceNote = position.price_source === 'stale' ? ' (stale)' :
+                    position.price_source === 'cost_basis' ? ' (no quote)' : '';
                 portfolioHTML += `
                     <div class="portfolio-item">
                         <div class="position-header">
@@ -198,7 +279,7 @@ class StockDashboard {
                         </div>
                         <div class="position-details">
                             <span>Avg: $${position.avg_price.toFixed(2)}</span>
-                            <span>Current: $${position.current_price.toFixed(2)}</span>
+                            <span>Current: $${position.current_price.toFixed(2)}${priceNote}</span>
                             <span class="${profitClass}">P&L: $${position.profit_loss.toFixed(2)} (${position.profit_loss_pct.toFixed(2)}%)</span>
                         </div>
                     </div>
@@ -322,6 +403,9 @@ class StockDashboard {
         if (this.refreshInterval) {
             clearInterval(this.refreshInterval);
         }
+        if (this.stream) {
+            this.stream.close();
+        }
     }
 }
 
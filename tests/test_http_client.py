@@ -0,0 +1,55 @@
+import os
+import sys
+import time
+import unittest
+from unittest import mock
+
+import requests
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.http_client import CircuitBreaker, CircuitOpenError, HTTPClient
+
+
+class HalfOpenTrialTest(unittest.TestCase):
+    def open_client(self):
+        client = HTTPClient(max_retries=0, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0.05))
+        client.breaker.record_failure()
+        time.sleep(0.06)
+        return client
+
+    def test_unexpected_error_in_trial_reopens_the_circuit(self):
+        client = self.open_client()
+        with mock.patch.object(client.session, 'get', side_effect=requests.exceptions.ChunkedEncodingError):
+            with self.assertRaises(requests.exceptions.ChunkedEncodingError):
+                client.get('http://upstream.invalid/quote')
+        self.assertEqual(client.breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(client.breaker.trial_in_flight)
+        self.assertEqual(client.metrics()['failures'], 1)
+
+        time.sleep(0.06)
+        response = mock.Mock(status_code=200)
+        with mock.patch.object(client.session, 'get', return_value=response):
+            self.assertIs(client.get('http://upstream.invalid/quote'), response)
+        self.assertEqual(client.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_abandoned_trial_expires(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        breaker.record_failure()
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow_request())
+        self.assertFalse(breaker.allow_request())
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow_request())
+
+    def test_open_circuit_rejects_without_a_request(self):
+        client = HTTPClient(breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60))
+        client.breaker.record_failure()
+        with mock.patch.object(client.session, 'get') as get:
+            with self.assertRaises(CircuitOpenError):
+                client.get('http://upstream.invalid/quote')
+        get.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
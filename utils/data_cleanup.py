@@ -1,24 +1,46 @@
 import sqlite3
 import os
 from datetime import datetime, timedelta
+from app import cold_storage
+from config import Config
 
 class DataCleanup:
-    def __init__(self, db_path='stock_data.db'):
-        self.db_path = db_path
+    def __init__(self, db_path=None, cold_path=None):
+        self.db_path = db_path or Config.DATABASE_PATH
+        self.cold_path = cold_path or Config.COLD_STORAGE_PATH
     
-    def cleanup_old_data(self, days_to_keep=30):
+    def cleanup_old_data(self, days_to_keep=30, archive=True):
+        # Ticks older than the cutoff are moved to Parquet cold storage, or
+        # dropped with archive=False; returns how many left stock_prices
+        if archive and not cold_storage.available():
+            raise RuntimeError('pyarrow is required to archive ticks; pass archive=False to delete them')
+
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
-        cutoff_date = datetime.now() - timedelta(days=days_to_keep)
+        cutoff = int((datetime.now() - timedelta(days=days_to_keep)).timestamp())
+        
+        # Timestamps are epoch seconds
+        if archive:
+            rows_deleted = cold_storage.ColdStore(self.cold_path).archive(conn, cutoff)
+        else:
+            cursor.execute(
+                'DELETE FROM stock_prices WHERE timestamp < ?',
+                (cutoff,)
+            )
+            rows_deleted = cursor.rowcount
         
-        # Clean old stock prices
+        # Minute bars age out with the ticks; hourly and daily bars are kept
         cursor.execute(
-            'DELETE FROM stock_prices WHERE timestamp < ?',
-            (cutoff_date.isoformat(),)
+            'DELETE FROM price_bars WHERE resolution = 60 AND bucket < ?',
+            (cutoff,)
         )
         
-        rows_deleted = cursor.rowcount
+        # Delivered and abandoned alert emails; pending ones are kept
+        cursor.execute(
+            "DELETE FROM notifications WHERE status != 'pending' AND created_at < ?",
+            (cutoff,)
+        )
         conn.commit()
         conn.close()
         
@@ -64,5 +86,10 @@ class DataCleanup:
         else:
             stats['file_size_mb'] = 0
         
+        stats['cold_storage_mb'] = 0
+        for directory, _, filenames in os.walk(self.cold_path):
+            for filename in filenames:
+                stats['cold_storage_mb'] += os.path.getsize(os.path.join(directory, filename)) / (1024 * 1024)
+        
         conn.close()
         return stats
\ No newline at end of file